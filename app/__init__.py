@@ -69,8 +69,13 @@ def create_app():
     @login_manager.user_loader
     def load_user(user_id):
         try:
-            user = User.query.get(int(user_id))
-            return user
+            # Reutiliza el usuario ya cargado en este request (flask.g)
+            from app.models.user_utils import get_current_user
+            from flask import session as flask_session
+            if str(flask_session.get('user_id')) == str(user_id):
+                return get_current_user()
+            from app import db
+            return db.session.get(User, int(user_id))
         except Exception:
             return None
 
@@ -78,6 +83,64 @@ def create_app():
     from app.models.product import Product
     from app.models.favorite import Favorite
     from app.models.quote import Quote, QuoteItem
+    from app.models.purchase import Purchase
+    from app.models.cart import Cart, CartItem
+
+    # Los conteos de paginación se cachean por filtro; invalidarlos cuando cambian las tablas
+    from app.models.pagination import invalidate_counts_on_change
+    invalidate_counts_on_change(Product, 'products')
+    invalidate_counts_on_change(User, 'users')
+    invalidate_counts_on_change(Quote, 'quotes')
+    invalidate_counts_on_change(Purchase, 'purchases')
+    invalidate_counts_on_change(Cart, 'carts')
+
+    # Índice de facetas del catálogo local: reconstruir cuando cambian los productos
+    from app.models.facets import facet_engine
+    facet_engine.listen(Product)
+
+    # Instantánea columnar del catálogo local (filtros de precio, existencia y marca)
+    from app.models.catalog_table import catalog_table
+    catalog_table.listen(Product)
+
+    # Índice de números de parte (Ingram, fabricante, UPC) para búsquedas por SKU
+    from app.models.part_number_index import part_number_index
+    part_number_index.listen(Product)
+
+    # Analytics de búsqueda: contadores por worker escritos por lotes en search_stats
+    from app.models.search_analytics import search_analytics
+    search_analytics.init_app(app)
+
+    # Precarga opcional del catálogo de Ingram (siguiente página y primeros SKUs)
+    from app.models.prefetch import catalog_prefetcher
+    catalog_prefetcher.init_app(app)
+
+    # Productos similares: índice precalculado (.npy abierto con mmap si NumPy está instalado; si no, JSON en memoria)
+    from app.models.similar_products import similar_products
+    similar_products.init_app(app)
+
+    # Reportes del admin: tablas diarias pre-agregadas, recalculadas por día sucio
+    from app.models.report_rollup import report_rollup
+    report_rollup.init_app(app)
+    report_rollup.listen(User, Quote, QuoteItem, Purchase)
+
+    # Eventos del admin (SSE / long-poll): nuevas cotizaciones, compras y cambios de estado
+    from app.models.event_bus import admin_events
+    admin_events.init_app(app)
+    admin_events.listen(Quote, Purchase, User)
+
+    # Resumen por usuario de los dashboards (cotizaciones, carrito, favoritos)
+    from app.models.user_summary import user_summaries
+    user_summaries.init_app(app)
+    user_summaries.listen(Quote, Cart, CartItem, Favorite)
+
+    # Límite de consultas SQL por vista (detecta regresiones N+1)
+    from app.models.query_budget import query_budget
+    query_budget.init_app(app)
+
+    # Tarjetas de producto del catálogo renderizadas una vez por SKU/precio (LRU)
+    from app.models.fragment_cache import product_cards
+    product_cards.init_app(app)
+    product_cards.listen(Product)
     
     # Agregar funciones al contexto de Jinja
     @app.context_processor
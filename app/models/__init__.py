@@ -6,4 +6,7 @@ from .quote import Quote, QuoteItem, QuoteHistory
 from .category import Category
 from .vendor import Vendor
 from .cart import Cart, CartItem
-from .purchase import Purchase, PurchaseHistory, PurchaseItem
\ No newline at end of file
+from .purchase import Purchase, PurchaseHistory, PurchaseItem
+from .search_stat import SearchStat
+from .report_stats import DailySummary, DailyQuoteStatus, DailyUserActivity, DailyProductActivity
+from .admin_event import AdminEvent
\ No newline at end of file
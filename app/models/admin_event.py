@@ -0,0 +1,15 @@
+from app import db
+from datetime import datetime
+
+class AdminEvent(db.Model):
+    """Evento del panel de administración (nueva cotización, cambio de estado, compra). El id es la secuencia del bus."""
+    __tablename__ = 'admin_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_admin_events_created', 'created_at'),
+    )
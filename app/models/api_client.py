@@ -68,7 +68,20 @@ class APIClient:
         
         print(f"🔧 URL final: {method} {url}")  # Para debug
         
-        return requests.request(method, url, **kwargs)
+        # Contar la llamada para las métricas de la búsqueda en curso; una
+        # falla de Ingram (sin respuesta o error distinto de 404) es un error
+        # de la búsqueda, no una búsqueda sin resultados
+        from app.models.search_metrics import search_metrics
+        search_metrics.note_upstream_call()
+        
+        try:
+            response = requests.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            search_metrics.note_error()
+            raise
+        if response.status_code >= 400 and response.status_code != 404:
+            search_metrics.note_error()
+        return response
         
     # MÉTODO CORREGIDO para precios
     @staticmethod
@@ -0,0 +1,246 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from app.models.product_utils import ProductUtils
+
+# Peso de cada fuente al ordenar sugerencias
+PESO_BUSQUEDA = 50      # por cada vez que se buscó la consulta
+PESO_PRODUCTO = 1       # por cada producto con esa marca / categoría / palabra
+PESO_KEYWORD = 1        # términos del KEYWORD_MAPPING
+
+MAX_BUSQUEDAS = 5000     # búsquedas populares incluidas en el índice
+
+PREFIJO_PRECALCULADO = 3  # prefijos cortos con su top ya resuelto
+TOP_PRECALCULADO = 10
+
+
+class PrefixIndex:
+    """
+    Índice de autocompletado: arreglo ordenado de llaves normalizadas.
+    Un prefijo se resuelve con bisect (O(log n)) y los prefijos cortos,
+    que abarcan muchas llaves, tienen su top precalculado.
+    """
+
+    def __init__(self, entradas: Dict[str, Tuple[str, str, int]]):
+        # entradas: llave normalizada -> (texto a mostrar, tipo, score)
+        ordenadas = sorted(entradas.items())
+        self.keys = [llave for llave, _ in ordenadas]
+        self.values = [valor for _, valor in ordenadas]
+
+        top: Dict[str, list] = {}
+        for llave, (texto, tipo, score) in ordenadas:
+            for n in range(1, min(len(llave), PREFIJO_PRECALCULADO) + 1):
+                top.setdefault(llave[:n], []).append((score, -len(texto), texto, tipo))
+        self._top = {
+            prefijo: [(texto, tipo, score) for score, _, texto, tipo in heapq.nlargest(TOP_PRECALCULADO, candidatos)]
+            for prefijo, candidatos in top.items()
+        }
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, prefijo: str, limit: int = 8) -> List[Tuple[str, str, int]]:
+        if not prefijo:
+            return []
+        if len(prefijo) <= PREFIJO_PRECALCULADO and limit <= TOP_PRECALCULADO:
+            return self._top.get(prefijo, [])[:limit]
+
+        inicio = bisect_left(self.keys, prefijo)
+        fin = bisect_left(self.keys, prefijo + '\uffff', inicio)
+        candidatos = (
+            (score, -len(texto), texto, tipo)
+            for texto, tipo, score in self.values[inicio:fin]
+        )
+        return [(texto, tipo, score) for score, _, texto, tipo in heapq.nlargest(limit, candidatos)]
+
+
+class AutocompleteService:
+    """
+    Autocompletado sobre búsquedas populares, marcas, categorías y palabras
+    de los títulos del catálogo local. El índice se reconstruye en segundo
+    plano cuando cambian las búsquedas populares o el índice de facetas,
+    mientras tanto se sigue sirviendo el anterior.
+    """
+
+    REBUILD_MIN_INTERVAL = 30
+    MAX_AGE = 300
+
+    def __init__(self):
+        self._index: Optional[PrefixIndex] = None
+        self._built_at = 0.0
+        self._version_facetas = None
+        self._busquedas = None
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    def _collect(self) -> Dict[str, Tuple[str, str, int]]:
+        entradas: Dict[str, Tuple[str, str, int]] = {}
+
+        def agregar(texto, tipo, score):
+            llave = ProductUtils.normalize_text(texto)
+            if len(llave) < 2:
+                return
+            actual = entradas.get(llave)
+            if actual is None or score > actual[2]:
+                entradas[llave] = (texto, tipo, score)
+
+        for categoria_terms in ProductUtils.KEYWORD_MAPPING.values():
+            for termino in categoria_terms:
+                agregar(termino, 'keyword', PESO_KEYWORD)
+
+        try:
+            from app.models.facets import facet_engine
+            index = facet_engine.get_index()
+            for faceta, tipo in (('vendor', 'vendor'), ('category', 'category'), ('subcategory', 'category')):
+                for valor, bits in index.postings[faceta].items():
+                    agregar(valor, tipo, bits.bit_count() * PESO_PRODUCTO)
+            for token, bits in index._tokens:
+                if len(token) >= 3 and not token.isdigit():
+                    agregar(token, 'term', bits.bit_count() * PESO_PRODUCTO)
+            self._version_facetas = facet_engine._version
+        except Exception as e:
+            print(f"Autocompletado sin catálogo local: {e}")
+
+        try:
+            from app.models.search_analytics import search_analytics
+            for consulta, veces in search_analytics.popular(MAX_BUSQUEDAS):
+                agregar(consulta, 'query', veces * PESO_BUSQUEDA)
+        except Exception as e:
+            print(f"Autocompletado sin búsquedas populares: {e}")
+
+        return entradas
+
+    def _rebuild(self):
+        index = PrefixIndex(self._collect())
+        self._index = index
+        self._built_at = time.time()
+        return index
+
+    def _rebuild_background(self, app):
+        def tarea():
+            try:
+                with app.app_context():
+                    self._rebuild()
+            except Exception as e:
+                print(f"Error reconstruyendo autocompletado: {e}")
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=tarea, daemon=True).start()
+
+    @staticmethod
+    def _version_busquedas():
+        from app.models.search_analytics import search_analytics
+        return search_analytics.version()
+
+    def _desactualizado(self) -> bool:
+        edad = time.time() - self._built_at
+        if edad < self.REBUILD_MIN_INTERVAL:
+            return False
+        if edad >= self.MAX_AGE:
+            # Recoger también lo que escribieron los otros workers
+            return True
+        busquedas = self._version_busquedas()
+        cambiaron = busquedas != self._busquedas
+        self._busquedas = busquedas
+        try:
+            from app.models.facets import facet_engine
+            facet_engine.get_index()
+            cambiaron = cambiaron or facet_engine._version != self._version_facetas
+        except Exception:
+            pass
+        return cambiaron
+
+    def get_index(self) -> PrefixIndex:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._busquedas = self._version_busquedas()
+                    return self._rebuild()
+
+        if not self._rebuilding and self._desactualizado():
+            with self._lock:
+                if not self._rebuilding:
+                    self._rebuilding = True
+                    try:
+                        from flask import current_app
+                        self._rebuild_background(current_app._get_current_object())
+                    except RuntimeError:
+                        # Sin contexto de app: reconstruir en línea
+                        self._rebuilding = False
+                        self._rebuild()
+        return self._index
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict]:
+        """Sugerencias ordenadas por popularidad para lo que el usuario lleva escrito."""
+        consulta = ProductUtils.normalize_text(query or '')
+        if len(consulta) < 2:
+            return []
+
+        index = self.get_index()
+        sugerencias = []
+        vistos = set()
+        for texto, tipo, score in index.lookup(consulta, limit):
+            vistos.add(texto.lower())
+            sugerencias.append({'text': texto, 'type': tipo, 'score': score})
+
+        # Completar la última palabra conservando las anteriores ("laptop h" -> "laptop hp")
+        palabras = consulta.split(' ')
+        if len(sugerencias) < limit and len(palabras) > 1 and len(palabras[-1]) >= 1:
+            inicio = ' '.join(palabras[:-1])
+            for texto, tipo, score in index.lookup(palabras[-1], limit):
+                completa = f"{inicio} {texto}"
+                if completa.lower() not in vistos:
+                    vistos.add(completa.lower())
+                    sugerencias.append({'text': completa, 'type': tipo, 'score': score})
+                    if len(sugerencias) >= limit:
+                        break
+
+        # Prefijo de un número de parte: se sugiere el identificador completo
+        # (buscar_global solo redirige al detalle con la coincidencia exacta)
+        if len(sugerencias) < limit and ' ' not in consulta:
+            from app.models.part_number_index import part_number_index, normalize_part_number
+            if len(normalize_part_number(query)) >= 4:
+                for identificador, part_number in part_number_index.prefix(query, limit - len(sugerencias)):
+                    if identificador.lower() not in vistos:
+                        vistos.add(identificador.lower())
+                        sugerencias.append({'text': identificador, 'type': 'part_number', 'score': 0,
+                                            'part_number': part_number})
+
+        return sugerencias
+
+
+# Instancia global
+autocomplete_service = AutocompleteService()
+
+
+def benchmark_autocomplete(n_queries: int = 2000) -> Dict:
+    """Latencia de suggest() (ms) sobre prefijos del propio índice: p50, p95 y p99."""
+    index = autocomplete_service.get_index()
+    llaves = index.keys or ['la']
+    prefijos = []
+    for i in range(n_queries):
+        llave = llaves[(i * 7919) % len(llaves)]
+        prefijos.append(llave[:2 + i % 6])
+
+    tiempos = []
+    for prefijo in prefijos:
+        inicio = time.perf_counter()
+        autocomplete_service.suggest(prefijo)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tiempos.sort()
+
+    def percentil(p):
+        return round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * p))], 3)
+
+    return {
+        'entries': len(index),
+        'queries': len(tiempos),
+        'p50_ms': percentil(0.50),
+        'p95_ms': percentil(0.95),
+        'p99_ms': percentil(0.99),
+    }
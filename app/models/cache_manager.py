@@ -1,5 +1,6 @@
 from flask import current_app
 from datetime import datetime, timedelta
+import threading
 
 class SearchCache:
     def __init__(self):
@@ -21,11 +22,14 @@ class SearchCache:
         }
     
     def get(self, key):
+        from app.models.search_metrics import search_metrics
         if key in self.cache:
             if datetime.now() < self.cache[key]['expiry']:
+                search_metrics.note_cache(True)
                 return self.cache[key]['data']
             else:
                 del self.cache[key] 
+        search_metrics.note_cache(False)
         return None
 
 class TokenCache:
@@ -44,6 +48,115 @@ class TokenCache:
         import time
         self.token = token
         self.expiry = time.time() + expires_in
+class CountCache:
+    """
+    Conteos totales por firma de filtros. Evita repetir el COUNT(*) completo
+    en cada página; se invalida por tabla cuando cambian sus filas.
+    """
+    def __init__(self, ttl_seconds=300, max_entries=1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.cache = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, namespace, signature, compute):
+        import time
+        key = (namespace, signature)
+        entry = self.cache.get(key)
+        now = time.time()
+        if entry and now < entry[1]:
+            return entry[0]
+
+        total = compute()
+        with self._lock:
+            if len(self.cache) >= self.max_entries:
+                # Descartar la entrada más antigua (orden de inserción)
+                self.cache.pop(next(iter(self.cache)), None)
+            self.cache[key] = (total, now + self.ttl_seconds)
+        return total
+
+    def invalidate(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self.cache.clear()
+                return
+            for key in [k for k in self.cache if k[0] == namespace]:
+                self.cache.pop(key, None)
+
+class ProductCache:
+    """
+    Cache en memoria de respuestas de Ingram por producto: detalle, entrada
+    del catálogo, precio y disponibilidad, y páginas de búsqueda del catálogo.
+    Cada tipo tiene su propio TTL y un tamaño máximo (se descartan las
+    entradas más antiguas).
+    """
+    DEFAULT_TTL = {
+        'detail': 3600,   # El detalle cambia poco
+        'entry': 3600,    # Entrada del catálogo por SKU (descripción extra)
+        'price': 120,     # Precio y existencias: poco tiempo
+        'page': 120,      # Páginas de resultados del catálogo
+    }
+    CONFIG_KEYS = {
+        'detail': 'PRODUCT_DETAIL_CACHE_SECONDS',
+        'entry': 'PRODUCT_DETAIL_CACHE_SECONDS',
+        'price': 'PRODUCT_PRICE_CACHE_SECONDS',
+        'page': 'CATALOG_PAGE_CACHE_SECONDS',
+    }
+
+    def __init__(self, max_entries=5000):
+        from collections import OrderedDict
+        self.max_entries = max_entries
+        self._stores = {kind: OrderedDict() for kind in self.DEFAULT_TTL}
+        self._lock = threading.Lock()
+
+    def get_ttl(self, kind):
+        """Obtener la configuración solo cuando se necesite"""
+        try:
+            return current_app.config.get(self.CONFIG_KEYS[kind], self.DEFAULT_TTL[kind])
+        except RuntimeError:
+            return self.DEFAULT_TTL[kind]
+
+    def get(self, kind, key):
+        import time
+        from app.models.search_metrics import search_metrics
+        store = self._stores[kind]
+        with self._lock:
+            entry = store.get(key)
+            if entry is not None and time.time() < entry[1]:
+                store.move_to_end(key)
+                search_metrics.note_cache(True)
+                return entry[0]
+            if entry is not None:
+                del store[key]
+        search_metrics.note_cache(False)
+        return None
+
+    def contains(self, kind, key):
+        import time
+        entry = self._stores[kind].get(key)
+        return entry is not None and time.time() < entry[1]
+
+    def set(self, kind, key, value):
+        import time
+        store = self._stores[kind]
+        expiry = time.time() + self.get_ttl(kind)
+        with self._lock:
+            store[key] = (value, expiry)
+            store.move_to_end(key)
+            while len(store) > self.max_entries:
+                store.popitem(last=False)
+
+    def invalidate(self, kind=None, key=None):
+        with self._lock:
+            kinds = [kind] if kind else list(self._stores)
+            for k in kinds:
+                if key is None:
+                    self._stores[k].clear()
+                else:
+                    self._stores[k].pop(key, None)
+
 # Instancias globales
 search_cache = SearchCache()
-token_cache = TokenCache()
\ No newline at end of file
+token_cache = TokenCache()
+count_cache = CountCache()
+product_cache = ProductCache()
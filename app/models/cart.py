@@ -3,11 +3,16 @@ from datetime import datetime
 
 class Cart(db.Model):
     __tablename__ = 'carts'
+    # Orden de los listados paginados del admin (paginate_keyset)
+    __table_args__ = (db.Index('idx_carts_updated_id', 'updated_at', 'id'),)
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(100), nullable=False, index=True)
     status = db.Column(db.String(20), default='active')
     total_amount = db.Column(db.Float, default=0.0)
+    # Contadores mantenidos al escribir partidas (ver LineItems): el badge no recorre el carrito
+    item_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    total_quantity = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -16,6 +21,8 @@ class Cart(db.Model):
     
     def calculate_total(self):
         self.total_amount = sum(item.total_price for item in self.items)
+        self.item_count = len(self.items)
+        self.total_quantity = sum(item.quantity or 0 for item in self.items)
         self.updated_at = datetime.utcnow()
         return self.total_amount
     
@@ -25,7 +32,8 @@ class Cart(db.Model):
             'user_id': self.user_id,
             'status': self.status,
             'total_amount': self.total_amount,
-            'item_count': len(self.items),
+            'item_count': self.item_count or 0,
+            'total_quantity': self.total_quantity or 0,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -45,6 +53,11 @@ class CartItem(db.Model):
     # Relación con el producto
     product = db.relationship('Product', backref='cart_items')
     
+    # Una partida por producto: las altas hacen UPSERT sobre esta llave
+    __table_args__ = (
+        db.UniqueConstraint('cart_id', 'product_id', name='uq_cart_items_cart_product'),
+    )
+    
     def calculate_total(self):
         self.total_price = self.unit_price * self.quantity
         self.updated_at = datetime.utcnow()
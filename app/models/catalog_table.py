@@ -0,0 +1,508 @@
+import hashlib
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+try:
+    import numpy as np
+except ImportError:  # NumPy está en requirements.txt; sin él las mismas operaciones se hacen con listas (lento)
+    np = None
+
+# Criterios de boost_popular_products (puntos que suma cada uno)
+POPULAR_BRANDS = ('apple', 'samsung', 'dell', 'hp', 'lenovo', 'cisco', 'microsoft', 'asus')
+POPULAR_CATEGORIES = ('laptop', 'smartphone', 'tablet', 'monitor', 'notebook', 'computadora')
+BOOST_DISPONIBLE = 15
+BOOST_MARCA = 10
+BOOST_CATEGORIA = 8
+BOOST_IMAGENES = 5
+BOOST_DESCRIPCION = 3
+
+ORDENES = ('relevance', 'price_asc', 'price_desc', 'name')
+
+
+def _disponible(availability) -> bool:
+    if isinstance(availability, dict):
+        return bool(availability.get('available'))
+    return isinstance(availability, bool) and availability
+
+
+class ColumnTable:
+    """
+    Tabla columnar de productos: una columna por atributo (precio,
+    disponibilidad, id de marca, id de categoría...) y pools de cadenas para
+    marcas y categorías. Filtrar, ordenar y calcular el boost son
+    operaciones de máscara sobre columnas completas (NumPy) en lugar de
+    recorrer diccionarios; sin NumPy las columnas son listas.
+    """
+
+    def __init__(self, price, available, vendor, category, has_images, description_length):
+        n = len(price)
+        self.size = n
+
+        # Pools de cadenas: cada fila guarda solo el índice
+        self.vendors: List[str] = []
+        self.categories: List[str] = []
+        vendor_ids = self._pool(vendor, self.vendors)
+        category_ids = self._pool(category, self.categories)
+
+        marca_popular = [any(b in v.lower() for b in POPULAR_BRANDS) for v in self.vendors]
+        categoria_popular = [any(c in v.lower() for c in POPULAR_CATEGORIES) for v in self.categories]
+
+        if np is not None:
+            self.price = np.array([np.nan if p is None else p for p in price], dtype=np.float64)
+            self.available = np.array(available, dtype=bool)
+            self.vendor_id = np.array(vendor_ids, dtype=np.int32)
+            self.category_id = np.array(category_ids, dtype=np.int32)
+            has_images = np.array(has_images, dtype=bool)
+            description_length = np.array(description_length, dtype=np.int32)
+            # Índice -1 (sin marca / categoría) apunta al False agregado al final
+            marca_popular = np.array(marca_popular + [False], dtype=bool)
+            categoria_popular = np.array(categoria_popular + [False], dtype=bool)
+            self.boost = (
+                BOOST_DISPONIBLE * self.available
+                + BOOST_MARCA * marca_popular[self.vendor_id]
+                + BOOST_CATEGORIA * categoria_popular[self.category_id]
+                + BOOST_IMAGENES * has_images
+                + BOOST_DESCRIPCION * (description_length > 50)
+            ).astype(np.int32)
+        else:
+            self.price = list(price)
+            self.available = [bool(a) for a in available]
+            self.vendor_id = vendor_ids
+            self.category_id = category_ids
+            self.boost = [
+                BOOST_DISPONIBLE * a
+                + (BOOST_MARCA if v >= 0 and marca_popular[v] else 0)
+                + (BOOST_CATEGORIA if c >= 0 and categoria_popular[c] else 0)
+                + BOOST_IMAGENES * bool(i)
+                + (BOOST_DESCRIPCION if d > 50 else 0)
+                for a, v, c, i, d in zip(self.available, vendor_ids, category_ids, has_images, description_length)
+            ]
+
+        self._vendor_index = {v: i for i, v in enumerate(self.vendors)}
+        self._category_index = {c: i for i, c in enumerate(self.categories)}
+
+    @staticmethod
+    def _pool(valores, pool: List[str]) -> List[int]:
+        indices: Dict[str, int] = {}
+        resultado = []
+        for valor in valores:
+            if not valor:
+                resultado.append(-1)
+                continue
+            indice = indices.get(valor)
+            if indice is None:
+                indice = indices[valor] = len(pool)
+                pool.append(valor)
+            resultado.append(indice)
+        return resultado
+
+    @classmethod
+    def from_products(cls, products: Sequence[Dict]) -> 'ColumnTable':
+        """Columnas a partir de productos en formato de la API (una sola pasada)."""
+        price, available, vendor, category, images, length = [], [], [], [], [], []
+        for p in products:
+            pricing = p.get('pricing') or {}
+            price.append(pricing.get('customerPrice') if isinstance(pricing, dict) else None)
+            available.append(_disponible(p.get('availability')))
+            vendor.append(p.get('vendorName'))
+            category.append(p.get('category'))
+            images.append(bool(p.get('productImages')))
+            length.append(len(str(p.get('description', ''))))
+        return cls(price, available, vendor, category, images, length)
+
+    # ==================== OPERACIONES ====================
+
+    def _ids_de(self, nombres, index: Dict[str, int]) -> List[int]:
+        return [index[n] for n in nombres if n in index]
+
+    def mask(self, filters: Dict, base=None):
+        """
+        Máscara de filas que cumplen los filtros (mismas llaves que
+        advanced_search_filters: min_price, max_price, in_stock_only,
+        vendors, categories). Sin precio cuenta como 0 para el mínimo y
+        como infinito para el máximo.
+        """
+        filters = filters or {}
+        vendor_ids = self._ids_de(filters.get('vendors') or (), self._vendor_index)
+        category_ids = self._ids_de(filters.get('categories') or (), self._category_index)
+
+        if np is not None:
+            mask = np.ones(self.size, dtype=bool) if base is None else base.copy()
+            if 'min_price' in filters:
+                mask &= np.nan_to_num(self.price, nan=0.0) >= filters['min_price']
+            if 'max_price' in filters:
+                mask &= np.where(np.isnan(self.price), np.inf, self.price) <= filters['max_price']
+            if filters.get('in_stock_only'):
+                mask &= self.available
+            if filters.get('vendors'):
+                mask &= np.isin(self.vendor_id, vendor_ids)
+            if filters.get('categories'):
+                mask &= np.isin(self.category_id, category_ids)
+            return mask
+
+        mask = [True] * self.size if base is None else list(base)
+        minimo = filters.get('min_price')
+        maximo = filters.get('max_price')
+        solo_existencia = filters.get('in_stock_only')
+        marcas = set(vendor_ids) if filters.get('vendors') else None
+        categorias = set(category_ids) if filters.get('categories') else None
+        for i in range(self.size):
+            if not mask[i]:
+                continue
+            precio = self.price[i]
+            if minimo is not None and (precio if precio is not None else 0) < minimo:
+                mask[i] = False
+            elif maximo is not None and (precio is None or precio > maximo):
+                mask[i] = False
+            elif solo_existencia and not self.available[i]:
+                mask[i] = False
+            elif marcas is not None and self.vendor_id[i] not in marcas:
+                mask[i] = False
+            elif categorias is not None and self.category_id[i] not in categorias:
+                mask[i] = False
+        return mask
+
+    def positions(self, mask) -> List[int]:
+        if np is not None:
+            return np.flatnonzero(mask)
+        return [i for i, ok in enumerate(mask) if ok]
+
+    def order(self, positions, sort: str = 'relevance', name_rank=None):
+        """Posiciones ordenadas (estable) por relevancia, precio o nombre."""
+        if np is not None:
+            positions = np.asarray(positions, dtype=np.int64)
+            if sort in ('price_asc', 'price_desc'):
+                precios = self.price[positions]
+                llave = -precios if sort == 'price_desc' else precios
+                # Sin precio al final en ambos sentidos
+                return positions[np.lexsort((llave, np.isnan(precios)))]
+            if sort == 'name' and name_rank is not None:
+                return positions[np.argsort(name_rank[positions], kind='stable')]
+            return positions[np.argsort(-self.boost[positions], kind='stable')]
+
+        positions = list(positions)
+        if sort in ('price_asc', 'price_desc'):
+            signo = -1 if sort == 'price_desc' else 1
+            return sorted(positions, key=lambda i: (self.price[i] is None, signo * (self.price[i] or 0)))
+        if sort == 'name' and name_rank is not None:
+            return sorted(positions, key=lambda i: name_rank[i])
+        return sorted(positions, key=lambda i: -self.boost[i])
+
+
+class CatalogTable(ColumnTable):
+    """Instantánea columnar del catálogo local (productos activos, ordenados por id)."""
+
+    def __init__(self, rows):
+        ids, part_numbers, descriptions, vendor_pns, currencies, images, availability = [], [], [], [], [], [], []
+        price, available, vendor, category, has_images, length = [], [], [], [], [], []
+        for (product_id, ingram_pn, description, vendor_name, vendor_pn, categoria,
+             base_price, currency, image_url, metadata_json) in rows:
+            metadata = {}
+            if metadata_json:
+                try:
+                    metadata = json.loads(metadata_json) or {}
+                except ValueError:
+                    metadata = {}
+            imagenes = metadata.get('productImages') or ([image_url] if image_url else [])
+            disponibilidad = metadata.get('availability', {})
+
+            ids.append(product_id)
+            part_numbers.append(ingram_pn)
+            descriptions.append(description or '')
+            vendor_pns.append(vendor_pn or '')  # ImageHandler hace .strip() sobre este campo
+            currencies.append(currency)
+            images.append(imagenes[:1])
+            availability.append(disponibilidad if isinstance(disponibilidad, dict) else {})
+            price.append(base_price)
+            available.append(_disponible(disponibilidad))
+            vendor.append(vendor_name)
+            category.append(categoria)
+            has_images.append(bool(imagenes))
+            length.append(len(description or ''))
+
+        super().__init__(price, available, vendor, category, has_images, length)
+        self.part_numbers = part_numbers
+        self.descriptions = descriptions
+        self.vendor_part_numbers = vendor_pns
+        self.currencies = currencies
+        self.images = images
+        self.availability = availability
+        self.fingerprint = ''
+
+        nombres = [d.lower() for d in descriptions]
+        orden_nombre = sorted(range(len(nombres)), key=nombres.__getitem__)
+        rank = [0] * len(nombres)
+        for posicion, i in enumerate(orden_nombre):
+            rank[i] = posicion
+        self._nombres = nombres
+        self._nombres_ordenados = [nombres[i] for i in orden_nombre]
+        self._llaves: Dict[str, object] = {}
+        if np is not None:
+            self.ids = np.array(ids, dtype=np.int64)
+            self.name_rank = np.array(rank, dtype=np.int32)
+        else:
+            self.ids = ids
+            self.name_rank = rank
+
+    def mask_ids(self, product_ids):
+        """Máscara de las filas cuyos ids están en product_ids (p. ej. el resultado de una búsqueda de texto)."""
+        if np is not None:
+            return np.isin(self.ids, np.asarray(list(product_ids), dtype=np.int64))
+        permitidos = set(product_ids)
+        return [i in permitidos for i in self.ids]
+
+    def row(self, i: int, fields: Optional[Sequence[str]] = None) -> Dict:
+        """Fila en el formato de producto de la API (como buscar_local_avanzado); fields limita las llaves."""
+        i = int(i)
+        vendor_id = int(self.vendor_id[i])
+        category_id = int(self.category_id[i])
+        precio = self.price[i]
+        if np is not None and np.isnan(precio):
+            precio = None
+        producto = {
+            'ingramPartNumber': self.part_numbers[i],
+            'description': self.descriptions[i],
+            'vendorName': self.vendors[vendor_id] if vendor_id >= 0 else None,
+            'vendorPartNumber': self.vendor_part_numbers[i],
+            'category': self.categories[category_id] if category_id >= 0 else None,
+            'pricing': {
+                'customerPrice': float(precio) if precio is not None else None,
+                'currencyCode': self.currencies[i]
+            },
+            'productImages': self.images[i],
+            'availability': self.availability[i],
+            'es_local': True,
+        }
+        if fields:
+            return {campo: producto[campo] for campo in fields if campo in producto}
+        return producto
+
+    def select(self, filters: Dict, sort: str = 'relevance', offset: int = 0, limit: int = 25,
+               product_ids=None) -> Tuple[List[Dict], int]:
+        """Filtra, ordena y pagina. Devuelve (productos de la página, total)."""
+        base = self.mask_ids(product_ids) if product_ids is not None else None
+        posiciones = self.positions(self.mask(filters, base))
+        total = len(posiciones)
+        ordenadas = self.order(posiciones, sort if sort in ORDENES else 'relevance', self.name_rank)
+        return [self.row(i) for i in ordenadas[offset:offset + limit]], total
+
+    # ==================== PAGINACIÓN POR CURSOR ====================
+
+    def _llave_orden(self, sort: str):
+        """
+        Llave primaria de cada fila para un orden; con el id como desempate
+        reproduce exactamente order(). Sin precio se codifica como infinito
+        (al final en ambos sentidos) y en 'name' las descripciones iguales
+        comparten llave.
+        """
+        llave = self._llaves.get(sort)
+        if llave is not None:
+            return llave
+        if sort == 'name':
+            valores = [bisect_left(self._nombres_ordenados, nombre) for nombre in self._nombres]
+        elif sort in ('price_asc', 'price_desc'):
+            signo = -1.0 if sort == 'price_desc' else 1.0
+            valores = [float('inf') if p is None or p != p else signo * p for p in self.price]
+        else:
+            valores = [-int(b) for b in self.boost]
+        if np is not None:
+            llave = np.array(valores, dtype=np.int64 if sort in ('name', 'relevance') else np.float64)
+        else:
+            llave = valores
+        self._llaves[sort] = llave
+        return llave
+
+    def _cursor_de(self, i: int, sort: str) -> List:
+        """Llave de orden de una fila para el cursor: [valor, id] (en 'name' el valor es la descripción)."""
+        i = int(i)
+        if sort == 'name':
+            return [self._nombres[i], int(self.ids[i])]
+        valor = self._llave_orden(sort)[i]
+        valor = float(valor) if sort != 'relevance' else int(valor)
+        return [None if valor == float('inf') else valor, int(self.ids[i])]
+
+    def cursor_for_id(self, product_id, sort: str) -> Optional[List]:
+        """Llave de cursor [valor, id] del producto en esta instantánea, o None si ya no está."""
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            return None
+        if np is not None:
+            posiciones = np.flatnonzero(self.ids == product_id)
+            if not len(posiciones):
+                return None
+            return self._cursor_de(posiciones[0], sort)
+        try:
+            return self._cursor_de(self.ids.index(product_id), sort)
+        except ValueError:
+            return None
+
+    def _mask_cursor(self, after: Sequence, sort: str):
+        """Filas que van después del cursor: (llave, id) > (llave del cursor, id del cursor)."""
+        llave = self._llave_orden(sort)
+        valor, ultimo_id = after[0], int(after[1])
+        if sort == 'name':
+            nombre = str(valor)
+            valor = bisect_left(self._nombres_ordenados, nombre)
+            if valor >= len(self._nombres_ordenados) or self._nombres_ordenados[valor] != nombre:
+                # La descripción ya no existe: todo lo que ordena a partir de ella va después
+                ultimo_id = -1
+        elif valor is None:
+            valor = float('inf')
+
+        if np is not None:
+            return (llave > valor) | ((llave == valor) & (self.ids > ultimo_id))
+        return [k > valor or (k == valor and product_id > ultimo_id)
+                for k, product_id in zip(llave, self.ids)]
+
+    def page(self, filters: Dict, sort: str = 'relevance', after: Optional[Sequence] = None, limit: int = 25,
+             product_ids=None) -> Tuple[List[int], int, Optional[List]]:
+        """
+        Página por llave (estable aunque se reconstruya la instantánea):
+        (posiciones de la página, total sin cursor, llave del último o None).
+        """
+        sort = sort if sort in ORDENES else 'relevance'
+        base = self.mask_ids(product_ids) if product_ids is not None else None
+        mask = self.mask(filters, base)
+        if np is not None:
+            total = int(np.count_nonzero(mask))
+            if after:
+                mask &= self._mask_cursor(after, sort)
+        else:
+            total = sum(mask)
+            if after:
+                mask = [a and b for a, b in zip(mask, self._mask_cursor(after, sort))]
+        ordenadas = self.order(self.positions(mask), sort, self.name_rank)
+        pagina = ordenadas[:limit]
+        siguiente = self._cursor_de(pagina[-1], sort) if len(ordenadas) > limit else None
+        return [int(i) for i in pagina], total, siguiente
+
+
+class CatalogTableEngine:
+    """
+    Mantiene la instantánea columnar del catálogo local. Se reconstruye
+    cuando cambia la tabla de productos (como máximo una vez por
+    REBUILD_MIN_INTERVAL segundos), leyendo filas planas sin ORM.
+    """
+
+    REBUILD_MIN_INTERVAL = 60
+    MAX_AGE = 600
+
+    def __init__(self):
+        self._table: Optional[CatalogTable] = None
+        self._built_at = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def listen(self, model):
+        """Marca la instantánea como desactualizada cuando cambian los productos."""
+        if self._listening:
+            return
+        self._listening = True
+
+        def _marcar(mapper, connection, target):
+            self._dirty = True
+
+        for evento in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, evento, _marcar)
+
+    def _build(self) -> CatalogTable:
+        from app import db
+        from app.models.product import Product
+
+        rows = db.session.query(
+            Product.id, Product.ingram_part_number, Product.description, Product.vendor_name,
+            Product.vendor_part_number, Product.category, Product.base_price, Product.currency,
+            Product.image_url, Product.metadata_json
+        ).filter(Product.is_active == True).order_by(Product.id).all()
+        if np is None:
+            print("⚠️ NumPy no está instalado: el catálogo columnar filtra y ordena con listas de Python "
+                  "(lento con catálogos grandes). Instala requirements.txt.")
+        table = CatalogTable(rows)
+        # Huella del contenido: igual en todos los workers que ven los mismos datos (ETag de la API)
+        table.fingerprint = hashlib.sha1(repr([tuple(r) for r in rows]).encode()).hexdigest()[:16]
+        return table
+
+    def get_table(self) -> CatalogTable:
+        edad = time.time() - self._built_at
+        if self._table is not None and edad < self.MAX_AGE and (
+                not self._dirty or edad < self.REBUILD_MIN_INTERVAL):
+            return self._table
+
+        with self._lock:
+            edad = time.time() - self._built_at
+            if self._table is None or edad >= self.MAX_AGE or (
+                    self._dirty and edad >= self.REBUILD_MIN_INTERVAL):
+                self._dirty = False
+                self._table = self._build()
+                self._built_at = time.time()
+        return self._table
+
+
+# Instancia global
+catalog_table = CatalogTableEngine()
+
+
+def benchmark_column_table(n_products: int = 100_000, repeats: int = 5) -> Dict:
+    """
+    Micro-benchmark de ColumnTable: filtro (precio, existencia, marca) y
+    orden por precio sobre n_products productos sintéticos, contra el mismo
+    filtro y orden recorriendo la lista de diccionarios. Devuelve el backend
+    activo ('numpy' o 'python'), ms por operación y si ambos resultados coinciden.
+    """
+    vendors = ['HP', 'Dell', 'Lenovo', 'Samsung', 'Cisco', 'Apple', 'Kingston', 'Logitech']
+    categories = ['Laptops', 'Monitores', 'Memorias', 'Redes', 'Accesorios']
+    productos = []
+    for i in range(n_products):
+        productos.append({
+            'ingramPartNumber': f"SKU{i:07d}",
+            'description': f"Producto {i} " + 'x' * (i % 80),
+            'vendorName': vendors[i % len(vendors)],
+            'category': categories[(i * 7) % len(categories)],
+            'pricing': {'customerPrice': None if i % 97 == 0 else float((i * 7919) % 50000) / 10},
+            'availability': {'available': i % 3 != 0},
+            'productImages': ['img'] if i % 4 else [],
+        })
+    filtros = {'min_price': 500.0, 'max_price': 3000.0, 'in_stock_only': True, 'vendors': ['HP', 'Dell', 'Lenovo']}
+
+    inicio = time.perf_counter()
+    table = ColumnTable.from_products(productos)
+    construccion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for _ in range(repeats):
+        columnar = table.order(table.positions(table.mask(filtros)), 'price_asc')
+    columnar_ms = (time.perf_counter() - inicio) / repeats * 1000
+
+    marcas = set(filtros['vendors'])
+    inicio = time.perf_counter()
+    for _ in range(repeats):
+        filtrados = []
+        for i, p in enumerate(productos):
+            precio = p['pricing']['customerPrice']
+            if (precio if precio is not None else 0) < filtros['min_price']:
+                continue
+            if precio is None or precio > filtros['max_price']:
+                continue
+            if not _disponible(p['availability']) or p['vendorName'] not in marcas:
+                continue
+            filtrados.append(i)
+        listas = sorted(filtrados, key=lambda i: productos[i]['pricing']['customerPrice'])
+    listas_ms = (time.perf_counter() - inicio) / repeats * 1000
+
+    return {
+        'backend': 'numpy' if np is not None else 'python',
+        'products': n_products,
+        'matches': len(listas),
+        'build_ms': round(construccion * 1000, 1),
+        'column_ms': round(columnar_ms, 3),
+        'list_ms': round(listas_ms, 3),
+        'speedup': round(listas_ms / columnar_ms, 1) if columnar_ms else None,
+        'same_result': [int(i) for i in columnar] == listas,
+    }
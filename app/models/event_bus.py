@@ -0,0 +1,267 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+
+
+class AdminEventBus:
+    """
+    Bus de eventos del panel de administración (SSE y long-poll).
+    - Los eventos de mapper de Quote, Purchase y User escriben una fila en
+      admin_events dentro de la misma transacción del cambio: si el cambio
+      se revierte, el evento también.
+    - Un solo hilo por worker lee los eventos nuevos (id > último visto),
+      recalcula una vez la instantánea de estadísticas y despierta a las
+      conexiones abiertas. Sin importar cuántas pestañas del admin estén
+      abiertas, cada worker hace una consulta por intervalo y recalcula las
+      estadísticas una vez por cambio.
+    - Un commit en este worker despierta al hilo de inmediato; los de otros
+      workers se ven en el siguiente intervalo.
+    """
+
+    BUFFER_SIZE = 500
+    STATS_MAX_AGE = 60          # cambios sin evento (borrados masivos, otros procesos)
+    RETENTION = timedelta(days=1)
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self, poll_interval: float = 2.0):
+        self.poll_interval = poll_interval
+        self._app = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=self.BUFFER_SIZE)
+        self._seq: Optional[int] = None
+        self._stats = (None, 0.0, None)     # (secuencia, calculado en, estadísticas)
+        self._pruned_at = 0.0
+        self._listening = False
+        self._local_changes = False
+
+    def init_app(self, app):
+        self._app = app
+        self.poll_interval = app.config.get('ADMIN_EVENTS_POLL_SECONDS', self.poll_interval)
+
+    # ==================== PUBLICACIÓN ====================
+
+    def listen(self, quote_model, purchase_model, user_model):
+        """Publica nuevas cotizaciones/compras/usuarios y cambios de estado."""
+        if self._listening:
+            return
+        self._listening = True
+        from sqlalchemy.orm import Session
+
+        def _publicar(connection, kind, payload):
+            from app.models.admin_event import AdminEvent
+            connection.execute(AdminEvent.__table__.insert().values(kind=kind, payload=json.dumps(payload)))
+            self._local_changes = True
+
+        def _estado_anterior(target):
+            historia = inspect(target).attrs.status.history
+            if not historia.has_changes():
+                return False, None
+            return True, historia.deleted[0] if historia.deleted else None
+
+        def _nueva_cotizacion(mapper, connection, target):
+            _publicar(connection, 'quote.new', {
+                'id': target.id, 'quote_number': target.quote_number,
+                'user_id': target.user_id, 'status': target.status,
+                'total': target.total_amount or 0
+            })
+
+        def _estado_cotizacion(mapper, connection, target):
+            cambio, anterior = _estado_anterior(target)
+            if cambio:
+                _publicar(connection, 'quote.status', {
+                    'id': target.id, 'quote_number': target.quote_number,
+                    'status': target.status, 'previous': anterior
+                })
+
+        def _nueva_compra(mapper, connection, target):
+            _publicar(connection, 'purchase.new', {
+                'id': target.id, 'order_number': target.order_number,
+                'status': target.status, 'total': target.total_amount or 0
+            })
+
+        def _estado_compra(mapper, connection, target):
+            cambio, anterior = _estado_anterior(target)
+            if cambio:
+                _publicar(connection, 'purchase.status', {
+                    'id': target.id, 'order_number': target.order_number,
+                    'status': target.status, 'previous': anterior
+                })
+
+        def _nuevo_usuario(mapper, connection, target):
+            _publicar(connection, 'user.new', {'id': target.id})
+
+        def _despertar(session):
+            if self._local_changes:
+                self._local_changes = False
+                self._wakeup.set()
+
+        event.listen(quote_model, 'after_insert', _nueva_cotizacion)
+        event.listen(quote_model, 'after_update', _estado_cotizacion)
+        event.listen(purchase_model, 'after_insert', _nueva_compra)
+        event.listen(purchase_model, 'after_update', _estado_compra)
+        event.listen(user_model, 'after_insert', _nuevo_usuario)
+        event.listen(Session, 'after_commit', _despertar)
+
+    # ==================== HILO DE LECTURA ====================
+
+    def _ensure_thread(self):
+        if self._thread is None and self._app is not None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='admin-events', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._poll()
+            except Exception as e:
+                print(f"Error leyendo eventos del admin: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _poll(self):
+        from app import db
+        from app.models.admin_event import AdminEvent
+
+        with self._app.app_context():
+            try:
+                if self._seq is None:
+                    # Arranque: solo interesan los eventos a partir de ahora
+                    with self._cond:
+                        self._seq = db.session.query(db.func.max(AdminEvent.id)).scalar() or 0
+                        self._cond.notify_all()
+                    return
+
+                filas = AdminEvent.query.filter(AdminEvent.id > self._seq)\
+                    .order_by(AdminEvent.id).limit(self.BUFFER_SIZE).all()
+                if filas:
+                    eventos = [self._como_dict(fila) for fila in filas]
+                    # Estadísticas recalculadas una vez por lote, antes de despertar a las conexiones
+                    stats = self._calcular_stats()
+                    with self._cond:
+                        self._buffer.extend(eventos)
+                        self._seq = eventos[-1]['id']
+                        self._stats = (self._seq, time.time(), stats)
+                        self._cond.notify_all()
+
+                if time.time() - self._pruned_at > self.PRUNE_INTERVAL:
+                    self._pruned_at = time.time()
+                    AdminEvent.query.filter(AdminEvent.created_at < datetime.utcnow() - self.RETENTION)\
+                        .delete(synchronize_session=False)
+                    db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _como_dict(fila) -> Dict:
+        try:
+            data = json.loads(fila.payload) if fila.payload else {}
+        except ValueError:
+            data = {}
+        return {
+            'id': fila.id,
+            'kind': fila.kind,
+            'data': data,
+            'created_at': fila.created_at.isoformat() if fila.created_at else None
+        }
+
+    # ==================== LECTURA ====================
+
+    @property
+    def last_id(self) -> int:
+        self._ensure_thread()
+        return self._seq or 0
+
+    def events_since(self, since: int, limit: int = BUFFER_SIZE) -> List[Dict]:
+        """Eventos con id > since: del buffer en memoria o, si son más viejos, de la tabla."""
+        with self._cond:
+            eventos = [e for e in self._buffer if e['id'] > since]
+            cubierto = bool(self._buffer) and self._buffer[0]['id'] <= since + 1
+        if cubierto or self._seq is None or since >= self._seq:
+            return eventos[:limit]
+        try:
+            from app.models.admin_event import AdminEvent
+            filas = AdminEvent.query.filter(AdminEvent.id > since, AdminEvent.id <= self._seq)\
+                .order_by(AdminEvent.id).limit(limit).all()
+            return [self._como_dict(fila) for fila in filas]
+        except Exception as e:
+            print(f"Error leyendo eventos del admin: {e}")
+            return eventos[:limit]
+
+    def wait(self, since: int, timeout: float) -> Tuple[List[Dict], int]:
+        """
+        Bloquea hasta que haya eventos con id > since o se agote el tiempo.
+        Devuelve (eventos, último id) sin consultar la BD; el último id es el
+        `since` de la siguiente espera.
+        """
+        self._ensure_thread()
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq is not None and self._seq > since, timeout)
+            return [e for e in self._buffer if e['id'] > since], max(since, self._seq or 0)
+
+    def stats(self, cached_only: bool = False) -> Optional[Dict]:
+        """
+        Instantánea de estadísticas del admin. Se recalcula solo si hubo
+        eventos desde el último cálculo (o pasó STATS_MAX_AGE), no en cada
+        consulta. Con cached_only=True nunca toca la BD (streams abiertos).
+        """
+        self._ensure_thread()
+        seq, calculado, stats = self._stats
+        if cached_only or (stats is not None and seq == self._seq
+                           and time.time() - calculado < self.STATS_MAX_AGE):
+            return stats
+        with self._lock:
+            seq, calculado, stats = self._stats
+            if stats is None or seq != self._seq or time.time() - calculado >= self.STATS_MAX_AGE:
+                seq = self._seq
+                stats = self._calcular_stats()
+                self._stats = (seq, time.time(), stats)
+        return stats
+
+    @staticmethod
+    def _calcular_stats() -> Dict:
+        from app import db
+        from app.models import User, Quote, Purchase
+        from sqlalchemy import func, extract
+
+        ahora = datetime.now()
+        compras = dict(
+            db.session.query(Purchase.status, func.count(Purchase.id)).group_by(Purchase.status).all()
+        )
+        monthly_revenue = db.session.query(func.sum(Purchase.total_amount)).filter(
+            Purchase.status.in_(['paid', 'shipped', 'delivered']),
+            extract('month', Purchase.created_at) == ahora.month,
+            extract('year', Purchase.created_at) == ahora.year
+        ).scalar() or 0
+        today_purchases = Purchase.query.filter(func.date(Purchase.created_at) == ahora.date()).count()
+
+        return {
+            'total_users': User.query.count(),
+            'total_quotes': Quote.query.count(),
+            'pending_quotes': Quote.query.filter_by(status='pending').count(),
+            'quotes_today': Quote.query.filter(func.date(Quote.created_at) == ahora.date()).count(),
+            'total_purchases': sum(compras.values()),
+            'pending_purchases': compras.get('pending', 0),
+            'paid_purchases': compras.get('paid', 0),
+            'monthly_revenue': float(monthly_revenue),
+            'today_purchases': today_purchases,
+            # El catálogo local no guarda existencias (vienen de Ingram por producto)
+            'low_stock': 0,
+            'generated_at': datetime.utcnow().isoformat()
+        }
+
+
+# Instancia global
+admin_events = AdminEventBus()
@@ -0,0 +1,283 @@
+import json
+import re
+from bisect import bisect_right
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+
+# Rangos de precio (MXN) para la faceta de precio: (clave, mínimo, máximo exclusivo).
+# Se aplican al precio que ve cada nivel (costo por markup), nunca al costo.
+PRICE_BANDS = (
+    ('0-1000', 0, 1000),
+    ('1000-5000', 1000, 5000),
+    ('5000-10000', 5000, 10000),
+    ('10000-25000', 10000, 25000),
+    ('25000+', 25000, None),
+)
+
+_ORDEN_PRECIO = {clave: i for i, (clave, _, _) in enumerate(PRICE_BANDS)}
+
+FACETAS = ('vendor', 'category', 'subcategory', 'price_band', 'in_stock')
+
+_TOKEN_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def price_band_for(price, markup: float = 1.0) -> Optional[str]:
+    """Rango del precio mostrado: round(costo * markup, 2), como en las tarjetas del catálogo."""
+    if price is None:
+        return None
+    price = round(price * markup, 2)
+    for clave, minimo, maximo in PRICE_BANDS:
+        if price >= minimo and (maximo is None or price < maximo):
+            return clave
+    return None
+
+
+class FacetIndex:
+    """
+    Índice de facetas del catálogo local. Cada valor de faceta y cada token
+    de texto tiene su lista de productos como bitmap (un int de Python), así
+    que filtrar y contar son intersecciones AND + bit_count. Los rangos de
+    precio se indexan una vez por markup (uno por nivel de precios).
+    """
+
+    def __init__(self, rows, markups: Tuple[float, ...] = (1.0,)):
+        self.size = 0
+        self.ids = []
+        self.postings: Dict[str, Dict[str, int]] = {faceta: {} for faceta in FACETAS if faceta != 'price_band'}
+        self.markups = tuple(markups)
+        self.price_bands: Dict[float, Dict[str, int]] = {markup: {} for markup in self.markups}
+        tokens: Dict[str, int] = {}
+
+        for row in rows:
+            (_id, description, vendor, category, subcategory,
+             ingram_pn, vendor_pn, price, metadata_json) = row
+            bit = 1 << self.size
+            self.size += 1
+            self.ids.append(_id)
+
+            self._add('vendor', vendor, bit)
+            self._add('category', category, bit)
+            self._add('subcategory', subcategory, bit)
+            for markup, bandas in self.price_bands.items():
+                banda = price_band_for(price, markup)
+                if banda:
+                    bandas[banda] = bandas.get(banda, 0) | bit
+            self._add('in_stock', 'true' if self._en_existencia(metadata_json) else 'false', bit)
+
+            for campo in (description, vendor, category, subcategory, ingram_pn, vendor_pn):
+                if not campo:
+                    continue
+                for token in _TOKEN_RE.split(str(campo).lower()):
+                    if token:
+                        tokens[token] = tokens.get(token, 0) | bit
+
+        self.all_bits = (1 << self.size) - 1
+        self._tokens = tuple(tokens.items())
+        # Vocabulario en un solo texto para resolver "%palabra%" con str.find
+        self._vocabulario = "\n".join(token for token, _ in self._tokens)
+        self._inicios = []
+        posicion = 0
+        for token, _ in self._tokens:
+            self._inicios.append(posicion)
+            posicion += len(token) + 1
+        self._palabras: Dict[str, int] = {}
+
+    def _add(self, faceta, valor, bit):
+        if valor:
+            postings = self.postings[faceta]
+            postings[valor] = postings.get(valor, 0) | bit
+
+    @staticmethod
+    def _en_existencia(metadata_json) -> bool:
+        if not metadata_json:
+            return False
+        try:
+            availability = json.loads(metadata_json).get('availability', {})
+            return bool(isinstance(availability, dict) and availability.get('available'))
+        except (ValueError, AttributeError):
+            return False
+
+    def _bits_palabra(self, palabra: str) -> int:
+        """Productos con algún token que contiene la palabra (equivalente a ILIKE '%palabra%')."""
+        bits = self._palabras.get(palabra)
+        if bits is not None:
+            return bits
+
+        bits = 0
+        posicion = self._vocabulario.find(palabra)
+        while posicion != -1:
+            idx = bisect_right(self._inicios, posicion) - 1
+            bits |= self._tokens[idx][1]
+            siguiente = self._inicios[idx + 1] if idx + 1 < len(self._inicios) else len(self._vocabulario)
+            posicion = self._vocabulario.find(palabra, siguiente)
+
+        if len(self._palabras) > 5000:
+            self._palabras.clear()
+        self._palabras[palabra] = bits
+        return bits
+
+    def match_query(self, query: str) -> int:
+        """Bitmap de productos que contienen todas las palabras (>2 letras) de la consulta."""
+        bits = self.all_bits
+        for palabra in (query or '').lower().split():
+            if len(palabra) > 2:
+                for parte in _TOKEN_RE.split(palabra):
+                    if parte:
+                        bits &= self._bits_palabra(parte)
+                if not bits:
+                    break
+        return bits
+
+    def ids_for(self, bits: int) -> list:
+        """Ids de producto de un bitmap (en orden de id)."""
+        if bits == self.all_bits:
+            return self.ids
+        texto = bin(bits)[:1:-1]  # bit 0 primero, sin el prefijo '0b'
+        resultado = []
+        posicion = texto.find('1')
+        while posicion != -1:
+            resultado.append(self.ids[posicion])
+            posicion = texto.find('1', posicion + 1)
+        return resultado
+
+    def _postings(self, faceta: str, markup: Optional[float] = None) -> Dict[str, int]:
+        if faceta == 'price_band':
+            return self.price_bands.get(markup, self.price_bands[self.markups[0]])
+        return self.postings.get(faceta, {})
+
+    def filter_bits(self, filters: Dict[str, str], excluir: Optional[str] = None,
+                    markup: Optional[float] = None) -> int:
+        bits = self.all_bits
+        for faceta, valor in filters.items():
+            if faceta == excluir or not valor:
+                continue
+            bits &= self._postings(faceta, markup).get(valor, 0)
+        return bits
+
+    def counts(self, query: str, filters: Dict[str, str], limit: int = 50,
+               markup: Optional[float] = None) -> Dict:
+        """
+        Conteos por valor de cada faceta. Cada faceta se cuenta aplicando todos
+        los filtros excepto el suyo, para poder cambiar de valor dentro de ella.
+        Los rangos de precio son los del nivel de `markup`.
+        """
+        base = self.match_query(query)
+        resultado = {'total': (base & self.filter_bits(filters, markup=markup)).bit_count()}
+
+        for faceta in FACETAS:
+            candidatos = base & self.filter_bits(filters, excluir=faceta, markup=markup)
+            conteos = []
+            if candidatos:
+                for valor, bits in self._postings(faceta, markup).items():
+                    n = (candidatos & bits).bit_count()
+                    if n:
+                        conteos.append((valor, n))
+            if faceta == 'price_band':
+                conteos.sort(key=lambda x: _ORDEN_PRECIO[x[0]])
+            else:
+                conteos.sort(key=lambda x: (-x[1], x[0]))
+            resultado[faceta] = dict(conteos[:limit])
+
+        return resultado
+
+
+class FacetEngine:
+    """
+    Mantiene el índice de facetas del catálogo local y un cache de
+    agregados por consulta. El índice se reconstruye cuando cambia la tabla
+    de productos (como máximo una vez por REBUILD_MIN_INTERVAL segundos).
+    """
+
+    REBUILD_MIN_INTERVAL = 60
+    MAX_AGE = 600
+    MAX_CACHED_QUERIES = 500
+
+    def __init__(self):
+        self._index: Optional[FacetIndex] = None
+        self._built_at = 0.0
+        self._dirty = True
+        self._version = 0
+        self._aggregates: Dict[Tuple, Dict] = {}
+        self._vendors = None
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def listen(self, model):
+        """Marca el índice como desactualizado cuando cambian los productos."""
+        if self._listening:
+            return
+        self._listening = True
+
+        def _marcar(mapper, connection, target):
+            self._dirty = True
+
+        for evento in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, evento, _marcar)
+
+    def _build(self) -> FacetIndex:
+        from app import db
+        from app.models.line_items import CART_MARKUP, QUOTE_MARKUP
+        from app.models.product import Product
+
+        rows = db.session.query(
+            Product.id, Product.description, Product.vendor_name, Product.category,
+            Product.subcategory, Product.ingram_part_number, Product.vendor_part_number,
+            Product.base_price, Product.metadata_json
+        ).filter(Product.is_active == True).order_by(Product.id).all()
+        return FacetIndex(rows, markups=(CART_MARKUP, QUOTE_MARKUP))
+
+    def get_index(self) -> FacetIndex:
+        ahora = time.time()
+        edad = ahora - self._built_at
+        if self._index is not None and edad < self.MAX_AGE and (
+                not self._dirty or edad < self.REBUILD_MIN_INTERVAL):
+            return self._index
+
+        with self._lock:
+            edad = time.time() - self._built_at
+            if self._index is None or edad >= self.MAX_AGE or (
+                    self._dirty and edad >= self.REBUILD_MIN_INTERVAL):
+                self._dirty = False
+                index = self._build()
+                self._index = index
+                self._built_at = time.time()
+                self._version += 1
+                self._aggregates = {}
+                self._vendors = None
+        return self._index
+
+    def facet_counts(self, query: str = '', filters: Optional[Dict[str, str]] = None,
+                     markup: Optional[float] = None) -> Dict:
+        """
+        Conteos de facetas para una consulta y filtros, cacheados por firma.
+        Los rangos de precio son los del nivel de `markup` (por defecto el público).
+        """
+        if markup is None:
+            from app.models.line_items import CART_MARKUP
+            markup = CART_MARKUP
+        filters = {k: v for k, v in (filters or {}).items() if k in FACETAS and v}
+        index = self.get_index()
+        firma = ((query or '').strip().lower(), tuple(sorted(filters.items())), markup)
+
+        aggregates = self._aggregates
+        resultado = aggregates.get(firma)
+        if resultado is None:
+            resultado = index.counts(firma[0], filters, markup=markup)
+            if len(aggregates) >= self.MAX_CACHED_QUERIES:
+                aggregates.pop(next(iter(aggregates)), None)
+            aggregates[firma] = resultado
+        return resultado
+
+    def vendors(self, base_vendors=()) -> list:
+        """Marcas del catálogo local más las marcas comunes, ordenadas una sola vez por versión."""
+        index = self.get_index()
+        if self._vendors is None:
+            self._vendors = sorted(set(base_vendors) | set(index.postings['vendor']))
+        return self._vendors
+
+
+# Instancia global
+facet_engine = FacetEngine()
@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from markupsafe import Markup
+from sqlalchemy import event
+
+
+class ProductCardCache:
+    """
+    Cache LRU del HTML de las tarjetas de producto del catálogo. La llave es
+    (nivel de precios, SKU, versión de precio, huella del contenido): un
+    cambio de precio o de datos del producto produce otra entrada, y la
+    imagen resuelta por get_image_url_enhanced (SerpAPI/Unsplash) y el texto
+    de disponibilidad se calculan una sola vez por tarjeta. Las páginas del
+    catálogo solo concatenan fragmentos ya renderizados.
+
+    La imagen no forma parte de la llave: al cambiar la imagen o el precio de
+    un Product se invalidan sus tarjetas (eventos de mapper) y se puede
+    llamar invalidate(sku) explícitamente.
+    """
+
+    TEMPLATE = '{tier}/catalog/product_card.html'
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: int = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._cards: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._listening = False
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('PRODUCT_CARD_CACHE_SIZE', self.max_entries)
+        self.ttl_seconds = app.config.get('PRODUCT_CARD_CACHE_SECONDS', self.ttl_seconds)
+        app.jinja_env.globals['product_card'] = self.render
+
+    def listen(self, product_model):
+        """Invalida las tarjetas de un producto cuando cambia su precio, imagen o descripción."""
+        if self._listening:
+            return
+        self._listening = True
+
+        def _invalidar(mapper, connection, target):
+            if target.ingram_part_number:
+                self.invalidate(target.ingram_part_number)
+
+        event.listen(product_model, 'after_update', _invalidar)
+        event.listen(product_model, 'after_delete', _invalidar)
+
+    @staticmethod
+    def _llave(tier: str, product: Dict) -> Optional[tuple]:
+        sku = product.get('ingramPartNumber')
+        if not sku:
+            return None
+        pricing = product.get('pricing') or {}
+        precio = (pricing.get('customerPrice'), pricing.get('currencyCode')) if isinstance(pricing, dict) else (None, None)
+        try:
+            disponibilidad = json.dumps(product.get('availability'), sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            disponibilidad = repr(product.get('availability'))
+        huella = hash((
+            product.get('description'), product.get('vendorName'), product.get('extraDescription'),
+            product.get('vendorPartNumber'), disponibilidad
+        ))
+        return (tier, sku, precio, huella)
+
+    def render(self, tier: str, product: Dict, get_image_url_enhanced, get_availability_text) -> Markup:
+        """HTML de la tarjeta del producto para el catálogo `tier` ('client' o 'public')."""
+        from flask import current_app
+
+        llave = self._llave(tier, product) if isinstance(product, dict) else None
+        if llave is not None:
+            entrada = self._cards.get(llave)
+            if entrada is not None and time.time() < entrada[1]:
+                with self._lock:
+                    if llave in self._cards:
+                        self._cards.move_to_end(llave)
+                self.hits += 1
+                return entrada[0]
+
+        self.misses += 1
+        html = Markup(current_app.jinja_env.get_template(self.TEMPLATE.format(tier=tier)).render(
+            p=product,
+            get_image_url_enhanced=get_image_url_enhanced,
+            get_availability_text=get_availability_text
+        ))
+        if llave is not None:
+            with self._lock:
+                self._cards[llave] = (html, time.time() + self.ttl_seconds)
+                self._cards.move_to_end(llave)
+                while len(self._cards) > self.max_entries:
+                    self._cards.popitem(last=False)
+        return html
+
+    def invalidate(self, sku: Optional[str] = None):
+        """Descarta las tarjetas de un SKU (todas las versiones y niveles), o todas."""
+        with self._lock:
+            if sku is None:
+                self._cards.clear()
+                return
+            for llave in [llave for llave in self._cards if llave[1] == sku]:
+                del self._cards[llave]
+
+    def stats(self) -> Dict:
+        return {'entries': len(self._cards), 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses}
+
+
+# Instancia global
+product_cards = ProductCardCache()
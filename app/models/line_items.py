@@ -0,0 +1,291 @@
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+# Markup sobre base_price con el que se guardan las partidas (igual que en las rutas)
+CART_MARKUP = 1.15
+QUOTE_MARKUP = 1.10
+
+# Llave de la sesión con los contadores del carrito activo
+CART_SESSION_KEY = 'cart_counters'
+
+
+class LineItems:
+    """
+    Altas, cambios y bajas de partidas de carrito y cotización con una sola
+    sentencia cada una. Con SQLite/PostgreSQL el alta es un
+    INSERT ... SELECT ... ON CONFLICT (carrito/cotización, producto) DO UPDATE
+    que suma la cantidad, apoyado en las llaves únicas
+    uq_cart_items_cart_product y uq_quote_items_quote_product; dos clics
+    simultáneos ya no pueden crear partidas duplicadas. El total del carrito
+    o cotización se recalcula con un UPDATE en la misma transacción.
+    Con otros motores se usa el ORM.
+
+    Son sentencias de Core: los eventos de mapper de CartItem/QuoteItem no se
+    disparan, así que aquí se invalida el resumen del dashboard del usuario.
+
+    El carrito guarda sus agregados (total_amount, item_count,
+    total_quantity) en la misma sentencia que recalcula el total, y
+    cart_counters() los copia en la sesión firmada para el badge del header.
+    """
+
+    @staticmethod
+    def _insert(table):
+        """insert() del dialecto con soporte de ON CONFLICT, o None."""
+        from app import db
+
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            return None
+        return insert(table)
+
+    @staticmethod
+    def _precio(markup, redondear):
+        from app import db
+        from app.models.product import Product
+
+        precio = db.func.coalesce(Product.base_price, 0) * markup
+        if redondear:
+            precio = db.func.round(db.cast(precio, db.Numeric(14, 4)), 2)
+        return db.cast(precio, db.Float)
+
+    @staticmethod
+    def _upsert(item_model, owner_column, owner_id, part_number, quantity, markup, redondear, extra=None):
+        """
+        Alta o suma de cantidad de una partida en una sola sentencia. El
+        producto se resuelve dentro del INSERT ... SELECT; devuelve False si no
+        existe en el catálogo local.
+        """
+        from app import db
+        from app.models.product import Product
+
+        tabla = item_model.__table__
+        insert = LineItems._insert(tabla)
+        if insert is None:
+            return LineItems._upsert_orm(item_model, owner_column, owner_id, part_number, quantity, markup, redondear, extra)
+
+        precio = LineItems._precio(markup, redondear)
+        extra = extra or {}
+        columnas = [owner_column, 'product_id', 'quantity', 'unit_price', 'total_price'] + list(extra)
+        origen = db.select(
+            db.literal(owner_id), Product.id, db.literal(quantity), precio, precio * quantity,
+            *[db.literal(valor) for valor in extra.values()]
+        ).where(Product.ingram_part_number == part_number)
+
+        stmt = insert.from_select(columnas, origen)
+        nueva_cantidad = tabla.c.quantity + stmt.excluded.quantity
+        set_ = {
+            'quantity': nueva_cantidad,
+            'total_price': tabla.c.unit_price * nueva_cantidad,
+        }
+        if 'updated_at' in extra:
+            set_['updated_at'] = stmt.excluded.updated_at
+        stmt = stmt.on_conflict_do_update(index_elements=[owner_column, 'product_id'], set_=set_)
+        return db.session.execute(stmt).rowcount > 0
+
+    @staticmethod
+    def _upsert_orm(item_model, owner_column, owner_id, part_number, quantity, markup, redondear, extra):
+        from app import db
+        from app.models.product import Product
+
+        product = Product.query.filter_by(ingram_part_number=part_number).first()
+        if not product:
+            return False
+        item = item_model.query.filter_by(**{owner_column: owner_id, 'product_id': product.id}).first()
+        if item:
+            item.quantity += quantity
+            item.calculate_total()
+        else:
+            unit_price = (product.base_price or 0) * markup
+            item = item_model(**{owner_column: owner_id}, product_id=product.id, quantity=quantity,
+                              unit_price=round(unit_price, 2) if redondear else unit_price)
+            item.calculate_total()
+            db.session.add(item)
+        db.session.flush()
+        return True
+
+    @staticmethod
+    def _recalcular_total(owner_model, item_model, owner_column, owner_id, **valores):
+        """UPDATE del total (suma de total_price de sus partidas) en la misma transacción."""
+        from app import db
+
+        subtotal = db.select(db.func.coalesce(db.func.sum(item_model.total_price), 0))\
+            .where(getattr(item_model, owner_column) == owner_id).scalar_subquery()
+        db.session.execute(
+            db.update(owner_model).where(owner_model.id == owner_id)
+            .values(total_amount=subtotal, **valores)
+        )
+
+    @staticmethod
+    def _recalcular_carrito(cart_id, user_id, ahora):
+        """Total, número de partidas y piezas del carrito en un solo UPDATE."""
+        from app import db
+        from app.models.cart import Cart, CartItem
+
+        def agregado(expr):
+            return db.select(expr).where(CartItem.cart_id == cart_id).scalar_subquery()
+
+        db.session.execute(
+            db.update(Cart).where(Cart.id == cart_id).values(
+                total_amount=agregado(db.func.coalesce(db.func.sum(CartItem.total_price), 0)),
+                item_count=agregado(db.func.count(CartItem.id)),
+                total_quantity=agregado(db.func.coalesce(db.func.sum(CartItem.quantity), 0)),
+                updated_at=ahora
+            )
+        )
+        LineItems._olvidar_contadores(user_id)
+
+    @staticmethod
+    def _olvidar_contadores(user_id):
+        """Descarta la copia en sesión si el carrito modificado es del usuario de este request."""
+        from flask import has_request_context, session
+
+        if has_request_context() and str(session.get('user_id', 'anonymous_user')) == str(user_id):
+            session.pop(CART_SESSION_KEY, None)
+
+    @staticmethod
+    def _item_filter(item_model, owner_column, owner_id, part_number):
+        from app import db
+        from app.models.product import Product
+
+        producto = db.select(Product.id).where(Product.ingram_part_number == part_number).scalar_subquery()
+        return db.and_(getattr(item_model, owner_column) == owner_id, item_model.product_id == producto)
+
+    @staticmethod
+    def _invalidar_resumen(user_id):
+        from app.models.user_summary import user_summaries
+        user_summaries.invalidate(user_id)
+
+    # ==================== CARRITO ====================
+
+    @staticmethod
+    def active_cart_id(user_id, create: bool = False) -> Optional[int]:
+        """Id del carrito activo del usuario (lo crea si se pide)."""
+        from app import db
+        from app.models.cart import Cart
+
+        fila = db.session.query(Cart.id).filter_by(user_id=str(user_id), status='active').order_by(Cart.id).first()
+        if fila:
+            return fila[0]
+        if not create:
+            return None
+        cart = Cart(user_id=str(user_id), status='active')
+        db.session.add(cart)
+        db.session.flush()
+        return cart.id
+
+    @staticmethod
+    def add_cart_item(cart_id, user_id, part_number, quantity) -> bool:
+        """Suma `quantity` a la partida (o la crea) y recalcula el total del carrito. No hace commit."""
+        from app.models.cart import CartItem
+
+        ahora = datetime.utcnow()
+        agregado = LineItems._upsert(CartItem, 'cart_id', cart_id, part_number, quantity, CART_MARKUP, True,
+                                     {'created_at': ahora, 'updated_at': ahora})
+        if agregado:
+            LineItems._recalcular_carrito(cart_id, user_id, ahora)
+            LineItems._invalidar_resumen(user_id)
+        return agregado
+
+    @staticmethod
+    def set_cart_item_quantity(cart_id, user_id, part_number, quantity) -> Optional[float]:
+        """Fija la cantidad de una partida existente. Devuelve su nuevo total, o None si no está en el carrito."""
+        from app import db
+        from app.models.cart import CartItem
+
+        ahora = datetime.utcnow()
+        condicion = LineItems._item_filter(CartItem, 'cart_id', cart_id, part_number)
+        resultado = db.session.execute(
+            db.update(CartItem).where(condicion)
+            .values(quantity=quantity, total_price=CartItem.unit_price * quantity, updated_at=ahora)
+            .execution_options(synchronize_session=False)
+        )
+        if not resultado.rowcount:
+            return None
+        LineItems._recalcular_carrito(cart_id, user_id, ahora)
+        LineItems._invalidar_resumen(user_id)
+        total = db.session.query(CartItem.total_price).filter(condicion).scalar()
+        return float(total or 0)
+
+    @staticmethod
+    def remove_cart_item(cart_id, user_id, part_number) -> bool:
+        """Elimina la partida del carrito y recalcula el total. False si no estaba."""
+        from app import db
+        from app.models.cart import CartItem
+
+        resultado = db.session.execute(
+            db.delete(CartItem).where(LineItems._item_filter(CartItem, 'cart_id', cart_id, part_number))
+            .execution_options(synchronize_session=False)
+        )
+        if not resultado.rowcount:
+            return False
+        LineItems._recalcular_carrito(cart_id, user_id, datetime.utcnow())
+        LineItems._invalidar_resumen(user_id)
+        return True
+
+    @staticmethod
+    def cart_counters(user_id) -> Dict:
+        """
+        Partidas, piezas y subtotal del carrito activo. Se responde desde la
+        sesión mientras la copia sea reciente (CART_COUNTERS_SESSION_SECONDS);
+        si no, con una lectura de las columnas del carrito por user_id
+        (indexado), sin cargar partidas ni productos.
+        """
+        from flask import has_request_context, session, current_app
+        from app import db
+        from app.models.cart import Cart
+
+        propio = has_request_context() and str(session.get('user_id', 'anonymous_user')) == str(user_id)
+        if propio:
+            copia = session.get(CART_SESSION_KEY)
+            vigencia = current_app.config.get('CART_COUNTERS_SESSION_SECONDS', 30)
+            if copia and time.time() - copia.get('at', 0) < vigencia:
+                return copia
+
+        fila = db.session.query(Cart.id, Cart.item_count, Cart.total_quantity, Cart.total_amount, Cart.updated_at)\
+            .filter_by(user_id=str(user_id), status='active').order_by(Cart.id).first()
+        contadores = {
+            'cart_id': fila[0] if fila else None,
+            'item_count': (fila[1] or 0) if fila else 0,
+            'total_quantity': (fila[2] or 0) if fila else 0,
+            'subtotal': round(float(fila[3] or 0), 2) if fila else 0.0,
+            'updated_at': fila[4].isoformat() if fila and fila[4] else None,
+            'at': time.time()
+        }
+        if propio:
+            session[CART_SESSION_KEY] = contadores
+        return contadores
+
+    @staticmethod
+    def clear_cart(user_id) -> bool:
+        """Vacía el carrito activo y deja sus contadores en cero. No hace commit."""
+        from app import db
+        from app.models.cart import CartItem
+
+        cart_id = LineItems.active_cart_id(user_id)
+        if cart_id is None:
+            return False
+        db.session.execute(
+            db.delete(CartItem).where(CartItem.cart_id == cart_id).execution_options(synchronize_session=False)
+        )
+        LineItems._recalcular_carrito(cart_id, user_id, datetime.utcnow())
+        LineItems._invalidar_resumen(user_id)
+        return True
+
+    # ==================== COTIZACIÓN ====================
+
+    @staticmethod
+    def add_quote_item(quote_id, user_id, part_number, quantity) -> bool:
+        """Suma `quantity` a la partida de la cotización (o la crea) y recalcula su total. No hace commit."""
+        from app.models.quote import Quote, QuoteItem
+
+        agregado = LineItems._upsert(QuoteItem, 'quote_id', quote_id, part_number, quantity, QUOTE_MARKUP, False,
+                                     {'created_at': datetime.utcnow()})
+        if agregado:
+            LineItems._recalcular_total(Quote, QuoteItem, 'quote_id', quote_id)
+            LineItems._invalidar_resumen(user_id)
+        return agregado
@@ -0,0 +1,187 @@
+import base64
+import json
+from datetime import datetime
+from math import ceil
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, event, or_
+
+from app.models.cache_manager import count_cache
+
+
+def encode_cursor(values: Sequence, page: Optional[int] = None) -> str:
+    """Codifica los valores de la llave de orden de una fila en un cursor opaco."""
+    llave = []
+    for value in values:
+        if isinstance(value, datetime):
+            llave.append(['dt', value.isoformat()])
+        else:
+            llave.append(['v', value])
+    data = {'k': llave}
+    if page is not None:
+        data['p'] = page
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: Optional[str]) -> Tuple[Optional[list], Optional[int]]:
+    """Devuelve (valores, página) de un cursor, o (None, None) si no es válido."""
+    if not token:
+        return None, None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw.decode('utf-8'))
+        valores = []
+        for tipo, value in data['k']:
+            valores.append(datetime.fromisoformat(value) if tipo == 'dt' else value)
+        return valores, data.get('p')
+    except Exception:
+        return None, None
+
+
+def keyset_filter(columns: Sequence, values: Sequence, descending: bool = False):
+    """
+    Condición "fila después del cursor" para un orden (col1, col2, ...).
+    Se arma con OR/AND para que funcione igual en SQLite y PostgreSQL.
+    """
+    condiciones = []
+    for i, column in enumerate(columns):
+        iguales = [columns[j] == values[j] for j in range(i)]
+        siguiente = column < values[i] if descending else column > values[i]
+        condiciones.append(and_(*iguales, siguiente) if iguales else siguiente)
+    return or_(*condiciones)
+
+
+def order_by_keyset(query, columns: Sequence, descending: bool = False):
+    if descending:
+        return query.order_by(*[column.desc() for column in columns])
+    return query.order_by(*columns)
+
+
+def cached_count(query, namespace: str, signature) -> int:
+    """
+    COUNT(*) de la consulta, reutilizado mientras no cambie la tabla. El cache
+    es por proceso y se invalida con eventos del ORM: no ve escrituras de
+    otros procesos ni UPDATE/DELETE masivos o de Core (count_cache expira por TTL).
+    """
+    return count_cache.get_or_compute(namespace, signature, lambda: query.order_by(None).count())
+
+
+class KeysetPagination:
+    """
+    Página de resultados con la misma interfaz que la paginación de
+    Flask-SQLAlchemy (page, pages, has_next, iter_pages...) más next_cursor.
+    """
+
+    def __init__(self, items: List, page: int, per_page: int, total: int,
+                 next_cursor: Optional[str] = None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.next_cursor = next_cursor
+
+    @property
+    def pages(self) -> int:
+        if not self.per_page or not self.total:
+            return 0
+        return int(ceil(self.total / float(self.per_page)))
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+
+    @property
+    def prev_num(self) -> Optional[int]:
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def has_next(self) -> bool:
+        return self.page < self.pages
+
+    @property
+    def next_num(self) -> Optional[int]:
+        return self.page + 1 if self.has_next else None
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        pages_end = self.pages + 1
+        if pages_end == 1:
+            return
+        left_end = min(1 + left_edge, pages_end)
+        yield from range(1, left_end)
+        if left_end == pages_end:
+            return
+        mid_start = max(left_end, self.page - left_current)
+        mid_end = min(self.page + right_current + 1, pages_end)
+        if mid_start - left_end > 0:
+            yield None
+        yield from range(mid_start, mid_end)
+        if mid_end == pages_end:
+            return
+        right_start = max(mid_end, pages_end - right_edge)
+        if right_start - mid_end > 0:
+            yield None
+        yield from range(right_start, pages_end)
+
+
+def paginate_keyset(query, columns: Sequence, page: int = 1, per_page: int = 20,
+                    cursor: Optional[str] = None, descending: bool = False,
+                    count_namespace: Optional[str] = None, count_signature=None) -> KeysetPagination:
+    """
+    Pagina por llave (keyset) cuando el cursor corresponde a la página pedida,
+    de modo que avanzar página a página no depende del OFFSET. En un salto
+    directo a otra página el OFFSET recorre solo las columnas de la llave
+    (índice compuesto) para hallar la última fila de la página anterior, y la
+    página se lee por llave: las filas saltadas no se cargan ni precargan.
+    El total se cachea por firma de filtros si se indica count_namespace.
+    """
+    page = max(page or 1, 1)
+
+    if count_namespace:
+        total = cached_count(query, count_namespace, count_signature)
+    else:
+        total = query.order_by(None).count()
+
+    valores, cursor_page = decode_cursor(cursor)
+    ordered = order_by_keyset(query, columns, descending)
+    fuera_de_rango = False
+    if valores is None or len(valores) != len(columns) or cursor_page not in (None, page):
+        valores = None
+        if page > 1:
+            fila = ordered.with_entities(*columns).offset((page - 1) * per_page - 1).limit(1).first()
+            if fila is None:
+                fuera_de_rango = True
+            elif any(value is None for value in fila):
+                # Llave incompleta (NULL): OFFSET sobre la consulta completa
+                ordered = ordered.offset((page - 1) * per_page)
+            else:
+                valores = list(fila)
+    if valores is not None:
+        ordered = ordered.filter(keyset_filter(columns, valores, descending))
+
+    items = [] if fuera_de_rango else ordered.limit(per_page).all()
+
+    next_cursor = None
+    if items and len(items) == per_page:
+        last = items[-1]
+        valores_last = [getattr(last, column.key) for column in columns]
+        if all(value is not None for value in valores_last):
+            next_cursor = encode_cursor(valores_last, page + 1)
+
+    return KeysetPagination(items, page, per_page, total, next_cursor)
+
+
+_modelos_registrados = set()
+
+
+def invalidate_counts_on_change(model, namespace: str):
+    """Invalida los conteos cacheados de un modelo cuando se insertan, editan o borran filas."""
+    if (model, namespace) in _modelos_registrados:
+        return
+    _modelos_registrados.add((model, namespace))
+
+    def _invalidate(mapper, connection, target):
+        count_cache.invalidate(namespace)
+
+    for evento in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, evento, _invalidate)
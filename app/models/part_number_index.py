@@ -0,0 +1,160 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+_SEPARADORES_RE = re.compile(r'[\s\-_]+')
+
+
+def normalize_part_number(valor) -> str:
+    """Identificador normalizado: sin espacios, guiones ni guiones bajos y en mayúsculas."""
+    if valor is None:
+        return ''
+    return _SEPARADORES_RE.sub('', str(valor)).upper()
+
+
+class PartNumberIndex:
+    """
+    Índice de números de parte: cualquier identificador normalizado
+    (número de parte de Ingram, del fabricante o UPC) -> número de parte de
+    Ingram. Se construye desde la tabla de productos y aprende de todas las
+    respuestas de Ingram, así que la mayoría de las búsquedas por SKU se
+    resuelven sin probar variantes contra la API.
+    - Búsqueda exacta: diccionario (O(1)).
+    - Búsqueda por prefijo: llaves ordenadas + bisect (O(log n + k)).
+    """
+
+    REBUILD_MIN_INTERVAL = 60
+    MAX_AGE = 600
+    MAX_LEARNED = 50000
+
+    def __init__(self):
+        self._exact: Optional[Dict[str, str]] = None
+        self._keys: List[str] = []
+        self._learned: Dict[str, str] = {}
+        self._learned_keys: List[str] = []
+        self._built_at = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def listen(self, model):
+        """Marca el índice como desactualizado cuando cambian los productos."""
+        if self._listening:
+            return
+        self._listening = True
+
+        def _marcar(mapper, connection, target):
+            self._dirty = True
+
+        for evento in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, evento, _marcar)
+
+    def _build(self) -> Dict[str, str]:
+        from app import db
+        from app.models.product import Product
+
+        exact: Dict[str, str] = {}
+        rows = db.session.query(
+            Product.ingram_part_number, Product.vendor_part_number, Product.upc
+        ).filter(Product.is_active == True).all()
+        # Los números de Ingram tienen prioridad sobre los del fabricante y los UPC
+        for posicion in (2, 1, 0):
+            for row in rows:
+                llave = normalize_part_number(row[posicion])
+                if llave:
+                    exact[llave] = row[0]
+        return exact
+
+    def _get_exact(self) -> Dict[str, str]:
+        edad = time.time() - self._built_at
+        if self._exact is not None and edad < self.MAX_AGE and (
+                not self._dirty or edad < self.REBUILD_MIN_INTERVAL):
+            return self._exact
+
+        with self._lock:
+            edad = time.time() - self._built_at
+            if self._exact is None or edad >= self.MAX_AGE or (
+                    self._dirty and edad >= self.REBUILD_MIN_INTERVAL):
+                self._dirty = False
+                try:
+                    exact = self._build()
+                    self._keys = sorted(exact)
+                    self._exact = exact
+                except Exception as e:
+                    print(f"Error construyendo índice de números de parte: {e}")
+                    if self._exact is None:
+                        self._exact = {}
+                self._built_at = time.time()
+        return self._exact
+
+    def add(self, ingram_part_number, *aliases):
+        """Registra un número de parte de Ingram y sus alias (fabricante, UPC, lo que buscó el usuario)."""
+        if not ingram_part_number:
+            return
+        with self._lock:
+            learned = self._learned
+            if len(learned) >= self.MAX_LEARNED:
+                learned.clear()
+                self._learned_keys = []
+            for valor in (ingram_part_number,) + aliases:
+                llave = normalize_part_number(valor)
+                if llave and llave not in learned:
+                    learned[llave] = ingram_part_number
+                    insort(self._learned_keys, llave)
+
+    def learn(self, producto):
+        """Registra los identificadores de un producto de cualquier respuesta de Ingram."""
+        if not isinstance(producto, dict):
+            return
+        ingram_part_number = producto.get('ingramPartNumber')
+        if not ingram_part_number or producto.get('productStatusCode') == 'E':
+            return
+        self.add(ingram_part_number, producto.get('vendorPartNumber'),
+                 producto.get('upc'), producto.get('upcCode'))
+
+    def learn_many(self, productos):
+        for producto in productos or []:
+            self.learn(producto)
+
+    def lookup(self, identificador) -> Optional[str]:
+        """Número de parte de Ingram para un identificador (O(1)), o None."""
+        llave = normalize_part_number(identificador)
+        if not llave:
+            return None
+        encontrado = self._get_exact().get(llave)
+        if encontrado is None:
+            encontrado = self._learned.get(llave)
+        return encontrado
+
+    def prefix(self, identificador, limit: int = 10) -> List[Tuple[str, str]]:
+        """
+        Identificadores que empiezan con el prefijo normalizado:
+        [(identificador, número de parte de Ingram)], un resultado por producto.
+        """
+        llave = normalize_part_number(identificador)
+        if not llave:
+            return []
+        exact = self._get_exact()
+        resultado: List[Tuple[str, str]] = []
+        vistos = set()
+        for keys, valores in ((self._keys, exact), (self._learned_keys, self._learned)):
+            inicio = bisect_left(keys, llave)
+            for posicion in range(inicio, len(keys)):
+                encontrada = keys[posicion]
+                if not encontrada.startswith(llave):
+                    break
+                ingram_part_number = valores.get(encontrada)
+                if ingram_part_number and ingram_part_number not in vistos:
+                    vistos.add(ingram_part_number)
+                    resultado.append((encontrada, ingram_part_number))
+                    if len(resultado) >= limit:
+                        return resultado
+        return resultado
+
+
+# Instancia global
+part_number_index = PartNumberIndex()
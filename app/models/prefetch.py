@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.models.cache_manager import product_cache
+
+
+class CatalogPrefetcher:
+    """
+    Precarga opcional (CATALOG_PREFETCH_ENABLED) del catálogo de Ingram.
+    Cuando se termina de enviar una página del catálogo se encolan, en
+    segundo plano, la siguiente página de la búsqueda y el detalle y precio
+    de los primeros SKUs, para que el siguiente clic del usuario salga del
+    cache de productos.
+    - La cola es acotada: si está llena la precarga se descarta (nunca
+      bloquea una petición).
+    - Las tareas repetidas (en cola o en curso) se ignoran.
+    - Los workers son pocos y hacen una pausa entre tareas para ceder la
+      API y la CPU a las peticiones de los usuarios.
+    """
+
+    MAX_QUEUE = 100
+    PAUSE_SECONDS = 0.05
+
+    def __init__(self):
+        self.enabled = False
+        self.top_skus = 4
+        self.workers = 1
+        self._app = None
+        self._queue = queue.Queue(maxsize=self.MAX_QUEUE)
+        self._pending = set()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats = {'scheduled': 0, 'skipped': 0, 'dropped': 0, 'completed': 0, 'errors': 0}
+
+    def init_app(self, app):
+        self._app = app
+        self.enabled = bool(app.config.get('CATALOG_PREFETCH_ENABLED', False))
+        self.top_skus = int(app.config.get('CATALOG_PREFETCH_TOP_SKUS', self.top_skus))
+        self.workers = max(1, int(app.config.get('CATALOG_PREFETCH_WORKERS', self.workers)))
+
+    # ==================== PROGRAMACIÓN ====================
+
+    def after_catalog_page(self, productos, query="", vendor="", page_number=1, page_size=25,
+                           use_keywords=True, total_pages=1):
+        """
+        Programa la precarga para cuando la respuesta actual termine de
+        enviarse. Llamar desde la vista, justo antes de render_template.
+        """
+        if not self.enabled or self._app is None:
+            return
+        from flask import after_this_request
+
+        skus = []
+        for producto in productos or []:
+            if isinstance(producto, dict) and producto.get('ingramPartNumber'):
+                skus.append(producto['ingramPartNumber'])
+                if len(skus) >= self.top_skus:
+                    break
+        siguiente = page_number + 1 if page_number < total_pages else None
+
+        @after_this_request
+        def _programar(response):
+            response.call_on_close(
+                lambda: self.schedule(query, vendor, siguiente, page_size, use_keywords, skus)
+            )
+            return response
+
+    def schedule(self, query, vendor, next_page: Optional[int], page_size, use_keywords, skus):
+        """Encola lo que aún no esté en el cache de productos."""
+        from app.models.product_utils import ProductUtils
+
+        if next_page:
+            llave = ProductUtils.llave_pagina_catalogo(query, vendor, next_page, page_size, use_keywords)
+            if not product_cache.contains('page', llave):
+                self._put(('page', llave))
+            else:
+                self._stats['skipped'] += 1
+
+        for sku in skus:
+            if not product_cache.contains('detail', sku):
+                self._put(('detail', sku))
+            else:
+                self._stats['skipped'] += 1
+
+        sin_precio = tuple(sku for sku in skus if not product_cache.contains('price', sku))
+        if sin_precio:
+            self._put(('price', sin_precio))
+
+    def _put(self, tarea):
+        with self._lock:
+            if tarea in self._pending:
+                self._stats['skipped'] += 1
+                return
+            try:
+                self._queue.put_nowait(tarea)
+            except queue.Full:
+                self._stats['dropped'] += 1
+                return
+            self._pending.add(tarea)
+            self._stats['scheduled'] += 1
+            self._ensure_threads()
+
+    def _ensure_threads(self):
+        while len(self._threads) < self.workers:
+            hilo = threading.Thread(target=self._run, name=f'catalog-prefetch-{len(self._threads) + 1}',
+                                    daemon=True)
+            self._threads.append(hilo)
+            hilo.start()
+
+    # ==================== WORKERS ====================
+
+    def _run(self):
+        while True:
+            tarea = self._queue.get()
+            try:
+                time.sleep(self.PAUSE_SECONDS)
+                with self._app.app_context():
+                    self._ejecutar(tarea)
+                self._stats['completed'] += 1
+            except Exception as e:
+                self._stats['errors'] += 1
+                print(f"Error en precarga del catálogo {tarea[0]}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(tarea)
+                self._queue.task_done()
+
+    @staticmethod
+    def _ejecutar(tarea):
+        from app.models.product_utils import ProductUtils
+
+        tipo, valor = tarea
+        if tipo == 'page':
+            if not product_cache.contains('page', valor):
+                ProductUtils.consultar_pagina_catalogo(*valor)
+        elif tipo == 'detail':
+            ProductUtils.obtener_detalle_producto(valor)
+        elif tipo == 'price':
+            ProductUtils.obtener_precios_disponibilidad(list(valor))
+
+    def wait(self, timeout: float = 5.0) -> bool:
+        """Espera a que la cola se vacíe (útil en scripts y CLI)."""
+        limite = time.time() + timeout
+        while time.time() < limite:
+            with self._lock:
+                if not self._pending:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def stats(self) -> Dict:
+        return dict(self._stats, enabled=self.enabled, queued=self._queue.qsize())
+
+
+# Instancia global
+catalog_prefetcher = CatalogPrefetcher()
@@ -1,7 +1,18 @@
 from app import db
 from datetime import datetime
+from functools import lru_cache
+import json
 from sqlalchemy import or_, and_
 
+@lru_cache(maxsize=4096)
+def _parse_metadata(raw):
+    """metadata_json ya interpretado. Se cachea por contenido: las vistas no repiten json.loads por partida."""
+    try:
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
 class Product(db.Model):
     __tablename__ = 'products'
     
@@ -25,6 +36,19 @@ class Product(db.Model):
     # quote_items se define aquí con backref
     quote_items = db.relationship('QuoteItem', backref='product', lazy=True)
     
+    @property
+    def metadata_dict(self):
+        """metadata_json como diccionario (solo lectura: es compartido por la cache)."""
+        return _parse_metadata(self.metadata_json) if self.metadata_json else {}
+    
+    @property
+    def product_images(self):
+        return self.metadata_dict.get('productImages', []) or []
+    
+    @property
+    def availability(self):
+        return self.metadata_dict.get('availability', {}) or {}
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -49,6 +73,7 @@ class Product(db.Model):
         """
         Búsqueda avanzada con palabras clave, vendor y category
         """
+        from app.models.pagination import cached_count
         # Construir consulta base
         base_query = cls.query.filter(cls.is_active == True)
         
@@ -87,12 +112,14 @@ class Product(db.Model):
                 )
             )
         
-        # Conteo total y resultados
-        total = base_query.count()
-        resultados = base_query.order_by(cls.description).limit(limit).offset(offset).all()
+        # Conteo total (cacheado por firma de filtros) y resultados
+        firma = ((query or '').strip().lower(), (vendor or '').lower(), (category or '').lower())
+        total = cached_count(base_query, 'products', firma)
+
+        resultados = base_query.order_by(cls.description, cls.id).limit(limit).offset(offset).all()
         
         return resultados, total
-    
+
     @classmethod
     def buscar_con_ranking(cls, query, limit=25):
         """
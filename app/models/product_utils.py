@@ -1,11 +1,19 @@
 from flask import current_app, json
 from app.models.api_client import APIClient
-from app.models.cache_manager import search_cache
+from app.models.cache_manager import search_cache, product_cache
+from app.models.search_metrics import search_metrics, track_search_metrics
+from app.models.part_number_index import part_number_index, normalize_part_number
 import re
 import time
 from datetime import datetime, timedelta
 from collections import defaultdict
 from typing import List, Dict, Set, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Pool compartido para llamadas a Ingram en paralelo dentro de una petición
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
 
 class ProductUtils:
     # Diccionario de palabras clave y términos relacionados
@@ -58,17 +66,14 @@ class ProductUtils:
     }
 
     SEARCH_CACHE_DURATION = 300  # 5 minutos en segundos
-    POPULAR_SEARCHES = defaultdict(int)
-    SEARCH_HISTORY = []
     MAX_SEARCH_HISTORY = 50
     
     # Cache para índice de palabras clave (simula BD)
     _keyword_index = defaultdict(set)
     _index_built = False
 
-    @staticmethod
-    def get_local_vendors():
-        common_vendors = [
+    # Marcas comunes (ordenadas una sola vez al cargar la clase)
+    COMMON_VENDORS = sorted([
             "HP Cómputo", "Dell", "Lenovo", "Cisco", "Apple", "Microsoft", "Adata", "Getttech", "Acteck", "Hpe Accs", "Yeyian",
             "Samsung", "LG", "ASUS", "Acer", "Vorago", "Cnp T5 Enterprise", "NACEB", "Cecotec", "Barco", "Vorago Accs","Sansui",
             "Intel", "AMD", "Meraki", "Logitech", "Kingston", "Seagate", "Manhattan", "Kensington", "Toshiba (Pp)", "CyberPower",
@@ -86,8 +91,41 @@ class ProductUtils:
             "Enson",  "Tripp Lite by Eaton", "Prolicom", "Accvent", "Honor Technologies", "Cnp Enterprise", "Mercusys", "Complet", "Konica Minolta",
             "Iris", "Xbox Accs", "Lenovo Notebook Usd", "Dell Gaming Accesori", "Vector Engineering", "Dell Gaming Desktop", "Mcafee Llc", "KINGSTON AP SSD",
             "Honor Tablet", "KINGSTON AP FLASH", "Premiercom Retail", "Dell Enterprise", "XP PEN", "Wacom", "Hyundai", "Tonivisa", "TJD",
-        ]
-        return sorted(common_vendors)
+    ])
+
+    @staticmethod
+    def get_local_vendors():
+        """Marcas comunes más las del catálogo local (lista ordenada cacheada)."""
+        try:
+            from app.models.facets import facet_engine
+            return facet_engine.vendors(ProductUtils.COMMON_VENDORS)
+        except Exception as e:
+            print(f"Error obteniendo marcas del catálogo local: {e}")
+            return ProductUtils.COMMON_VENDORS
+
+    @staticmethod
+    def get_catalog_facets(query="", vendor="", filters=None, markup=None):
+        """
+        Conteos de facetas del catálogo local para mostrar junto a los
+        resultados. `filters` son los filtros de filtros_catalogo; los rangos
+        de precio son los del nivel de `markup`.
+        """
+        try:
+            from app.models.facets import facet_engine
+            filters = filters or {}
+            filtros = {}
+            if vendor:
+                filtros['vendor'] = vendor
+            if filters.get('categories'):
+                filtros['category'] = filters['categories'][0]
+            if filters.get('subcategory'):
+                filtros['subcategory'] = filters['subcategory']
+            if filters.get('in_stock_only'):
+                filtros['in_stock'] = 'true'
+            return facet_engine.facet_counts(query, filtros, markup)
+        except Exception as e:
+            print(f"Error calculando facetas: {e}")
+            return {}
 
     @staticmethod
     def format_currency(amount, currency_code='MXP'):
@@ -200,9 +238,9 @@ class ProductUtils:
     
     @staticmethod
     def get_popular_searches(limit: int = 10) -> List[Tuple[str, int]]:
-        """Obtiene las búsquedas más populares"""
-        return sorted(ProductUtils.POPULAR_SEARCHES.items(), 
-                     key=lambda x: x[1], reverse=True)[:limit]
+        """Obtiene las búsquedas más populares (todos los workers)"""
+        from app.models.search_analytics import search_analytics
+        return search_analytics.popular(limit)
 
     @staticmethod
     def get_search_suggestions(query: str, limit: int = 8) -> List[str]:
@@ -210,7 +248,8 @@ class ProductUtils:
         suggestions = set()
         
         # Sugerencias del historial
-        for search_term in ProductUtils.SEARCH_HISTORY:
+        from app.models.search_analytics import search_analytics
+        for search_term in search_analytics.recent(ProductUtils.MAX_SEARCH_HISTORY):
             if query.lower() in search_term.lower():
                 suggestions.add(search_term)
         
@@ -226,20 +265,12 @@ class ProductUtils:
     @staticmethod
     def track_search(query: str):
         """Registra una búsqueda en el historial y contador de popularidad"""
-        if not query.strip():
+        if not query or not query.strip():
             return
-            
-        clean_query = query.strip().lower()
-        
-        # Actualizar contador de popularidad
-        ProductUtils.POPULAR_SEARCHES[clean_query] += 1
         
-        # Actualizar historial
-        if clean_query not in ProductUtils.SEARCH_HISTORY:
-            ProductUtils.SEARCH_HISTORY.insert(0, clean_query)
-            # Mantener tamaño máximo
-            if len(ProductUtils.SEARCH_HISTORY) > ProductUtils.MAX_SEARCH_HISTORY:
-                ProductUtils.SEARCH_HISTORY.pop()
+        # Se encola en el worker y se escribe por lotes en search_stats
+        from app.models.search_analytics import search_analytics
+        search_analytics.record(query)
 
     @staticmethod
     def optimize_search_query(query: str) -> str:
@@ -286,40 +317,99 @@ class ProductUtils:
 
     @staticmethod
     def advanced_search_filters(products: List[Dict], filters: Dict) -> List[Dict]:
-        """Aplica filtros avanzados a los resultados de búsqueda"""
-        filtered_products = products.copy()
-        
-        # Filtro por precio
-        if 'min_price' in filters:
-            filtered_products = [p for p in filtered_products 
-                               if p.get('pricing', {}).get('customerPrice', 0) >= filters['min_price']]
-        
-        if 'max_price' in filters:
-            filtered_products = [p for p in filtered_products 
-                               if p.get('pricing', {}).get('customerPrice', float('inf')) <= filters['max_price']]
-        
-        # Filtro por disponibilidad
-        if 'in_stock_only' in filters and filters['in_stock_only']:
-            filtered_products = [p for p in filtered_products 
-                               if p.get('availability', {}).get('available', False)]
-        
-        # Filtro por marca
-        if 'vendors' in filters and filters['vendors']:
-            filtered_products = [p for p in filtered_products 
-                               if p.get('vendorName') in filters['vendors']]
-        
-        # Filtro por categoría
-        if 'categories' in filters and filters['categories']:
-            filtered_products = [p for p in filtered_products 
-                               if p.get('category') in filters['categories']]
-        
-        return filtered_products
+        """Aplica filtros avanzados a los resultados de búsqueda (máscaras sobre columnas, una sola pasada)"""
+        if not products or not filters:
+            return list(products or [])
+        from app.models.catalog_table import ColumnTable
+        columnas = ColumnTable.from_products(products)
+        return [products[i] for i in columnas.positions(columnas.mask(filters))]
+
+    @staticmethod
+    def filtros_catalogo(args, markup: float = 1.0) -> Tuple[Dict, str, str, str]:
+        """
+        Filtros de precio, existencia, categoría y orden de la URL del catálogo:
+        (filtros para advanced_search_filters, orden, query string para la
+        paginación, query string sin categoría/subcategoría para los enlaces de facetas).
+        min_price/max_price llegan en el precio que ve el usuario (costo por
+        `markup`) y se devuelven en costo, que es lo que guarda el catálogo local.
+        """
+        from urllib.parse import urlencode
+        from app.models.catalog_table import ORDENES
+        filtros = {}
+        parametros = {}
+        # Medio centavo de margen: el precio mostrado es round(costo * markup, 2)
+        for nombre, margen in (('min_price', -0.005), ('max_price', 0.005)):
+            valor = args.get(nombre, type=float)
+            if valor is not None:
+                filtros[nombre] = (valor + margen) / markup
+                parametros[nombre] = args.get(nombre)
+        if args.get('in_stock') in ('1', 'true', 'on'):
+            filtros['in_stock_only'] = True
+            parametros['in_stock'] = '1'
+        orden = args.get('sort', '')
+        if orden in ORDENES:
+            parametros['sort'] = orden
+        else:
+            orden = ''
+        facetas_qs = '&' + urlencode(parametros) if parametros else ''
+
+        categoria = args.get('category', '').strip()
+        if categoria:
+            filtros['categories'] = [categoria]
+            parametros['category'] = categoria
+            # La subcategoría solo tiene sentido dentro de una categoría
+            subcategoria = args.get('subcategory', '').strip()
+            if subcategoria:
+                filtros['subcategory'] = subcategoria
+                parametros['subcategory'] = subcategoria
+        filtros_qs = '&' + urlencode(parametros) if parametros else ''
+        return filtros, orden, filtros_qs, facetas_qs
+
+    @staticmethod
+    def ids_catalogo_local(query="", filters=None):
+        """
+        Ids del catálogo local que cumplen la búsqueda de texto y la
+        subcategoría (índice de facetas; la instantánea columnar no tiene
+        subcategoría). None si no hay restricción.
+        """
+        subcategoria = (filters or {}).get('subcategory')
+        if not query and not subcategoria:
+            return None
+        from app.models.facets import facet_engine
+        index = facet_engine.get_index()
+        bits = index.match_query(query) if query else index.all_bits
+        if subcategoria:
+            bits &= index.filter_bits({'subcategory': subcategoria})
+        return index.ids_for(bits)
+
+    @staticmethod
+    def filtrar_catalogo_local(query="", vendor="", filters=None, sort='relevance', page=1, page_size=25):
+        """
+        Catálogo local filtrado y ordenado sobre la instantánea columnar
+        (precio, existencia, marca, categoría) sin construir objetos del ORM.
+        La búsqueda de texto y la subcategoría usan el índice de facetas.
+        Devuelve (productos, total, pagina_vacia).
+        """
+        try:
+            from app.models.catalog_table import catalog_table
+            filtros = dict(filters or {})
+            if vendor:
+                filtros['vendors'] = [vendor]
+            
+            product_ids = ProductUtils.ids_catalogo_local(query, filtros)
+            table = catalog_table.get_table()
+            offset = (max(page, 1) - 1) * page_size
+            productos, total = table.select(filtros, sort or 'relevance', offset, page_size, product_ids)
+            return productos, total, len(productos) == 0
+        except Exception as e:
+            print(f"Error filtrando catálogo local: {e}")
+            return [], 0, True
         
     @staticmethod
     def get_search_analytics() -> Dict:
         """Obtiene analytics de búsquedas"""
-        total_searches = sum(ProductUtils.POPULAR_SEARCHES.values())
-        unique_searches = len(ProductUtils.POPULAR_SEARCHES)
+        from app.models.search_analytics import search_analytics
+        total_searches, unique_searches = search_analytics.totals()
         
         return {
             'total_searches': total_searches,
@@ -334,62 +424,38 @@ class ProductUtils:
         if not products:
             return products
         
-        boosted_products = []
-        
-        for product in products:
-            boosted_product = product.copy()
-            current_score = boosted_product.get('_relevance_score', 0)
-            
-            # Boost por disponibilidad (productos disponibles tienen prioridad)
-            availability = boosted_product.get('availability', {})
-            if isinstance(availability, dict) and availability.get('available'):
-                current_score += 15
-            elif isinstance(availability, bool) and availability:
-                current_score += 15
-            
-            # Boost por marca popular
-            popular_brands = ['apple', 'samsung', 'dell', 'hp', 'lenovo', 'cisco', 'microsoft', 'asus']
-            vendor_name = str(boosted_product.get('vendorName', '')).lower()
-            if any(brand in vendor_name for brand in popular_brands):
-                current_score += 10
-            
-            # Boost por categorías populares
-            popular_categories = ['laptop', 'smartphone', 'tablet', 'monitor', 'notebook', 'computadora']
-            category = str(boosted_product.get('category', '')).lower()
-            if any(pop_cat in category for pop_cat in popular_categories):
-                current_score += 8
-            
-            # Boost por productos con imágenes
-            product_images = boosted_product.get('productImages', [])
-            if product_images and len(product_images) > 0:
-                current_score += 5
-            
-            # Boost por productos con descripción detallada
-            description = str(boosted_product.get('description', ''))
-            if len(description) > 50:  # Descripciones largas suelen ser más completas
-                current_score += 3
-            
-            boosted_product['_relevance_score'] = current_score
-            boosted_products.append(boosted_product)
-        
-        return boosted_products
+        # Disponibilidad, marca y categoría populares, imágenes y descripción detallada
+        from app.models.catalog_table import ColumnTable
+        columnas = ColumnTable.from_products(products)
+        return [
+            dict(product, _relevance_score=product.get('_relevance_score', 0) + int(boost))
+            for product, boost in zip(products, columnas.boost)
+        ]
 
     @staticmethod
     def get_search_performance_metrics() -> Dict:
-        """Métricas de performance de búsqueda"""
-        # Implementar tracking de tiempo de respuesta, tasa de acierto, etc.
+        """Métricas de performance de búsqueda (ventana deslizante, por modo)"""
+        metrics = search_metrics.snapshot()
+        overall = metrics['overall']
+        error_rate = overall['error_rate']
+        
+        # Campos anteriores (en segundos / proporciones) más el detalle por modo
         return {
-            'avg_response_time': 0,
-            'success_rate': 0,
-            'cache_hit_rate': 0
+            'avg_response_time': round(overall['avg_ms'] / 1000, 4) if overall['avg_ms'] is not None else 0,
+            'success_rate': round(1 - error_rate, 4) if error_rate is not None else 0,
+            'cache_hit_rate': overall['cache_hit_rate'] or 0,
+            'window_seconds': metrics['window_seconds'],
+            'overall': overall,
+            'modes': metrics['modes']
         }
 
     @staticmethod
     def export_search_data(format: str = 'json') -> Optional[str]:
         """Exporta datos de búsqueda para análisis"""
+        from app.models.search_analytics import search_analytics
         data = {
-            'popular_searches': dict(ProductUtils.POPULAR_SEARCHES),
-            'search_history': ProductUtils.SEARCH_HISTORY,
+            'popular_searches': dict(search_analytics.popular(1000)),
+            'search_history': search_analytics.recent(ProductUtils.MAX_SEARCH_HISTORY),
             'timestamp': datetime.now().isoformat()
         }
         
@@ -404,11 +470,18 @@ class ProductUtils:
         """Autocompletado de búsquedas en tiempo real"""
         if len(query) < 2:
             return []
+        
+        # Índice de prefijos ordenado por popularidad
+        try:
+            from app.models.autocomplete import autocomplete_service
+            return [s['text'] for s in autocomplete_service.suggest(query, limit=8)]
+        except Exception as e:
+            print(f"Error en índice de autocompletado: {e}")
             
         suggestions = []
         
         # Buscar en términos populares
-        for term in ProductUtils.POPULAR_SEARCHES.keys():
+        for term, _ in ProductUtils.get_popular_searches(50):
             if term.startswith(query.lower()):
                 suggestions.append(term)
         
@@ -434,8 +507,7 @@ class ProductUtils:
     @staticmethod
     def log_search_metrics(query: str, results_count: int, response_time: float):
         """Registra métricas de performance de búsqueda"""
-        # Implementar logging para monitoreo
-        print(f"Search: {query}, Results: {results_count}, Time: {response_time:.2f}s")
+        search_metrics.record('other', response_time * 1000, results_count)
 
     @staticmethod
     def optimize_search_query(query: str) -> str:
@@ -458,12 +530,10 @@ class ProductUtils:
         normalized_query = ProductUtils.normalize_text(query)
         search_terms = set([query.strip()])  # Siempre incluir la búsqueda original
         
-        # Buscar coincidencias en el mapeo de palabras clave (más conservador)
-        for category, keywords in ProductUtils.KEYWORD_MAPPING.items():
-            # Solo agregar términos si la categoría está relacionada con la consulta
-            if any(keyword in normalized_query for keyword in keywords[:3]):
-                # Agregar solo los 2-3 términos principales de la categoría
-                search_terms.update(keywords[:3])
+        # Buscar coincidencias en el mapeo de palabras clave (más conservador):
+        # solo los 2-3 términos principales de las categorías relacionadas
+        from app.models.search_rules import get_search_rules
+        search_terms.update(get_search_rules().terminos_relacionados(normalized_query))
         
         # Extraer palabras individuales significativas de la consulta
         query_words = normalized_query.split()
@@ -480,142 +550,111 @@ class ProductUtils:
         """
         if not isinstance(producto, dict):
             return 0
-            
-        score = 0
-        original_terms = original_query.lower().split()
-        
-        # Campos y sus pesos
-        campos = {
-            "description": 20,
-            "vendorName": 15,
-            "ingramPartNumber": 10,
-            "vendorPartNumber": 10,
-            "category": 8,
-            "subCategory": 8
-        }
-        
-        for campo, peso in campos.items():
-            texto = producto.get(campo, "")
-            if texto:
-                texto_lower = str(texto).lower()
-                
-                # Coincidencia exacta con el término de búsqueda
-                if search_term.lower() == texto_lower:
-                    score += peso * 3
-                
-                # Coincidencia como palabra completa
-                elif f" {search_term.lower()} " in f" {texto_lower} ":
-                    score += peso * 2
-                
-                # Coincidencia parcial
-                elif search_term.lower() in texto_lower:
-                    score += peso
-        
-        # Bonus adicional si coincide con términos de la consulta original
-        for original_term in original_terms:
-            for campo in ["description", "vendorName", "category"]:
-                texto = producto.get(campo, "")
-                if texto and original_term.lower() in str(texto).lower():
-                    score += 5
-                    break
-        
-        return score
+        from app.models.search_scoring import scorer_para
+        scorer = scorer_para(original_query)
+        return scorer.score(scorer.build_record(producto), search_term, cachear=False)
 
     @staticmethod
+    @track_search_metrics('hybrid')
     def buscar_productos_hibrido(query="", vendor="", page_number=1, page_size=25, use_keywords=True):
         """Versión mejorada con paginación correcta"""
         try:
-            print(f"DEBUG - Buscando productos - Página: {page_number}, Tamaño: {page_size}")
+            if query and page_number == 1:
+                ProductUtils.track_search(query)
             
-            # URL base para el catálogo
-            url = "https://api.ingrammicro.com/resellers/v6/catalog"
+            llave = ProductUtils.llave_pagina_catalogo(query, vendor, page_number, page_size, use_keywords)
+            pagina = product_cache.get('page', llave)
+            if pagina is not None:
+                return pagina
             
-            # Parámetros base
-            params = {
-                'pageSize': page_size,
-                'pageNumber': page_number,
-                'showGroupInfo': 'false'
-            }
-            
-            # Agregar parámetros de búsqueda si existen
-            if query:
-                if use_keywords:
-                    params['keyword'] = query
-                else:
-                    params['ingramPartNumber'] = query
-                    
-            if vendor:
-                params['vendorName'] = vendor
-            
-            print(f"DEBUG - Llamando a API con params: {params}")
-            
-            # Llamada a la API
-            response = APIClient.make_request("GET", url, params=params)
-            
-            if response and response.status_code == 200:
-                data = response.json()
-                print(f"DEBUG - API response keys: {list(data.keys())}")
-                print(f"DEBUG - Productos encontrados: {len(data.get('catalog', []))}, Total: {data.get('recordsFound', 0)}")
-                
-                # Extraer información de paginación
-                total_records = data.get('recordsFound', 0)
-                catalog = data.get('catalog', [])
-                next_page = data.get('nextPage')
-                
-                print(f"Search: {query}, Results: {total_records}, Time: {data.get('responseTime', 0)}s")
-                
-                return catalog, total_records, len(catalog) == 0
-                
-            else:
-                print(f"ERROR - API response: {response.status_code if response else 'No response'}")
+            pagina = ProductUtils.consultar_pagina_catalogo(query, vendor, page_number, page_size, use_keywords)
+            if pagina is None:
                 return [], 0, True
+            return pagina
                 
         except Exception as e:
+            search_metrics.note_error()
             print(f"ERROR en buscar_productos_hibrido: {str(e)}")
             import traceback
             traceback.print_exc()
             return [], 0, True
-        
+
     @staticmethod
-    def _is_highly_relevant_product(producto, original_query, relevance_score):
+    def llave_pagina_catalogo(query="", vendor="", page_number=1, page_size=25, use_keywords=True):
+        """Llave de una página del catálogo de Ingram en el cache de productos."""
+        return ((query or '').strip().lower(), (vendor or '').strip().lower(),
+                int(page_number), int(page_size), bool(use_keywords))
+
+    @staticmethod
+    def consultar_pagina_catalogo(query="", vendor="", page_number=1, page_size=25, use_keywords=True):
         """
-        Filtrado más estricto para determinar relevancia
+        Consulta una página del catálogo de Ingram y la guarda en el cache de
+        productos junto con cada entrada por SKU. Devuelve (productos, total,
+        pagina_vacia) o None si la API falló (los errores no se cachean).
         """
-        if relevance_score < 15:  # Score mínimo más alto
-            return False
-            
-        if not isinstance(producto, dict):
-            return False
-            
-        original_normalized = ProductUtils.normalize_text(original_query)
-        description = ProductUtils.normalize_text(producto.get("description", ""))
-        category = ProductUtils.normalize_text(producto.get("category", ""))
-        
-        # Verificar que al menos un término de la consulta original esté presente
-        original_terms = original_normalized.split()
-        has_original_term = any(term in description or term in category for term in original_terms if len(term) > 2)
+        print(f"DEBUG - Buscando productos - Página: {page_number}, Tamaño: {page_size}")
         
-        if not has_original_term:
-            return False
+        # URL base para el catálogo
+        url = "https://api.ingrammicro.com/resellers/v6/catalog"
         
-        # Reglas de exclusión mejoradas
-        exclusion_patterns = {
-            'telefono': ['monitor', 'pantalla', 'impresora', 'laptop', 'computadora'],
-            'laptop': ['telefono', 'celular', 'audifonos', 'cable', 'cargador'],
-            'audifonos': ['computadora', 'laptop', 'monitor', 'teclado', 'mouse'],
-            'bocina': ['computadora', 'laptop', 'telefono', 'tablet', 'monitor']
+        # Parámetros base
+        params = {
+            'pageSize': page_size,
+            'pageNumber': page_number,
+            'showGroupInfo': 'false'
         }
         
-        for search_category, exclude_terms in exclusion_patterns.items():
-            if search_category in original_normalized:
-                producto_text = f"{description} {category}"
-                for exclude_term in exclude_terms:
-                    if exclude_term in producto_text:
-                        return False
+        # Agregar parámetros de búsqueda si existen
+        if query:
+            if use_keywords:
+                params['keyword'] = query
+            else:
+                params['ingramPartNumber'] = query
+                
+        if vendor:
+            params['vendorName'] = vendor
+        
+        print(f"DEBUG - Llamando a API con params: {params}")
+        
+        # Llamada a la API
+        response = APIClient.make_request("GET", url, params=params)
+        
+        if response and response.status_code == 200:
+            data = response.json()
+            print(f"DEBUG - API response keys: {list(data.keys())}")
+            print(f"DEBUG - Productos encontrados: {len(data.get('catalog', []))}, Total: {data.get('recordsFound', 0)}")
+            
+            # Extraer información de paginación
+            total_records = data.get('recordsFound', 0)
+            catalog = data.get('catalog', [])
+            
+            print(f"Search: {query}, Results: {total_records}, Time: {data.get('responseTime', 0)}s")
+            
+            pagina = (catalog, total_records, len(catalog) == 0)
+            product_cache.set('page', ProductUtils.llave_pagina_catalogo(
+                query, vendor, page_number, page_size, use_keywords), pagina)
+            for producto in catalog:
+                if isinstance(producto, dict) and producto.get('ingramPartNumber'):
+                    product_cache.set('entry', producto['ingramPartNumber'], producto)
+            part_number_index.learn_many(catalog)
+            return pagina
+            
+        print(f"ERROR - API response: {response.status_code if response else 'No response'}")
+        return None
         
-        return True
+    @staticmethod
+    def _is_highly_relevant_product(producto, original_query, relevance_score):
+        """
+        Filtrado más estricto para determinar relevancia
+        """
+        if not isinstance(producto, dict):
+            return False
+        from app.models.search_scoring import scorer_para
+        scorer = scorer_para(original_query)
+        return scorer.is_highly_relevant(scorer.build_record(producto), relevance_score)
 
     @staticmethod
+    @track_search_metrics('keyword')
     def buscar_por_palabras_clave(query="", vendor="", page_number=1, page_size=25):
         """
         Búsqueda por palabras clave mejorada con filtrado más estricto
@@ -630,45 +669,23 @@ class ProductUtils:
         original_query_terms = query.lower().split()
         search_terms = list(set(original_query_terms + search_terms))[:6]  # Limitar a 6 términos máximo
         
-        productos_combinados = {}
-        relevancia_por_producto = {}
+        from app.models.search_scoring import RelevanceScorer
         
+        resultados_por_termino = []
         for term in search_terms:
             try:
                 # Buscar resultados por término
                 productos_term, _, _ = ProductUtils.buscar_en_catalogo_general(
                     term, vendor, 1, 50  # Reducido a 50 resultados por término
                 )
-                
-                for producto in productos_term:
-                    part_number = producto.get("ingramPartNumber")
-                    if part_number:
-                        # Calcular score de relevancia específico para este término
-                        score = ProductUtils.score_product_relevance_specific(producto, term, query)
-                        
-                        # Solo considerar productos con score mínimo
-                        if score >= 10:  # Umbral mínimo de relevancia
-                            if part_number not in productos_combinados:
-                                productos_combinados[part_number] = producto
-                                relevancia_por_producto[part_number] = score
-                            elif score > relevancia_por_producto[part_number]:
-                                productos_combinados[part_number] = producto
-                                relevancia_por_producto[part_number] = score
-                                
+                resultados_por_termino.append((term, productos_term))
             except Exception as e:
+                search_metrics.note_error()
                 print(f"Error en búsqueda por término '{term}': {e}")
                 continue
         
-        # Filtrar productos irrelevantes de manera más estricta
-        productos_filtrados = {}
-        for part_number, producto in productos_combinados.items():
-            if ProductUtils._is_highly_relevant_product(producto, query, relevancia_por_producto[part_number]):
-                producto['_relevance_score'] = relevancia_por_producto[part_number]
-                productos_filtrados[part_number] = producto
-        
-        # Convertir a lista y ordenar por relevancia
-        productos_list = list(productos_filtrados.values())
-        productos_list.sort(key=lambda x: x.get('_relevance_score', 0), reverse=True)
+        # Puntuar y filtrar todos los candidatos en una sola pasada
+        productos_list = RelevanceScorer(query).rank(resultados_por_termino)
         
         # Aplicar paginación
         total_records = len(productos_list)
@@ -692,71 +709,42 @@ class ProductUtils:
         """
         if not isinstance(producto, dict):
             return True
-            
-        original_normalized = ProductUtils.normalize_text(original_query)
-        description = ProductUtils.normalize_text(producto.get("description", ""))
-        category = ProductUtils.normalize_text(producto.get("category", ""))
-        subcategory = ProductUtils.normalize_text(producto.get("subCategory", ""))
-        
-        # Reglas de exclusión mejoradas
-        exclusion_rules = {
-            # Búsquedas de teléfonos
-            'telefono': ['monitor', 'pantalla', 'impresora', 'laptop', 'notebook', 
-                        'teclado', 'mouse', 'router', 'switch', 'servidor'],
-            'celular': ['monitor', 'pantalla', 'impresora', 'laptop', 'notebook',
-                       'teclado', 'mouse', 'router', 'switch', 'servidor'],
-            'smartphone': ['monitor', 'pantalla', 'impresora', 'laptop', 'notebook',
-                          'teclado', 'mouse', 'router', 'switch', 'servidor'],
-            
-            # Búsquedas de computadoras
-            'computadora': ['audifonos', 'headset', 'telefono', 'celular', 'tablet',
-                           'cable', 'adaptador', 'cargador'],
-            'laptop': ['audifonos', 'headset', 'telefono', 'celular', 'tablet',
-                      'cable', 'adaptador', 'cargador', 'monitor'],
-            'notebook': ['audifonos', 'headset', 'telefono', 'celular', 'tablet',
-                        'cable', 'adaptador', 'cargador', 'monitor'],
-            
-            # Búsquedas de monitores
-            'monitor': ['telefono', 'celular', 'laptop', 'notebook', 'teclado',
-                       'mouse', 'impresora', 'router'],
-            'pantalla': ['telefono', 'celular', 'laptop', 'notebook', 'teclado',
-                        'mouse', 'impresora', 'router'],
-        }
-        
-        # Verificar reglas de exclusión
-        for search_category, exclude_terms in exclusion_rules.items():
-            if search_category in original_normalized:
-                producto_text = f"{description} {category} {subcategory}"
-                for exclude_term in exclude_terms:
-                    if exclude_term in producto_text:
-                        return False
-        
-        # Inclusión forzada para términos específicos
-        inclusion_rules = {
-            'telefono': ['telefono', 'celular', 'smartphone', 'iphone', 'galaxy'],
-            'celular': ['telefono', 'celular', 'smartphone', 'iphone', 'galaxy'],
-            'smartphone': ['telefono', 'celular', 'smartphone', 'iphone', 'galaxy'],
-        }
-        
-        for search_category, include_terms in inclusion_rules.items():
-            if search_category in original_normalized:
-                producto_text = f"{description} {category} {subcategory}"
-                for include_term in include_terms:
-                    if include_term in producto_text:
-                        return True
-        return True
+        from app.models.search_scoring import scorer_para
+        scorer = scorer_para(original_query)
+        return scorer.is_relevant(scorer.build_record(producto))
     
     @staticmethod
-    def buscar_por_sku_directo(sku_query):
+    def en_paralelo(func, *args, **kwargs):
         """
-        Busca productos usando el endpoint de price & availability con SKUs potenciales.
+        Ejecuta func en el pool compartido con el contexto de la app actual y
+        devuelve un Future. Las llamadas a Ingram que haga cuentan para las
+        métricas de la búsqueda en curso.
         """
-        productos = []
-        
-        # Limpiar y normalizar el SKU
-        sku_clean = sku_query.strip().upper()
-        
-        # Generar variantes del SKU
+        global _EXECUTOR
+        if _EXECUTOR is None:
+            with _EXECUTOR_LOCK:
+                if _EXECUTOR is None:
+                    _EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ingram')
+
+        app = current_app._get_current_object()
+        trackers = search_metrics.active_trackers()
+
+        def tarea():
+            search_metrics.adopt(trackers)
+            try:
+                with app.app_context():
+                    return func(*args, **kwargs)
+            finally:
+                search_metrics.adopt([])
+
+        return _EXECUTOR.submit(tarea)
+
+    @staticmethod
+    def variantes_sku(sku_query):
+        """Variantes normalizadas de un SKU escrito por el usuario, sin duplicados."""
+        sku_clean = (sku_query or '').strip().upper()
+        if not sku_clean:
+            return []
         sku_variants = [
             sku_clean,
             sku_clean.replace(" ", "-"),
@@ -764,69 +752,128 @@ class ProductUtils:
             sku_clean.replace(" ", ""),
             sku_clean.replace("_", "-"),
             sku_clean.replace("_", ""),
+            normalize_part_number(sku_clean),
         ]
+        return list(dict.fromkeys(sku_variants))
+
+    @staticmethod
+    @track_search_metrics('sku')
+    def buscar_por_sku_directo(sku_query):
+        """
+        Busca productos usando el endpoint de price & availability con SKUs potenciales.
+        Si el índice de números de parte ya conoce el SKU (de Ingram, fabricante
+        o UPC) se consulta solo ese; si no, todas las variantes van en una sola
+        llamada multi-SKU. El detalle se pide en paralelo con el precio.
+        """
+        sku_variants = ProductUtils.variantes_sku(sku_query)
+        if not sku_variants:
+            return []
         
-        # Remover duplicados manteniendo orden
-        sku_variants = list(dict.fromkeys(sku_variants))
+        conocido = part_number_index.lookup(sku_variants[0])
+        candidatos = [conocido] if conocido else sku_variants
         
-        # Intentar con cada variante
-        for sku in sku_variants[:5]:
-            try:
-                price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability?includeAvailability=true&includePricing=true"
-                response = APIClient.make_request("POST", price_url, json=body) 
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if isinstance(data, list) and data:
-                        producto_info = data[0]
-                        
-                        # Verificar que el producto existe y no tiene error
-                        if (producto_info.get("productStatusCode") != "E" and 
-                            producto_info.get("ingramPartNumber")):
-                            
-                            # Obtener detalles adicionales del producto
-                            detalle = ProductUtils.obtener_detalle_producto(producto_info.get("ingramPartNumber"))
-                            
-                            # Asegurarse de que detalle no sea None
-                            if detalle is None:
-                                detalle = {}
-                            
-                            # Combinar información
-                            producto_combinado = {
-                                "ingramPartNumber": producto_info.get("ingramPartNumber"),
-                                "vendorPartNumber": detalle.get("vendorPartNumber"),
-                                "description": (detalle.get("description") or 
-                                              producto_info.get("description") or 
-                                              "Descripción no disponible"),
-                                "vendorName": (detalle.get("vendorName") or 
-                                             producto_info.get("vendorName") or 
-                                             "Marca no disponible"),
-                                "category": detalle.get("category"),
-                                "subCategory": detalle.get("subCategory"),
-                                "productImages": detalle.get("productImages", []),
-                                "pricing": producto_info.get("pricing", {}),
-                                "availability": producto_info.get("availability", {}),
-                                "productStatusCode": producto_info.get("productStatusCode"),
-                                "productStatusMessage": producto_info.get("productStatusMessage")
-                            }
-                            productos.append(producto_combinado)
-                            break  # Si encontramos un resultado válido, salir del loop
+        try:
+            # El detalle del candidato más probable se pide mientras llegan los precios
+            detalle_futuro = ProductUtils.en_paralelo(ProductUtils.obtener_detalle_producto, candidatos[0])
+            precios = ProductUtils.obtener_precios_disponibilidad(candidatos)
+            
+            producto_info = None
+            for sku in candidatos:
+                info = precios.get(sku)
+                # Verificar que el producto existe y no tiene error
+                if info and info.get("productStatusCode") != "E" and info.get("ingramPartNumber"):
+                    producto_info = info
+                    break
+            
+            if producto_info is None:
+                detalle_futuro.cancel()
+                return []
+            
+            ingram_part_number = producto_info.get("ingramPartNumber")
+            if ingram_part_number == candidatos[0]:
+                detalle = detalle_futuro.result()
+            else:
+                detalle_futuro.cancel()
+                detalle = ProductUtils.obtener_detalle_producto(ingram_part_number)
+            
+            # Asegurarse de que detalle no sea None
+            if detalle is None:
+                detalle = {}
+            
+            part_number_index.add(ingram_part_number, sku_variants[0],
+                                  detalle.get("vendorPartNumber"), detalle.get("upc"))
+            
+            # Combinar información
+            producto_combinado = {
+                "ingramPartNumber": ingram_part_number,
+                "vendorPartNumber": detalle.get("vendorPartNumber"),
+                "description": (detalle.get("description") or 
+                              producto_info.get("description") or 
+                              "Descripción no disponible"),
+                "vendorName": (detalle.get("vendorName") or 
+                             producto_info.get("vendorName") or 
+                             "Marca no disponible"),
+                "category": detalle.get("category"),
+                "subCategory": detalle.get("subCategory"),
+                "productImages": detalle.get("productImages", []),
+                "pricing": producto_info.get("pricing", {}),
+                "availability": producto_info.get("availability", {}),
+                "productStatusCode": producto_info.get("productStatusCode"),
+                "productStatusMessage": producto_info.get("productStatusMessage")
+            }
+            return [producto_combinado]
                             
-            except Exception as e:
-                print(f"Error buscando SKU {sku}: {e}")
-                continue
-        
-        return productos
+        except Exception as e:
+            search_metrics.note_error()
+            print(f"Error buscando SKU {sku_query}: {e}")
+            return []
 
     @staticmethod
     def obtener_detalle_producto(part_number):
         """
-        Obtiene los detalles de un producto específico.
+        Obtiene los detalles de un producto específico (con cache; solo se
+        guardan las respuestas exitosas).
         """
         try:
+            detalle = product_cache.get('detail', part_number)
+            if detalle is not None:
+                return detalle
             detail_url = f"https://api.ingrammicro.com/resellers/v6/catalog/details/{part_number}"
             detalle_res = APIClient.make_request("GET", detail_url)
-            return detalle_res.json() if detalle_res.status_code == 200 else {}
+            if detalle_res is None or detalle_res.status_code != 200:
+                return {}
+            detalle = detalle_res.json()
+            if detalle:
+                product_cache.set('detail', part_number, detalle)
+                part_number_index.learn(detalle)
+            return detalle
+        except Exception:
+            return {}
+
+    @staticmethod
+    def obtener_entrada_catalogo(part_number):
+        """
+        Entrada del catálogo de Ingram para un SKU (trae extraDescription).
+        Las páginas consultadas ya dejan sus entradas en el cache.
+        """
+        try:
+            entrada = product_cache.get('entry', part_number)
+            if entrada is not None:
+                return entrada
+            catalog_url = "https://api.ingrammicro.com/resellers/v6/catalog"
+            params = {
+                "pageSize": 1,
+                "pageNumber": 1,
+                "partNumber": part_number
+            }
+            catalog_res = APIClient.make_request("GET", catalog_url, params=params)
+            catalog_data = catalog_res.json() if catalog_res is not None and catalog_res.status_code == 200 else {}
+            productos = catalog_data.get("catalog") if isinstance(catalog_data, dict) else None
+            if isinstance(productos, list) and productos and isinstance(productos[0], dict):
+                product_cache.set('entry', part_number, productos[0])
+                part_number_index.learn(productos[0])
+                return productos[0]
+            return {}
         except Exception:
             return {}
 
@@ -863,6 +910,7 @@ class ProductUtils:
             
             productos = data.get("catalog", []) if isinstance(data, dict) else []
             total_records = data.get("recordsFound", 0)
+            part_number_index.learn_many(productos)
             
             print(f"DEBUG - Productos encontrados: {len(productos)}, Total: {total_records}")
             
@@ -872,6 +920,7 @@ class ProductUtils:
             return productos, total_records, pagina_vacia
             
         except Exception as e:
+            search_metrics.note_error()
             print(f"ERROR en búsqueda de catálogo: {str(e)}")
             import traceback
             traceback.print_exc()
@@ -889,17 +938,9 @@ class ProductUtils:
         normalized_query = ProductUtils.normalize_text(query)
         sugerencias = set()
         
-        # Buscar coincidencias en el mapeo
-        for category, keywords in ProductUtils.KEYWORD_MAPPING.items():
-            category_match = False
-            for keyword in keywords:
-                if keyword.lower() in normalized_query or normalized_query in keyword.lower():
-                    category_match = True
-                    break
-            
-            if category_match:
-                # Agregar palabras clave relacionadas de la misma categoría
-                sugerencias.update(keywords[:6])  # Aumentado a 6 por categoría
+        # Buscar coincidencias en el mapeo (6 palabras clave por categoría relacionada)
+        from app.models.search_rules import get_search_rules
+        sugerencias.update(get_search_rules().sugerencias(normalized_query))
         
         # Remover la consulta original de las sugerencias
         query_words = set(normalized_query.split())
@@ -915,25 +956,159 @@ class ProductUtils:
         """
         Obtiene información de precio y disponibilidad para un producto específico.
         """
+        if not part_number:
+            return None
+        return ProductUtils.obtener_precios_disponibilidad([part_number]).get(part_number)
+
+    @staticmethod
+    def obtener_precios_disponibilidad(part_numbers):
+        """
+        Precio y disponibilidad de varios SKUs en una sola llamada a Ingram.
+        Los SKUs en cache no se vuelven a consultar. Devuelve {sku: datos};
+        los SKUs sin respuesta no aparecen.
+        """
+        resultado = {}
+        faltantes = []
+        for part_number in part_numbers:
+            if not part_number or part_number in resultado or part_number in faltantes:
+                continue
+            precio = product_cache.get('price', part_number)
+            if precio is not None:
+                resultado[part_number] = precio
+            else:
+                faltantes.append(part_number)
+
+        if not faltantes:
+            return resultado
+
         try:
-            if not part_number:
-                return None
-                
-            price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability?includeAvailability=true&includePricing=true"
-            response = APIClient.make_request("POST", price_url, json=body) 
+            price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability"
+            body = {"products": [{"ingramPartNumber": part_number} for part_number in faltantes]}
+            params = {
+                "includeAvailability": "true",
+                "includePricing": "true",
+                "includeProductAttributes": "true"
+            }
+            response = APIClient.make_request("POST", price_url, params=params, json=body)
             
-            if response.status_code == 200:
+            if response is not None and response.status_code == 200:
                 data = response.json()
-                if isinstance(data, list) and data:
-                    return data[0]  # Devolver el primer (y único) producto
-                    
-            return None
+                if isinstance(data, dict):
+                    data = [data]
+                data = data if isinstance(data, list) else []
+                for posicion, item in enumerate(data):
+                    if not isinstance(item, dict):
+                        continue
+                    # Ingram responde en el mismo orden; si el SKU no coincide se usa la posición
+                    part_number = item.get('ingramPartNumber')
+                    if part_number not in faltantes and len(data) == len(faltantes):
+                        part_number = faltantes[posicion]
+                    if part_number in faltantes and part_number not in resultado:
+                        resultado[part_number] = item
+                        product_cache.set('price', part_number, item)
+                        part_number_index.learn(item)
             
         except Exception as e:
-            print(f"Error obteniendo precio/disponibilidad para {part_number}: {e}")
+            print(f"Error obteniendo precio/disponibilidad para {', '.join(faltantes)}: {e}")
+
+        return resultado
+
+    @staticmethod
+    def obtener_precios_en_lotes(part_numbers, chunk_size=25, timeout=8.0):
+        """
+        Precio y disponibilidad de muchos SKUs: los que están en cache salen
+        de ahí y el resto se consulta en lotes de chunk_size en paralelo.
+        Devuelve ({sku: datos}, SKUs cuyo lote falló o no respondió a
+        tiempo) para poder mostrar resultados parciales.
+        """
+        resultado = {}
+        faltantes = []
+        for part_number in dict.fromkeys(p for p in part_numbers if p):
+            precio = product_cache.get('price', part_number)
+            if precio is not None:
+                resultado[part_number] = precio
+            else:
+                faltantes.append(part_number)
+
+        if not faltantes:
+            return resultado, set()
+
+        futuros = {
+            ProductUtils.en_paralelo(ProductUtils.obtener_precios_disponibilidad, faltantes[i:i + chunk_size]):
+                faltantes[i:i + chunk_size]
+            for i in range(0, len(faltantes), chunk_size)
+        }
+        terminados, _ = wait(futuros, timeout=timeout)
+        sin_respuesta = set()
+        for futuro, lote in futuros.items():
+            if futuro in terminados and futuro.exception() is None:
+                resultado.update(futuro.result())
+            else:
+                sin_respuesta.update(lote)
+        return resultado, sin_respuesta
+
+    @staticmethod
+    def producto_para_alta(part_number, con_precio=True):
+        """
+        Datos de un producto para agregarlo al carrito, a la cotización o a
+        favoritos. Si ya está en la tabla local no se consulta a Ingram (las
+        altas solo usan estos datos para crear el producto); si no, detalle y
+        precio salen del cache de productos y lo que falte se pide en
+        paralelo, en una sola vuelta. Devuelve None si Ingram no tiene el producto.
+        """
+        from app import db
+        from app.models.product import Product
+
+        local = db.session.query(
+            Product.description, Product.vendor_name, Product.upc, Product.category, Product.base_price
+        ).filter(Product.ingram_part_number == part_number, Product.is_active == True).first()
+        if local:
+            return {
+                'ingramPartNumber': part_number,
+                'description': local.description,
+                'pricing': {'customerPrice': local.base_price or 0},
+                'vendorName': local.vendor_name,
+                'upc': local.upc or '',
+                'category': local.category or '',
+            }
+
+        precio_futuro = None
+        if con_precio and not product_cache.contains('price', part_number):
+            precio_futuro = ProductUtils.en_paralelo(ProductUtils.obtener_precio_disponibilidad, part_number)
+        detalle = ProductUtils.obtener_detalle_producto(part_number)
+        if not detalle:
             return None
-        
+
+        precio_info = {}
+        if precio_futuro is not None:
+            precio_info = precio_futuro.result() or {}
+        elif con_precio:
+            precio_info = ProductUtils.obtener_precio_disponibilidad(part_number) or {}
+
+        real_price = 0
+        availability = {}
+        if precio_info.get('productStatusCode') != 'E':
+            customer_price = (precio_info.get('pricing') or {}).get('customerPrice')
+            if customer_price is not None:
+                try:
+                    real_price = float(customer_price)
+                except (ValueError, TypeError):
+                    real_price = 0
+            availability = precio_info.get('availability') or {}
+
+        return {
+            'ingramPartNumber': part_number,
+            'description': detalle.get('description', f"Producto {part_number}"),
+            'pricing': {'customerPrice': real_price},
+            'vendorName': detalle.get('vendorName', 'N/A'),
+            'upc': detalle.get('upc', ''),
+            'category': detalle.get('category', ''),
+            'availability': availability,
+            'productImages': detalle.get('productImages', [])
+        }
+
     @staticmethod
+    @track_search_metrics('local')
     def buscar_local_avanzado(query, vendor=None, category=None, page=1, page_size=25):
         from app.models.product import Product
         """
@@ -976,6 +1151,7 @@ class ProductUtils:
             return resultados, total, False
             
         except Exception as e:
+            search_metrics.note_error()
             print(f"Error en búsqueda local: {str(e)}")
             return [], 0, True
     
@@ -985,6 +1161,15 @@ class ProductUtils:
         """
         Sugerir palabras clave basado en búsquedas anteriores y productos populares
         """
+        # Primero el índice de autocompletado (sin consultas a la BD por tecla)
+        try:
+            from app.models.autocomplete import autocomplete_service
+            sugerencias = autocomplete_service.suggest(query, limit=10)
+            if sugerencias:
+                return [s['text'] for s in sugerencias]
+        except Exception as e:
+            print(f"Error en índice de autocompletado: {e}")
+        
         sugerencias = set()
         
         # 1. Buscar en descripciones de productos
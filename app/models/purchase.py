@@ -4,6 +4,8 @@ import json
 
 class Purchase(db.Model):
     __tablename__ = 'purchases'
+    # Orden de los listados paginados del admin (paginate_keyset)
+    __table_args__ = (db.Index('idx_purchases_created_id', 'created_at', 'id'),)
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(50), unique=True, nullable=False)
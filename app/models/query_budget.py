@@ -0,0 +1,69 @@
+import threading
+from functools import wraps
+
+from sqlalchemy import event
+
+
+class QueryBudget:
+    """
+    Límite de consultas SQL por vista. Cada vista decorada declara cuántas
+    sentencias puede emitir sin importar cuántas filas muestre; si una
+    regresión vuelve a cargar relaciones fila por fila (N+1), el conteo pasa
+    el límite. Con QUERY_BUDGET_STRICT (por defecto en DEBUG/TESTING, leído
+    en cada request) se lanza AssertionError; si no, se registra en el
+    logger de la app.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._listening = False
+
+    def init_app(self, app):
+        self.listen()
+
+    @staticmethod
+    def strict() -> bool:
+        from flask import current_app
+        strict = current_app.config.get('QUERY_BUDGET_STRICT')
+        return (current_app.debug or current_app.testing) if strict is None else bool(strict)
+
+    def listen(self):
+        """Cuenta las sentencias de este hilo mientras haya una vista medida activa."""
+        if self._listening:
+            return
+        self._listening = True
+        from sqlalchemy.engine import Engine
+
+        def _contar(conn, cursor, statement, parameters, context, executemany):
+            contador = getattr(self._local, 'count', None)
+            if contador is not None:
+                self._local.count = contador + 1
+
+        event.listen(Engine, 'before_cursor_execute', _contar)
+
+    def limit(self, max_queries: int):
+        """Decorador: la vista no debe emitir más de max_queries sentencias."""
+        def decorador(view):
+            @wraps(view)
+            def medida(*args, **kwargs):
+                anterior = getattr(self._local, 'count', None)
+                self._local.count = 0
+                try:
+                    respuesta = view(*args, **kwargs)
+                    usadas = self._local.count
+                finally:
+                    self._local.count = anterior
+                if usadas > max_queries:
+                    from flask import current_app
+                    mensaje = f"{view.__name__}: {usadas} consultas SQL (límite {max_queries}), posible N+1"
+                    if self.strict():
+                        raise AssertionError(mensaje)
+                    current_app.logger.warning(mensaje)
+                return respuesta
+            medida.query_budget = max_queries
+            return medida
+        return decorador
+
+
+# Instancia global
+query_budget = QueryBudget()
@@ -3,6 +3,8 @@ from datetime import datetime
 
 class Quote(db.Model):
     __tablename__ = 'quotes'
+    # Orden de los listados paginados del admin (paginate_keyset)
+    __table_args__ = (db.Index('idx_quotes_created_id', 'created_at', 'id'),)
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -97,6 +99,11 @@ class QuoteItem(db.Model):
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Una partida por producto: las altas hacen UPSERT sobre esta llave
+    __table_args__ = (
+        db.UniqueConstraint('quote_id', 'product_id', name='uq_quote_items_quote_product'),
+    )
+    
     def calculate_total(self):
         self.total_price = self.unit_price * self.quantity
         return self.total_price
@@ -0,0 +1,256 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+# Estados de compra que cuentan como ingreso
+PAID_STATUSES = ('paid', 'shipped', 'delivered')
+
+
+def _como_fecha(valor) -> Optional[date]:
+    """func.date() devuelve date en PostgreSQL/MySQL y 'YYYY-MM-DD' en SQLite."""
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def _tramos(dias: Iterable[date]) -> List[Tuple[date, date]]:
+    """Agrupa los días en tramos consecutivos [(inicio, fin)] para recalcular cada tramo con una consulta."""
+    tramos: List[Tuple[date, date]] = []
+    for dia in sorted(set(dias)):
+        if tramos and dia - tramos[-1][1] == timedelta(days=1):
+            tramos[-1] = (tramos[-1][0], dia)
+        else:
+            tramos.append((dia, dia))
+    return tramos
+
+
+class ReportRollup:
+    """
+    Tablas de hechos diarios para los reportes del admin (report_daily_*).
+    - Los eventos de mapper marcan como sucio el día (created_at) de cada
+      usuario, cotización, partida o compra que cambia en este worker.
+    - Los cambios de otros workers se detectan con updated_at/created_at
+      posteriores a la última actualización (refreshed_at en la BD).
+    - Cada día sucio se recalcula completo desde las tablas base (DELETE +
+      INSERT del día), así que recalcular dos veces da el mismo resultado.
+    - Los borrados hechos en otros workers solo se reflejan al recalcular
+      ese día; `flask rollup-reports --full` reconstruye todo.
+    """
+
+    REFRESH_SECONDS = 60
+    MARGIN = timedelta(minutes=2)   # transacciones que hicieron commit después de la última actualización
+
+    def __init__(self):
+        self._dirty: Set[date] = set()
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        self.REFRESH_SECONDS = app.config.get('REPORTS_ROLLUP_REFRESH_SECONDS', self.REFRESH_SECONDS)
+
+    def listen(self, *models):
+        """Marca como sucio el día de creación de cada fila que cambia."""
+        if self._listening:
+            return
+        self._listening = True
+
+        def _marcar(mapper, connection, target):
+            self._dirty.add(_como_fecha(getattr(target, 'created_at', None)) or datetime.utcnow().date())
+
+        for model in models:
+            for evento in ('after_insert', 'after_update', 'after_delete'):
+                event.listen(model, evento, _marcar)
+
+    # ==================== ACTUALIZACIÓN ====================
+
+    def refresh_if_stale(self):
+        """Actualiza los días pendientes si pasó REFRESH_SECONDS o este worker tiene cambios propios."""
+        if not self._dirty and time.time() - self._refreshed_at < self.REFRESH_SECONDS:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            from app import db
+            db.session.rollback()
+            print(f"Error actualizando tablas de reportes: {e}")
+
+    def refresh(self, full: bool = False) -> int:
+        """Recalcula los días sucios (o todo con full=True). Devuelve cuántos días se recalcularon."""
+        from app import db
+        from app.models.report_stats import DailySummary
+
+        with self._lock:
+            ahora = datetime.utcnow()
+            dirty, self._dirty = self._dirty, set()
+            watermark = None if full else db.session.query(db.func.max(DailySummary.refreshed_at)).scalar()
+
+            if watermark is None:
+                primero = self._primer_dia()
+                dias = set()
+                if primero is not None:
+                    dias = {primero + timedelta(days=n) for n in range((ahora.date() - primero).days + 1)}
+            else:
+                dias = dirty | self._dias_modificados(watermark - self.MARGIN) | {ahora.date()}
+
+            try:
+                for inicio, fin in _tramos(dias):
+                    self._recalcular(inicio, fin, ahora)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self._dirty |= dirty
+                raise
+            self._refreshed_at = time.time()
+            return len(dias)
+
+    @staticmethod
+    def _primer_dia() -> Optional[date]:
+        from app import db
+        from app.models import User, Quote, Purchase
+
+        fechas = [
+            db.session.query(db.func.min(model.created_at)).scalar()
+            for model in (User, Quote, Purchase)
+        ]
+        fechas = [_como_fecha(f) for f in fechas if f is not None]
+        return min(fechas) if fechas else None
+
+    @staticmethod
+    def _dias_modificados(desde: datetime) -> Set[date]:
+        """Días de creación de las filas que cambiaron desde `desde` (incluye las de otros workers)."""
+        from app import db
+        from app.models import User, Quote, QuoteItem, Purchase
+
+        consultas = [
+            db.session.query(db.func.date(User.created_at)).filter(User.created_at >= desde),
+            db.session.query(db.func.date(Quote.created_at)).filter(Quote.updated_at >= desde),
+            db.session.query(db.func.date(Purchase.created_at)).filter(Purchase.updated_at >= desde),
+            db.session.query(db.func.date(QuoteItem.created_at)).join(Quote, Quote.id == QuoteItem.quote_id)
+              .filter(db.or_(QuoteItem.created_at >= desde, Quote.updated_at >= desde)),
+        ]
+        dias = set()
+        for consulta in consultas:
+            for (dia,) in consulta.distinct().all():
+                dia = _como_fecha(dia)
+                if dia is not None:
+                    dias.add(dia)
+        return dias
+
+    @staticmethod
+    def _recalcular(inicio: date, fin: date, ahora: datetime):
+        """Reemplaza las filas de los días [inicio, fin] con agregados de las tablas base."""
+        from app import db
+        from app.models import User, Quote, QuoteItem, Purchase
+        from app.models.report_stats import (DailySummary, DailyQuoteStatus,
+                                             DailyUserActivity, DailyProductActivity)
+
+        desde = datetime.combine(inicio, datetime.min.time())
+        hasta = datetime.combine(fin + timedelta(days=1), datetime.min.time())
+
+        def _por_dia(model, *columnas):
+            dia = db.func.date(model.created_at)
+            return db.session.query(dia, *columnas)\
+                .filter(model.created_at >= desde, model.created_at < hasta)
+
+        resumen: Dict[date, Dict] = {}
+        for n in range((fin - inicio).days + 1):
+            dia = inicio + timedelta(days=n)
+            resumen[dia] = {'day': dia, 'new_users': 0, 'quotes': 0, 'purchases': 0,
+                            'paid_purchases': 0, 'revenue': 0.0, 'refreshed_at': ahora}
+
+        for dia, usuarios in _por_dia(User, db.func.count(User.id)).group_by(db.func.date(User.created_at)):
+            resumen[_como_fecha(dia)]['new_users'] = usuarios
+
+        estados = []
+        actividad: Dict[Tuple[date, int], Dict] = {}
+        for dia, status, user_id, cotizaciones in _por_dia(Quote, Quote.status, Quote.user_id, db.func.count(Quote.id))\
+                .group_by(db.func.date(Quote.created_at), Quote.status, Quote.user_id):
+            dia = _como_fecha(dia)
+            resumen[dia]['quotes'] += cotizaciones
+            estados.append((dia, status or 'draft', cotizaciones))
+            fila = actividad.setdefault((dia, user_id), {'quotes': 0, 'purchases': 0, 'revenue': 0.0})
+            fila['quotes'] += cotizaciones
+
+        pagada = Purchase.status.in_(PAID_STATUSES)
+        for dia, user_id, compras, pagadas, ingresos in _por_dia(
+                Purchase, Purchase.user_id, db.func.count(Purchase.id),
+                db.func.sum(db.case((pagada, 1), else_=0)),
+                db.func.sum(db.case((pagada, Purchase.total_amount), else_=0))
+        ).group_by(db.func.date(Purchase.created_at), Purchase.user_id):
+            dia = _como_fecha(dia)
+            resumen[dia]['purchases'] += compras
+            resumen[dia]['paid_purchases'] += pagadas or 0
+            resumen[dia]['revenue'] += ingresos or 0.0
+            if user_id is not None:
+                fila = actividad.setdefault((dia, user_id), {'quotes': 0, 'purchases': 0, 'revenue': 0.0})
+                fila['purchases'] += compras
+                fila['revenue'] += ingresos or 0.0
+
+        por_estado: Dict[Tuple[date, str], int] = {}
+        for dia, status, cotizaciones in estados:
+            por_estado[(dia, status)] = por_estado.get((dia, status), 0) + cotizaciones
+
+        productos = [
+            {'day': _como_fecha(dia), 'product_id': product_id,
+             'times_quoted': veces, 'quantity': cantidad or 0}
+            for dia, product_id, veces, cantidad in _por_dia(
+                QuoteItem, QuoteItem.product_id, db.func.count(QuoteItem.id), db.func.sum(QuoteItem.quantity)
+            ).group_by(db.func.date(QuoteItem.created_at), QuoteItem.product_id)
+        ]
+
+        filas = {
+            DailySummary: list(resumen.values()),
+            DailyQuoteStatus: [{'day': dia, 'status': status, 'quotes': n} for (dia, status), n in por_estado.items()],
+            DailyUserActivity: [{'day': dia, 'user_id': user_id, **valores}
+                                for (dia, user_id), valores in actividad.items()],
+            DailyProductActivity: productos,
+        }
+        for model, valores in filas.items():
+            db.session.query(model).filter(model.day >= inicio, model.day <= fin).delete(synchronize_session=False)
+            if valores:
+                db.session.execute(model.__table__.insert(), valores)
+
+    # ==================== LECTURA ====================
+
+    @staticmethod
+    def series(days: int = 30, hasta: Optional[date] = None) -> List[Dict]:
+        """Serie diaria (ventas, cotizaciones, usuarios nuevos y activos) de los últimos `days` días, sin huecos."""
+        from app import db
+        from app.models.report_stats import DailySummary, DailyUserActivity
+
+        hasta = hasta or datetime.utcnow().date()
+        desde = hasta - timedelta(days=days - 1)
+
+        filas = {
+            fila.day: fila for fila in
+            DailySummary.query.filter(DailySummary.day >= desde, DailySummary.day <= hasta).all()
+        }
+        activos = dict(
+            db.session.query(DailyUserActivity.day, db.func.count(DailyUserActivity.user_id))
+            .filter(DailyUserActivity.day >= desde, DailyUserActivity.day <= hasta)
+            .group_by(DailyUserActivity.day).all()
+        )
+
+        serie = []
+        for n in range(days):
+            dia = desde + timedelta(days=n)
+            fila = filas.get(dia)
+            punto = fila.to_dict() if fila else {
+                'date': dia.isoformat(), 'new_users': 0, 'quotes': 0,
+                'purchases': 0, 'paid_purchases': 0, 'revenue': 0.0
+            }
+            punto['active_users'] = activos.get(dia, 0)
+            serie.append(punto)
+        return serie
+
+
+# Instancia global
+report_rollup = ReportRollup()
@@ -0,0 +1,59 @@
+from app import db
+from datetime import datetime
+
+class DailySummary(db.Model):
+    """Totales del día: usuarios nuevos, cotizaciones, compras e ingresos (pagadas, enviadas y entregadas)."""
+    __tablename__ = 'report_daily_summary'
+
+    day = db.Column(db.Date, primary_key=True)
+    new_users = db.Column(db.Integer, nullable=False, default=0)
+    quotes = db.Column(db.Integer, nullable=False, default=0)
+    purchases = db.Column(db.Integer, nullable=False, default=0)
+    paid_purchases = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'date': self.day.isoformat(),
+            'new_users': self.new_users,
+            'quotes': self.quotes,
+            'purchases': self.purchases,
+            'paid_purchases': self.paid_purchases,
+            'revenue': round(self.revenue or 0, 2)
+        }
+
+class DailyQuoteStatus(db.Model):
+    """Cotizaciones creadas cada día, por su estado actual."""
+    __tablename__ = 'report_daily_quote_status'
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    quotes = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyUserActivity(db.Model):
+    """Actividad diaria por usuario: cotizaciones, compras e ingresos."""
+    __tablename__ = 'report_daily_user_activity'
+
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    quotes = db.Column(db.Integer, nullable=False, default=0)
+    purchases = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index('idx_report_user_activity_user', 'user_id'),
+    )
+
+class DailyProductActivity(db.Model):
+    """Veces que se cotizó cada producto por día y unidades cotizadas."""
+    __tablename__ = 'report_daily_product_activity'
+
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    times_quoted = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('idx_report_product_activity_product', 'product_id'),
+    )
@@ -0,0 +1,226 @@
+import atexit
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+
+class SearchAnalytics:
+    """
+    Pipeline de eventos de búsqueda.
+    - Cada worker registra eventos en una deque (append es atómico, no hay locks
+      en la ruta de la petición).
+    - Un hilo write-behind agrega los eventos y los escribe por lotes en
+      search_stats con un UPSERT (search_count = search_count + n).
+    - Las lecturas combinan la tabla (vista de todos los workers) con lo que
+      este worker aún no ha escrito.
+    """
+
+    READ_CACHE_SECONDS = 5
+    MAX_QUERY_LENGTH = 255
+
+    def __init__(self, flush_interval: int = 10, flush_batch: int = 500):
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._events = deque()
+        self._pending: Dict[str, Tuple[int, datetime]] = {}
+        self._app = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._popular_cache = (0.0, None)
+        self._counter = itertools.count(1)
+        self._seq = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.flush_interval = app.config.get('SEARCH_ANALYTICS_FLUSH_SECONDS', self.flush_interval)
+
+    # ==================== ESCRITURA ====================
+
+    def record(self, query: str):
+        """Registra una búsqueda (O(1), sin bloquear la petición)."""
+        clean_query = (query or '').strip().lower()[:self.MAX_QUERY_LENGTH]
+        if not clean_query:
+            return
+        self._events.append((clean_query, datetime.utcnow()))
+        self._seq = next(self._counter)
+        self._ensure_thread()
+        if len(self._events) >= self.flush_batch:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        if self._thread is None and self._app is not None:
+            with self._flush_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='search-analytics', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error escribiendo analytics de búsqueda: {e}")
+
+    def _drain(self):
+        """Pasa los eventos de la cola al agregado pendiente de este worker."""
+        pending = dict(self._pending)
+        events = self._events
+        while True:
+            try:
+                query, ts = events.popleft()
+            except IndexError:
+                break
+            count, last = pending.get(query, (0, ts))
+            pending[query] = (count + 1, max(last, ts))
+        self._pending = pending
+        return pending
+
+    def flush(self) -> int:
+        """Escribe el agregado pendiente en la base de datos. Devuelve las consultas escritas."""
+        if self._app is None:
+            return 0
+        with self._flush_lock:
+            pending = self._drain()
+            if not pending:
+                return 0
+            with self._app.app_context():
+                try:
+                    self._upsert(pending)
+                except Exception as e:
+                    from app import db
+                    db.session.rollback()
+                    print(f"Error guardando analytics de búsqueda (se reintentará): {e}")
+                    return 0
+            self._pending = {}
+            self._popular_cache = (0.0, None)
+            return len(pending)
+
+    @staticmethod
+    def _upsert(pending: Dict[str, Tuple[int, datetime]]):
+        from app import db
+        from app.models.search_stat import SearchStat
+
+        rows = [
+            {'term': query, 'search_count': count, 'first_searched_at': last, 'last_searched_at': last}
+            for query, (count, last) in pending.items()
+        ]
+        dialect = db.engine.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(SearchStat.__table__).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['term'],
+                set_={
+                    'search_count': SearchStat.__table__.c.search_count + stmt.excluded.search_count,
+                    'last_searched_at': stmt.excluded.last_searched_at,
+                }
+            )
+            db.session.execute(stmt)
+        else:
+            existentes = {
+                stat.term: stat for stat in
+                SearchStat.query.filter(SearchStat.term.in_(list(pending))).all()
+            }
+            for row in rows:
+                stat = existentes.get(row['term'])
+                if stat:
+                    stat.search_count += row['search_count']
+                    stat.last_searched_at = row['last_searched_at']
+                else:
+                    db.session.add(SearchStat(**row))
+        db.session.commit()
+
+    # ==================== LECTURA ====================
+
+    def _local_pending(self) -> Dict[str, Tuple[int, datetime]]:
+        """Eventos de este worker que todavía no están en la tabla."""
+        pending = dict(self._pending)
+        for query, ts in list(self._events):
+            count, last = pending.get(query, (0, ts))
+            pending[query] = (count + 1, max(last, ts))
+        return pending
+
+    def popular(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Búsquedas más populares de todos los workers (tabla + pendientes locales)."""
+        cached_at, cached = self._popular_cache
+        if cached is not None and time.time() - cached_at < self.READ_CACHE_SECONDS and len(cached) >= limit:
+            base = cached
+        else:
+            base = []
+            try:
+                from app.models.search_stat import SearchStat
+                base = [
+                    (query, count) for query, count in
+                    SearchStat.query.with_entities(SearchStat.term, SearchStat.search_count)
+                    .order_by(SearchStat.search_count.desc()).limit(max(limit, 50)).all()
+                ]
+                self._popular_cache = (time.time(), base)
+            except Exception as e:
+                print(f"Error leyendo búsquedas populares: {e}")
+
+        merged = dict(base)
+        for query, (count, _) in self._local_pending().items():
+            merged[query] = merged.get(query, 0) + count
+        return sorted(merged.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+    def recent(self, limit: int = 50) -> List[str]:
+        """Consultas únicas más recientes (equivalente al antiguo SEARCH_HISTORY)."""
+        pending = self._local_pending()
+        recientes = sorted(pending.items(), key=lambda x: x[1][1], reverse=True)
+        resultado = [query for query, _ in recientes[:limit]]
+        if len(resultado) < limit:
+            try:
+                from app.models.search_stat import SearchStat
+                vistos = set(resultado)
+                for (query,) in SearchStat.query.with_entities(SearchStat.term).order_by(
+                        SearchStat.last_searched_at.desc()).limit(limit).all():
+                    if query not in vistos:
+                        resultado.append(query)
+                        if len(resultado) >= limit:
+                            break
+            except Exception as e:
+                print(f"Error leyendo historial de búsquedas: {e}")
+        return resultado
+
+    def totals(self) -> Tuple[int, int]:
+        """(búsquedas totales, consultas únicas) de todos los workers."""
+        total, unicas = 0, 0
+        pending = self._local_pending()
+        try:
+            from app import db
+            from app.models.search_stat import SearchStat
+            total, unicas = db.session.query(
+                db.func.coalesce(db.func.sum(SearchStat.search_count), 0),
+                db.func.count(SearchStat.id)
+            ).one()
+            if pending:
+                existentes = {
+                    query for (query,) in SearchStat.query.with_entities(SearchStat.term)
+                    .filter(SearchStat.term.in_(list(pending))).all()
+                }
+                unicas += len(set(pending) - existentes)
+        except Exception as e:
+            print(f"Error leyendo totales de búsquedas: {e}")
+            unicas = len(pending)
+        total += sum(count for count, _ in pending.values())
+        return int(total), int(unicas)
+
+    def version(self) -> int:
+        """Número de búsquedas registradas por este worker (para detectar cambios)."""
+        return self._seq
+
+
+# Instancia global
+search_analytics = SearchAnalytics(flush_interval=Config.SEARCH_ANALYTICS_FLUSH_SECONDS)
@@ -0,0 +1,240 @@
+import bisect
+import functools
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Modos de búsqueda instrumentados
+SEARCH_MODES = ('hybrid', 'keyword', 'sku', 'local')
+
+# Límites superiores (ms) de las cubetas del histograma de latencia (escala logarítmica)
+LATENCY_BOUNDS_MS = tuple(round(1.25 ** i, 2) for i in range(0, 52))  # 1 ms ... ~110 s
+
+
+class _ModeStats:
+    """Contadores de un modo dentro de una ventana de tiempo."""
+
+    __slots__ = ('count', 'results', 'zero_results', 'errors', 'cache_hits',
+                 'cache_lookups', 'upstream_calls', 'latency_ms_total', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.results = 0
+        self.zero_results = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_lookups = 0
+        self.upstream_calls = 0
+        self.latency_ms_total = 0.0
+        self.histogram = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+    def merge(self, other: '_ModeStats'):
+        self.count += other.count
+        self.results += other.results
+        self.zero_results += other.zero_results
+        self.errors += other.errors
+        self.cache_hits += other.cache_hits
+        self.cache_lookups += other.cache_lookups
+        self.upstream_calls += other.upstream_calls
+        self.latency_ms_total += other.latency_ms_total
+        for i, n in enumerate(other.histogram):
+            if n:
+                self.histogram[i] += n
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.count:
+            return None
+        objetivo = p * self.count
+        acumulado = 0
+        for i, n in enumerate(self.histogram):
+            acumulado += n
+            if acumulado >= objetivo:
+                return LATENCY_BOUNDS_MS[i] if i < len(LATENCY_BOUNDS_MS) else float(LATENCY_BOUNDS_MS[-1])
+        return float(LATENCY_BOUNDS_MS[-1])
+
+
+class SearchTracker:
+    """Datos de una búsqueda en curso (resultados, cache, llamadas a Ingram)."""
+
+    __slots__ = ('mode', 'start', 'results', 'cache_hits', 'cache_lookups', 'upstream_calls', 'error')
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.start = time.perf_counter()
+        self.results = None
+        self.cache_hits = 0
+        self.cache_lookups = 0
+        self.upstream_calls = 0
+        self.error = False
+
+
+class SearchMetrics:
+    """
+    Métricas de búsqueda en una ventana deslizante: cubetas de BUCKET_SECONDS
+    que se descartan al salir de la ventana. Cada cubeta guarda, por modo,
+    un histograma de latencia y los contadores de resultados, cache y
+    llamadas a la API de Ingram.
+    """
+
+    BUCKET_SECONDS = 10
+    WINDOW_SECONDS = 15 * 60
+
+    def __init__(self):
+        self._buckets: Dict[int, Dict[str, _ModeStats]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ==================== REGISTRO ====================
+
+    def _stack(self) -> List[SearchTracker]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def start(self, mode: str) -> SearchTracker:
+        tracker = SearchTracker(mode)
+        self._stack().append(tracker)
+        return tracker
+
+    def finish(self, tracker: SearchTracker):
+        stack = self._stack()
+        if tracker in stack:
+            stack.remove(tracker)
+        latency_ms = (time.perf_counter() - tracker.start) * 1000
+        self.record(tracker.mode, latency_ms, tracker.results, error=tracker.error,
+                    cache_hits=tracker.cache_hits, cache_lookups=tracker.cache_lookups,
+                    upstream_calls=tracker.upstream_calls)
+
+    def record(self, mode: str, latency_ms: float, results: Optional[int] = None, error: bool = False,
+               cache_hits: int = 0, cache_lookups: int = 0, upstream_calls: int = 0):
+        bucket_id = int(time.time() // self.BUCKET_SECONDS)
+        indice = bisect.bisect_left(LATENCY_BOUNDS_MS, latency_ms)
+        with self._lock:
+            bucket = self._buckets.get(bucket_id)
+            if bucket is None:
+                bucket = self._buckets[bucket_id] = {}
+                self._expire(bucket_id)
+            stats = bucket.get(mode)
+            if stats is None:
+                stats = bucket[mode] = _ModeStats()
+            stats.count += 1
+            stats.latency_ms_total += latency_ms
+            stats.histogram[indice] += 1
+            # Una búsqueda con error no cuenta como "sin resultados": son tasas separadas
+            if error:
+                stats.errors += 1
+            elif results is not None:
+                stats.results += results
+                if results == 0:
+                    stats.zero_results += 1
+            stats.cache_hits += cache_hits
+            stats.cache_lookups += cache_lookups
+            stats.upstream_calls += upstream_calls
+
+    def _expire(self, bucket_id: int):
+        limite = bucket_id - self.WINDOW_SECONDS // self.BUCKET_SECONDS
+        for viejo in [b for b in self._buckets if b <= limite]:
+            del self._buckets[viejo]
+
+    def active_trackers(self) -> List[SearchTracker]:
+        return list(getattr(self._local, 'stack', ()) or ())
+
+    def adopt(self, trackers: List[SearchTracker]):
+        """El trabajo de este hilo cuenta para las búsquedas de otro (tareas en paralelo)."""
+        self._local.stack = list(trackers)
+
+    def note_upstream_call(self):
+        """Una llamada a la API de Ingram cuenta para todas las búsquedas activas del hilo."""
+        for tracker in getattr(self._local, 'stack', ()) or ():
+            tracker.upstream_calls += 1
+
+    def note_error(self):
+        """
+        Marca con error las búsquedas activas del hilo. Para las búsquedas que
+        atrapan su propia excepción (o una respuesta fallida de Ingram) y
+        devuelven un resultado vacío.
+        """
+        for tracker in getattr(self._local, 'stack', ()) or ():
+            tracker.error = True
+
+    def note_cache(self, hit: bool):
+        for tracker in getattr(self._local, 'stack', ()) or ():
+            tracker.cache_lookups += 1
+            if hit:
+                tracker.cache_hits += 1
+
+    # ==================== LECTURA ====================
+
+    def snapshot(self, window_seconds: Optional[int] = None) -> Dict:
+        window_seconds = min(window_seconds or self.WINDOW_SECONDS, self.WINDOW_SECONDS)
+        desde = int((time.time() - window_seconds) // self.BUCKET_SECONDS)
+        totales: Dict[str, _ModeStats] = {}
+        with self._lock:
+            for bucket_id, bucket in self._buckets.items():
+                if bucket_id <= desde:
+                    continue
+                for mode, stats in bucket.items():
+                    totales.setdefault(mode, _ModeStats()).merge(stats)
+
+        modos = {}
+        general = _ModeStats()
+        for mode in sorted(set(SEARCH_MODES) | set(totales)):
+            stats = totales.get(mode, _ModeStats())
+            general.merge(stats)
+            modos[mode] = self._describe(stats)
+
+        return {
+            'window_seconds': window_seconds,
+            'modes': modos,
+            'overall': self._describe(general),
+        }
+
+    @staticmethod
+    def _describe(stats: _ModeStats) -> Dict:
+        count = stats.count
+        return {
+            'searches': count,
+            'p50_ms': stats.percentile(0.50),
+            'p95_ms': stats.percentile(0.95),
+            'p99_ms': stats.percentile(0.99),
+            'avg_ms': round(stats.latency_ms_total / count, 2) if count else None,
+            'avg_results': round(stats.results / count, 2) if count else None,
+            'zero_result_rate': round(stats.zero_results / count, 4) if count else None,
+            'error_rate': round(stats.errors / count, 4) if count else None,
+            'cache_hit_rate': round(stats.cache_hits / stats.cache_lookups, 4) if stats.cache_lookups else None,
+            'upstream_calls': stats.upstream_calls,
+            'upstream_calls_per_search': round(stats.upstream_calls / count, 2) if count else None,
+        }
+
+
+# Instancia global
+search_metrics = SearchMetrics()
+
+
+def _contar_resultados(resultado) -> Optional[int]:
+    """Resultados de una búsqueda: total de (productos, total, vacia) o len(lista)."""
+    if isinstance(resultado, tuple) and len(resultado) >= 2 and isinstance(resultado[1], int):
+        return resultado[1]
+    if isinstance(resultado, list):
+        return len(resultado)
+    return None
+
+
+def track_search_metrics(mode: str):
+    """Decorador: mide latencia, resultados y llamadas a Ingram de una búsqueda."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracker = search_metrics.start(mode)
+            try:
+                resultado = func(*args, **kwargs)
+                tracker.results = _contar_resultados(resultado)
+                return resultado
+            except Exception:
+                tracker.error = True
+                raise
+            finally:
+                search_metrics.finish(tracker)
+        return wrapper
+    return decorator
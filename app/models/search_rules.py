@@ -0,0 +1,197 @@
+import json
+from bisect import bisect_right
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from config import Config
+from app.models.product_utils import ProductUtils
+
+# Mapeo de palabras clave por defecto (antes de aplicar el archivo de configuración)
+KEYWORD_MAPPING = dict(ProductUtils.KEYWORD_MAPPING)
+
+# Reglas de exclusión para el filtrado estricto (_is_highly_relevant_product)
+EXCLUSION_ESTRICTA = {
+    'telefono': ['monitor', 'pantalla', 'impresora', 'laptop', 'computadora'],
+    'laptop': ['telefono', 'celular', 'audifonos', 'cable', 'cargador'],
+    'audifonos': ['computadora', 'laptop', 'monitor', 'teclado', 'mouse'],
+    'bocina': ['computadora', 'laptop', 'telefono', 'tablet', 'monitor']
+}
+
+# Reglas de exclusión por categoría (_is_relevant_product)
+EXCLUSION_CATEGORIAS = {
+    # Búsquedas de teléfonos
+    'telefono': ['monitor', 'pantalla', 'impresora', 'laptop', 'notebook',
+                 'teclado', 'mouse', 'router', 'switch', 'servidor'],
+    'celular': ['monitor', 'pantalla', 'impresora', 'laptop', 'notebook',
+                'teclado', 'mouse', 'router', 'switch', 'servidor'],
+    'smartphone': ['monitor', 'pantalla', 'impresora', 'laptop', 'notebook',
+                   'teclado', 'mouse', 'router', 'switch', 'servidor'],
+
+    # Búsquedas de computadoras
+    'computadora': ['audifonos', 'headset', 'telefono', 'celular', 'tablet',
+                    'cable', 'adaptador', 'cargador'],
+    'laptop': ['audifonos', 'headset', 'telefono', 'celular', 'tablet',
+               'cable', 'adaptador', 'cargador', 'monitor'],
+    'notebook': ['audifonos', 'headset', 'telefono', 'celular', 'tablet',
+                 'cable', 'adaptador', 'cargador', 'monitor'],
+
+    # Búsquedas de monitores
+    'monitor': ['telefono', 'celular', 'laptop', 'notebook', 'teclado',
+                'mouse', 'impresora', 'router'],
+    'pantalla': ['telefono', 'celular', 'laptop', 'notebook', 'teclado',
+                 'mouse', 'impresora', 'router'],
+}
+
+
+class ExclusionTable:
+    """Tabla de exclusión compilada: categoría de la consulta -> términos a excluir."""
+
+    def __init__(self, reglas: Dict[str, List[str]]):
+        self.reglas = {categoria: list(terminos) for categoria, terminos in reglas.items()}
+        self._categorias = tuple(self.reglas.items())
+        # Combinaciones de categorías ya resueltas (son pocas)
+        self._combinaciones: Dict[FrozenSet[str], Tuple[str, ...]] = {}
+
+    def terminos_para(self, normalized_query: str) -> Tuple[str, ...]:
+        """Términos a excluir para una consulta ya normalizada, sin duplicados."""
+        activas = frozenset(
+            categoria for categoria, _ in self._categorias if categoria in normalized_query
+        )
+        terminos = self._combinaciones.get(activas)
+        if terminos is None:
+            vistos = {}
+            for categoria, lista in self._categorias:
+                if categoria in activas:
+                    for termino in lista:
+                        vistos.setdefault(termino, None)
+            terminos = self._combinaciones[activas] = tuple(vistos)
+        return terminos
+
+
+class SearchRules:
+    """
+    Reglas de búsqueda compiladas una sola vez: mapeo de palabras clave
+    y tablas de exclusión. Las consultas recorren estructuras ya preparadas
+    en lugar de reconstruirlas en cada búsqueda.
+    """
+
+    def __init__(self, keyword_mapping: Dict[str, List[str]],
+                 exclusion_estricta: Dict[str, List[str]],
+                 exclusion_categorias: Dict[str, List[str]]):
+        self.keyword_mapping = {categoria: list(kws) for categoria, kws in keyword_mapping.items()}
+        self.exclusion_estricta = ExclusionTable(exclusion_estricta)
+        self.exclusion_categorias = ExclusionTable(exclusion_categorias)
+
+        categorias = list(self.keyword_mapping.values())
+
+        # find_matching_search_terms: solo los 3 términos principales de cada categoría
+        self._principales = tuple(tuple(kws[:3]) for kws in categorias)
+        self._indice_principales = self._indexar(
+            (idx, kw) for idx, kws in enumerate(self._principales) for kw in kws
+        )
+
+        # sugerir_palabras_clave: todos los términos (en minúsculas) y los 6 primeros como sugerencia
+        self._sugeridas = tuple(tuple(kws[:6]) for kws in categorias)
+        self._indice_keywords = self._indexar(
+            (idx, kw.lower()) for idx, kws in enumerate(categorias) for kw in kws
+        )
+
+        # Texto único con todos los términos para buscar la consulta dentro de ellos en una pasada
+        self._haystack = "\n".join(kw for kw, _ in self._indice_keywords)
+        self._inicios = []
+        posicion = 0
+        for kw, _ in self._indice_keywords:
+            self._inicios.append(posicion)
+            posicion += len(kw) + 1
+        self._todas = frozenset(range(len(categorias)))
+
+    @staticmethod
+    def _indexar(pares) -> Tuple[Tuple[str, FrozenSet[int]], ...]:
+        """Agrupa término -> índices de categoría, sin duplicados y en orden de aparición."""
+        indice: Dict[str, set] = {}
+        for idx, keyword in pares:
+            indice.setdefault(keyword, set()).add(idx)
+        return tuple((keyword, frozenset(idxs)) for keyword, idxs in indice.items())
+
+    def terminos_relacionados(self, normalized_query: str) -> List[str]:
+        """Términos principales de las categorías mencionadas en la consulta."""
+        coincidencias = set()
+        for keyword, categorias in self._indice_principales:
+            if keyword in normalized_query:
+                coincidencias |= categorias
+
+        terminos = []
+        for idx in sorted(coincidencias):
+            terminos.extend(self._principales[idx])
+        return terminos
+
+    def sugerencias(self, normalized_query: str) -> List[str]:
+        """Términos sugeridos de las categorías relacionadas con la consulta."""
+        if not normalized_query:
+            coincidencias = self._todas
+        else:
+            coincidencias = set()
+            for keyword, categorias in self._indice_keywords:
+                if keyword in normalized_query:
+                    coincidencias |= categorias
+
+            # La consulta contenida dentro de algún término
+            posicion = self._haystack.find(normalized_query)
+            while posicion != -1:
+                idx = self._indice_por_posicion(posicion)
+                coincidencias |= self._indice_keywords[idx][1]
+                # Saltar al siguiente término
+                siguiente = self._inicios[idx + 1] if idx + 1 < len(self._inicios) else len(self._haystack)
+                posicion = self._haystack.find(normalized_query, siguiente)
+
+        sugerencias = []
+        for idx in sorted(coincidencias):
+            sugerencias.extend(self._sugeridas[idx])
+        return sugerencias
+
+    def _indice_por_posicion(self, posicion: int) -> int:
+        return bisect_right(self._inicios, posicion) - 1
+
+
+def cargar_reglas(path: Optional[str] = None) -> SearchRules:
+    """
+    Compila las reglas de búsqueda. Si se indica un archivo JSON, sus tablas
+    reemplazan a las predeterminadas:
+        {"keyword_mapping": {...}, "exclusion_estricta": {...}, "exclusion_categorias": {...}}
+    Las claves que falten conservan su valor por defecto.
+    """
+    tablas = {}
+    if path:
+        try:
+            with open(path, encoding='utf-8') as f:
+                tablas = json.load(f)
+            if not isinstance(tablas, dict):
+                raise ValueError("el archivo debe contener un objeto JSON")
+            print(f"✅ Reglas de búsqueda cargadas desde {path}")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudieron cargar las reglas de búsqueda de {path}: {e}")
+            tablas = {}
+
+    keyword_mapping = tablas.get('keyword_mapping') or KEYWORD_MAPPING
+    rules = SearchRules(
+        keyword_mapping,
+        tablas.get('exclusion_estricta') or EXCLUSION_ESTRICTA,
+        tablas.get('exclusion_categorias') or EXCLUSION_CATEGORIAS,
+    )
+
+    # Mantener el mapeo visible para el resto de ProductUtils (autocompletado, etc.)
+    ProductUtils.KEYWORD_MAPPING = rules.keyword_mapping
+    return rules
+
+
+_search_rules = cargar_reglas(Config.SEARCH_RULES_FILE)
+
+
+def get_search_rules() -> SearchRules:
+    return _search_rules
+
+
+def recargar_reglas(path: Optional[str] = None) -> SearchRules:
+    """Vuelve a compilar las reglas (por ejemplo, tras editar el archivo de configuración)."""
+    global _search_rules
+    _search_rules = cargar_reglas(path)
+    return _search_rules
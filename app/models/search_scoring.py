@@ -0,0 +1,318 @@
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from app.models.product_utils import ProductUtils
+from app.models.search_rules import get_search_rules
+
+# Campos y pesos usados para el score de relevancia
+CAMPOS_RELEVANCIA = (
+    ("description", 20),
+    ("vendorName", 15),
+    ("ingramPartNumber", 10),
+    ("vendorPartNumber", 10),
+    ("category", 8),
+    ("subCategory", 8),
+)
+
+# Campos revisados para el bonus por términos de la consulta original
+CAMPOS_BONUS = ("description", "vendorName", "category")
+
+class ProductSearchRecord:
+    """Registro compacto de un producto con sus campos ya normalizados."""
+
+    __slots__ = ('producto', 'part_number', 'campos', 'bonus_texts',
+                 'texto_estricto', 'texto_completo')
+
+    def __init__(self, producto: Dict):
+        self.producto = producto
+        self.part_number = producto.get("ingramPartNumber")
+
+        # (peso, texto en minúsculas, texto con espacios alrededor)
+        campos = []
+        for campo, peso in CAMPOS_RELEVANCIA:
+            texto = producto.get(campo, "")
+            if texto:
+                texto_lower = str(texto).lower()
+                campos.append((peso, texto_lower, f" {texto_lower} "))
+        self.campos = tuple(campos)
+
+        bonus_texts = []
+        for campo in CAMPOS_BONUS:
+            texto = producto.get(campo, "")
+            if texto:
+                bonus_texts.append(str(texto).lower())
+        self.bonus_texts = tuple(bonus_texts)
+
+        description = ProductUtils.normalize_text(producto.get("description", ""))
+        category = ProductUtils.normalize_text(producto.get("category", ""))
+        subcategory = ProductUtils.normalize_text(producto.get("subCategory", ""))
+        self.texto_estricto = f"{description} {category}"
+        self.texto_completo = f"{description} {category} {subcategory}"
+
+
+class RelevanceScorer:
+    """
+    Calcula la relevancia de candidatos para una consulta.
+    Todo lo que depende solo de la consulta se prepara una vez en el constructor.
+    """
+
+    MIN_SCORE = 10
+    MIN_SCORE_ESTRICTO = 15
+
+    def __init__(self, original_query: str):
+        self.original_query = original_query or ""
+        self.original_terms = tuple(t.lower() for t in self.original_query.lower().split())
+
+        normalized = ProductUtils.normalize_text(self.original_query)
+        self.normalized_query = normalized
+        self.terminos_normalizados = tuple(t for t in normalized.split() if len(t) > 2)
+
+        rules = get_search_rules()
+        self.excluir_estricto = rules.exclusion_estricta.terminos_para(normalized)
+        self.excluir_categorias = rules.exclusion_categorias.terminos_para(normalized)
+        self._bonus_cache = {}
+
+    @staticmethod
+    def build_record(producto: Dict) -> ProductSearchRecord:
+        return ProductSearchRecord(producto)
+
+    def _bonus(self, record: ProductSearchRecord, cachear: bool = True) -> int:
+        """Bonus por términos de la consulta original (no depende del término buscado)."""
+        bonus = self._bonus_cache.get(record) if cachear else None
+        if bonus is None:
+            bonus = 0
+            for original_term in self.original_terms:
+                for texto in record.bonus_texts:
+                    if original_term in texto:
+                        bonus += 5
+                        break
+            if cachear:
+                self._bonus_cache[record] = bonus
+        return bonus
+
+    def score(self, record: ProductSearchRecord, search_term: str, cachear: bool = True) -> int:
+        """
+        Equivalente a ProductUtils.score_product_relevance_specific. Con
+        cachear=False no guarda el bonus del registro (registros de un solo uso
+        con un scorer compartido).
+        """
+        term = search_term.lower()
+        padded = f" {term} "
+        score = 0
+
+        for peso, texto_lower, texto_padded in record.campos:
+            if term == texto_lower:
+                score += peso * 3
+            elif padded in texto_padded:
+                score += peso * 2
+            elif term in texto_lower:
+                score += peso
+
+        return score + self._bonus(record, cachear)
+
+    def is_highly_relevant(self, record: ProductSearchRecord, relevance_score: int) -> bool:
+        """Equivalente a ProductUtils._is_highly_relevant_product."""
+        if relevance_score < self.MIN_SCORE_ESTRICTO:
+            return False
+
+        texto = record.texto_estricto
+        if not any(term in texto for term in self.terminos_normalizados):
+            return False
+
+        return not any(term in texto for term in self.excluir_estricto)
+
+    def is_relevant(self, record: ProductSearchRecord) -> bool:
+        """Equivalente a ProductUtils._is_relevant_product."""
+        texto = record.texto_completo
+        return not any(term in texto for term in self.excluir_categorias)
+
+    def rank(self, resultados_por_termino: List[Tuple[str, List[Dict]]]) -> List[Dict]:
+        """
+        Puntúa todos los candidatos en una sola pasada y devuelve la lista
+        ordenada por relevancia (mismo orden que el cálculo producto por producto).
+        Cada producto queda con '_relevance_score'.
+        """
+        records = {}
+        mejores = {}
+
+        for term, productos in resultados_por_termino:
+            for producto in productos:
+                if not isinstance(producto, dict):
+                    continue
+                part_number = producto.get("ingramPartNumber")
+                if not part_number:
+                    continue
+
+                # Un registro por diccionario: se normaliza una sola vez
+                # aunque aparezca en varios términos
+                record = records.get(id(producto))
+                if record is None:
+                    record = records[id(producto)] = ProductSearchRecord(producto)
+
+                score = self.score(record, term)
+                if score < self.MIN_SCORE:
+                    continue
+
+                actual = mejores.get(part_number)
+                if actual is None or score > actual[1]:
+                    mejores[part_number] = (record, score)
+
+        ranking = []
+        for record, score in mejores.values():
+            if self.is_highly_relevant(record, score):
+                producto = record.producto
+                producto['_relevance_score'] = score
+                ranking.append(producto)
+
+        ranking.sort(key=lambda x: x.get('_relevance_score', 0), reverse=True)
+        return ranking
+
+
+@lru_cache(maxsize=64)
+def _scorer_cacheado(original_query: str, rules) -> RelevanceScorer:
+    return RelevanceScorer(original_query)
+
+
+def scorer_para(original_query: str) -> RelevanceScorer:
+    """
+    Scorer compartido por consulta (y versión de las reglas) para las
+    llamadas producto por producto: la consulta y las reglas se normalizan
+    una vez, no en cada producto. Usar con score(..., cachear=False).
+    """
+    return _scorer_cacheado(original_query or "", get_search_rules())
+
+
+# ==================== REFERENCIA PARA EL BENCHMARK ====================
+# Copia de la implementación producto por producto anterior al motor por
+# lotes (normalize_text por término y por producto, exclusiones fijas). Solo
+# la usa benchmark_scoring para comprobar que el ranking no cambió.
+
+_LEGACY_EXCLUSIONES = {
+    'telefono': ['monitor', 'pantalla', 'impresora', 'laptop', 'computadora'],
+    'laptop': ['telefono', 'celular', 'audifonos', 'cable', 'cargador'],
+    'audifonos': ['computadora', 'laptop', 'monitor', 'teclado', 'mouse'],
+    'bocina': ['computadora', 'laptop', 'telefono', 'tablet', 'monitor']
+}
+
+
+def _legacy_normalize_text(text):
+    if not text:
+        return ""
+    text = text.lower()
+    replacements = {
+        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u', 'ü': 'u', 'ñ': 'n'
+    }
+    for old, new in replacements.items():
+        text = text.replace(old, new)
+    text = re.sub(r'[^a-z0-9\s]', ' ', text)
+    text = ' '.join(text.split())
+    return text
+
+
+def _legacy_score(producto, search_term, original_query):
+    if not isinstance(producto, dict):
+        return 0
+
+    score = 0
+    original_terms = original_query.lower().split()
+
+    for campo, peso in CAMPOS_RELEVANCIA:
+        texto = producto.get(campo, "")
+        if texto:
+            texto_lower = str(texto).lower()
+            if search_term.lower() == texto_lower:
+                score += peso * 3
+            elif f" {search_term.lower()} " in f" {texto_lower} ":
+                score += peso * 2
+            elif search_term.lower() in texto_lower:
+                score += peso
+
+    for original_term in original_terms:
+        for campo in CAMPOS_BONUS:
+            texto = producto.get(campo, "")
+            if texto and original_term.lower() in str(texto).lower():
+                score += 5
+                break
+
+    return score
+
+
+def _legacy_is_highly_relevant(producto, original_query, relevance_score):
+    if relevance_score < 15:
+        return False
+    if not isinstance(producto, dict):
+        return False
+
+    original_normalized = _legacy_normalize_text(original_query)
+    description = _legacy_normalize_text(producto.get("description", ""))
+    category = _legacy_normalize_text(producto.get("category", ""))
+
+    original_terms = original_normalized.split()
+    if not any(term in description or term in category for term in original_terms if len(term) > 2):
+        return False
+
+    for search_category, exclude_terms in _LEGACY_EXCLUSIONES.items():
+        if search_category in original_normalized:
+            producto_text = f"{description} {category}"
+            for exclude_term in exclude_terms:
+                if exclude_term in producto_text:
+                    return False
+    return True
+
+
+def benchmark_scoring(n_candidates: int = 2000, n_terms: int = 6, query: str = "laptop hp elitebook") -> Dict:
+    """
+    Micro-benchmark: costo por candidato de la implementación producto por
+    producto original (copiada arriba como referencia) contra el motor por
+    lotes, y si ambos producen el mismo ranking. Devuelve microsegundos por candidato.
+    """
+    vendors = ['HP', 'Dell', 'Lenovo', 'Samsung', 'Cisco', 'Apple']
+    kinds = ['Laptop', 'Monitor', 'Teléfono', 'Audífonos', 'Impresora', 'Cable']
+    productos = []
+    for i in range(n_candidates):
+        kind = kinds[i % len(kinds)]
+        vendor = vendors[i % len(vendors)]
+        productos.append({
+            'ingramPartNumber': f"SKU{i:06d}",
+            'vendorPartNumber': f"VP-{i:06d}",
+            'description': f"{kind} {vendor} EliteBook Modelo {i} con Pantalla y Batería",
+            'vendorName': vendor,
+            'category': f"{kind}s",
+            'subCategory': f"{kind} Profesional",
+        })
+
+    terms = (query.lower().split() + ['notebook', 'portatil', 'elitebook'])[:n_terms]
+    resultados = [(term, productos) for term in terms]
+    total = len(terms) * len(productos)
+
+    inicio = time.perf_counter()
+    combinados, scores = {}, {}
+    for term, lista in resultados:
+        for producto in lista:
+            pn = producto['ingramPartNumber']
+            score = _legacy_score(producto, term, query)
+            if score >= 10 and (pn not in scores or score > scores[pn]):
+                combinados[pn], scores[pn] = producto, score
+    legacy_ranking = [
+        pn for pn, p in combinados.items()
+        if _legacy_is_highly_relevant(p, query, scores[pn])
+    ]
+    legacy_ranking.sort(key=lambda pn: scores[pn], reverse=True)
+    legacy = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    batch_ranking = [p['ingramPartNumber'] for p in RelevanceScorer(query).rank(resultados)]
+    batch = time.perf_counter() - inicio
+
+    for producto in productos:
+        producto.pop('_relevance_score', None)
+
+    return {
+        'candidates': total,
+        'legacy_us_per_candidate': round(legacy / total * 1e6, 3),
+        'batch_us_per_candidate': round(batch / total * 1e6, 3),
+        'speedup': round(legacy / batch, 2) if batch else None,
+        'same_ranking': legacy_ranking == batch_ranking,
+    }
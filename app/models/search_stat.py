@@ -0,0 +1,25 @@
+from app import db
+from datetime import datetime
+
+class SearchStat(db.Model):
+    """Conteo agregado de búsquedas por consulta (compartido entre workers)."""
+    __tablename__ = 'search_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(255), unique=True, nullable=False)
+    search_count = db.Column(db.Integer, nullable=False, default=0)
+    first_searched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_searched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_search_stats_count', 'search_count'),
+        db.Index('idx_search_stats_last', 'last_searched_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'term': self.term,
+            'search_count': self.search_count,
+            'first_searched_at': self.first_searched_at.isoformat() if self.first_searched_at else None,
+            'last_searched_at': self.last_searched_at.isoformat() if self.last_searched_at else None
+        }
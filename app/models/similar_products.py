@@ -0,0 +1,306 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy está en requirements.txt; sin él se usa la versión en Python puro (lenta, sin mmap)
+    np = None
+
+_TOKEN_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+# Peso de cada campo en el vector del producto
+PESO_DESCRIPCION = 1.0
+PESO_MARCA = 2.0
+PESO_CATEGORIA = 1.5
+
+MAX_DF = 0.5        # términos en más de la mitad del catálogo no distinguen productos
+BATCH_SIZE = 64     # productos por lote al calcular vecinos
+TOP_K = 12
+
+
+def _terminos(description, vendor, category, subcategory) -> Dict[str, float]:
+    """Términos ponderados de un producto. Marca y categoría llevan prefijo para no mezclarse con la descripción."""
+    terminos: Dict[str, float] = {}
+    for token in _TOKEN_RE.split((description or '').lower()):
+        if len(token) >= 2 and not token.isdigit():
+            terminos[token] = terminos.get(token, 0.0) + PESO_DESCRIPCION
+    if vendor:
+        llave = 'v:' + vendor.strip().lower()
+        terminos[llave] = terminos.get(llave, 0.0) + PESO_MARCA
+    for valor in (category, subcategory):
+        if valor:
+            llave = 'c:' + valor.strip().lower()
+            terminos[llave] = terminos.get(llave, 0.0) + PESO_CATEGORIA
+    return terminos
+
+
+def _guardar(directory, nombre, escribir):
+    """Escribe en un temporal y lo renombra: los workers que tienen el archivo con mmap no ven escrituras a medias."""
+    tmp = os.path.join(directory, nombre + '.tmp')
+    with open(tmp, 'wb') as f:
+        escribir(f)
+    os.replace(tmp, os.path.join(directory, nombre))
+
+
+class SimilarityBuilder:
+    """
+    Construcción fuera de línea del índice de productos similares:
+    TF-IDF disperso (descripción, marca y categoría) normalizado L2 y, por
+    lotes, los TOP_K vecinos por similitud coseno de cada producto.
+    Con NumPy el resultado se guarda como .npy (los workers lo abren con
+    mmap); sin NumPy, como JSON.
+    """
+
+    def __init__(self, top_k: int = TOP_K):
+        self.top_k = top_k
+
+    @staticmethod
+    def _leer_catalogo(chunk: int = 5000):
+        from app import db
+        from app.models.product import Product
+
+        ultimo = 0
+        while True:
+            rows = db.session.query(
+                Product.id, Product.description, Product.vendor_name,
+                Product.category, Product.subcategory
+            ).filter(Product.is_active == True, Product.id > ultimo).order_by(Product.id).limit(chunk).all()
+            if not rows:
+                break
+            yield from rows
+            ultimo = rows[-1][0]
+
+    def _vectorizar(self):
+        """ids, vectores normalizados [{término_id: peso}] y tamaño del vocabulario."""
+        ids = []
+        documentos = []
+        df: Dict[str, int] = {}
+        for product_id, description, vendor, category, subcategory in self._leer_catalogo():
+            terminos = _terminos(description, vendor, category, subcategory)
+            ids.append(product_id)
+            documentos.append(terminos)
+            for termino in terminos:
+                df[termino] = df.get(termino, 0) + 1
+
+        n = len(ids)
+        limite_df = max(2, int(n * MAX_DF))
+        vocabulario: Dict[str, int] = {}
+        idf: List[float] = []
+        for termino, frecuencia in df.items():
+            if frecuencia <= limite_df:
+                vocabulario[termino] = len(idf)
+                idf.append(math.log((1 + n) / (1 + frecuencia)) + 1.0)
+
+        vectores = []
+        for terminos in documentos:
+            vector = {}
+            for termino, tf in terminos.items():
+                indice = vocabulario.get(termino)
+                if indice is not None:
+                    vector[indice] = (1.0 + math.log(tf)) * idf[indice]
+            norma = math.sqrt(sum(w * w for w in vector.values()))
+            if norma:
+                vector = {t: w / norma for t, w in vector.items()}
+            vectores.append(vector)
+        return ids, vectores, len(idf)
+
+    def build(self, directory: str) -> Dict:
+        inicio = time.time()
+        ids, vectores, vocab_size = self._vectorizar()
+        os.makedirs(directory, exist_ok=True)
+        if np is not None:
+            self._build_numpy(directory, ids, vectores, vocab_size)
+        else:
+            print("⚠️ NumPy no está instalado: el índice de similares se calcula en Python puro y se guarda "
+                  "como JSON (cada worker lo carga completo en memoria, sin mmap). Instala requirements.txt.")
+            self._build_python(directory, ids, vectores)
+
+        meta = {
+            'products': len(ids),
+            'terms': vocab_size,
+            'top_k': self.top_k,
+            'format': 'npy' if np is not None else 'json',
+            'built_at': time.time(),
+            'build_seconds': round(time.time() - inicio, 2),
+        }
+        # meta.json se escribe al final: los workers recargan cuando cambia
+        _guardar(directory, 'meta.json', lambda f: f.write(json.dumps(meta).encode()))
+        return meta
+
+    def _build_numpy(self, directory, ids, vectores, vocab_size):
+        n = len(ids)
+        k = min(self.top_k, max(n - 1, 0))
+
+        # Matriz por términos (CSC): para cada término, sus productos y pesos
+        filas = np.fromiter((i for i, v in enumerate(vectores) for _ in v), dtype=np.int32)
+        columnas = np.fromiter((t for v in vectores for t in v), dtype=np.int32)
+        pesos = np.fromiter((w for v in vectores for w in v.values()), dtype=np.float32)
+        orden = np.argsort(columnas, kind='stable')
+        post_docs = filas[orden]
+        post_pesos = pesos[orden]
+        inicio_termino = np.zeros(vocab_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(columnas, minlength=vocab_size), out=inicio_termino[1:])
+
+        vecinos = np.full((n, k), -1, dtype=np.int64)
+        puntajes = np.zeros((n, k), dtype=np.float32)
+        ids_array = np.asarray(ids, dtype=np.int64)
+
+        for lote in range(0, n, BATCH_SIZE):
+            docs = range(lote, min(lote + BATCH_SIZE, n))
+            indices, valores = [], []
+            for fila, doc in enumerate(docs):
+                desplazamiento = fila * n
+                for termino, peso in vectores[doc].items():
+                    a, b = inicio_termino[termino], inicio_termino[termino + 1]
+                    indices.append(post_docs[a:b] + desplazamiento)
+                    valores.append(post_pesos[a:b] * peso)
+            if not indices or not k:
+                continue
+            # Coseno del lote contra todo el catálogo: B x n acumulado con bincount
+            scores = np.bincount(np.concatenate(indices), weights=np.concatenate(valores),
+                                 minlength=len(docs) * n).reshape(len(docs), n)
+            scores[np.arange(len(docs)), np.arange(lote, lote + len(docs))] = 0.0
+            mejores = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            mejores_scores = np.take_along_axis(scores, mejores, axis=1)
+            orden_lote = np.argsort(-mejores_scores, axis=1)
+            mejores = np.take_along_axis(mejores, orden_lote, axis=1)
+            mejores_scores = np.take_along_axis(mejores_scores, orden_lote, axis=1)
+            vecinos[lote:lote + len(docs)] = np.where(mejores_scores > 0, ids_array[mejores], -1)
+            puntajes[lote:lote + len(docs)] = mejores_scores
+
+        for nombre, arreglo in (('ids.npy', ids_array), ('neighbors.npy', vecinos), ('scores.npy', puntajes)):
+            _guardar(directory, nombre, lambda f, a=arreglo: np.save(f, a))
+
+    def _build_python(self, directory, ids, vectores):
+        postings: Dict[int, list] = {}
+        for doc, vector in enumerate(vectores):
+            for termino, peso in vector.items():
+                postings.setdefault(termino, []).append((doc, peso))
+
+        vecinos = {}
+        for doc, vector in enumerate(vectores):
+            scores: Dict[int, float] = {}
+            for termino, peso in vector.items():
+                for otro, peso_otro in postings[termino]:
+                    if otro != doc:
+                        scores[otro] = scores.get(otro, 0.0) + peso * peso_otro
+            mejores = heapq.nlargest(self.top_k, scores.items(), key=lambda x: x[1])
+            vecinos[str(ids[doc])] = [[ids[otro], round(score, 4)] for otro, score in mejores]
+
+        _guardar(directory, 'neighbors.json', lambda f: f.write(json.dumps(vecinos).encode()))
+
+
+class SimilarProducts:
+    """
+    Lectura del índice de productos similares en los workers. Los arreglos
+    .npy se abren con mmap (los comparten todos los procesos vía page cache)
+    y se recargan cuando cambia meta.json.
+    """
+
+    CHECK_INTERVAL = 60
+
+    def __init__(self):
+        self._directory = None
+        self._meta_mtime = None
+        self._checked_at = 0.0
+        self._ids = None
+        self._neighbors = None
+        self._scores = None
+        self._json = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._directory = app.config.get('SIMILAR_PRODUCTS_DIR') or os.path.join(app.instance_path, 'similar_products')
+
+    def _cargar(self):
+        meta_path = os.path.join(self._directory, 'meta.json')
+        try:
+            mtime = os.path.getmtime(meta_path)
+        except OSError:
+            return
+        if mtime == self._meta_mtime:
+            return
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('format') == 'npy' and np is None:
+            print(f"⚠️ El índice de similares en {self._directory} es .npy pero NumPy no está instalado: "
+                  "no se cargan productos similares. Instala requirements.txt.")
+        elif meta.get('format') == 'npy':
+            self._ids = np.load(os.path.join(self._directory, 'ids.npy'), mmap_mode='r')
+            self._neighbors = np.load(os.path.join(self._directory, 'neighbors.npy'), mmap_mode='r')
+            self._scores = np.load(os.path.join(self._directory, 'scores.npy'), mmap_mode='r')
+            self._json = None
+        elif meta.get('format') == 'json':
+            print(f"⚠️ Índice de similares en JSON ({self._directory}): se carga completo en la memoria de "
+                  "cada worker. Reconstrúyelo con NumPy instalado para abrirlo con mmap.")
+            with open(os.path.join(self._directory, 'neighbors.json')) as f:
+                self._json = json.load(f)
+            self._ids = self._neighbors = self._scores = None
+        self._meta_mtime = mtime
+
+    def _refrescar(self):
+        if self._directory is None or time.time() - self._checked_at < self.CHECK_INTERVAL:
+            return
+        with self._lock:
+            if time.time() - self._checked_at < self.CHECK_INTERVAL:
+                return
+            self._checked_at = time.time()
+            try:
+                self._cargar()
+            except Exception as e:
+                print(f"Error cargando índice de productos similares: {e}")
+
+    def neighbor_ids(self, product_id: int, limit: int = 6) -> List[int]:
+        """Ids de los productos más parecidos (ya ordenados), sin consultas a la BD."""
+        self._refrescar()
+        if self._json is not None:
+            return [otro for otro, _ in self._json.get(str(product_id), [])[:limit]]
+        if self._ids is None or not len(self._ids):
+            return []
+        posicion = int(np.searchsorted(self._ids, product_id))
+        if posicion >= len(self._ids) or int(self._ids[posicion]) != product_id:
+            return []
+        return [int(otro) for otro in self._neighbors[posicion][:limit] if otro >= 0]
+
+    def for_part_number(self, part_number: str, limit: int = 6) -> List[Dict]:
+        """Productos similares a un número de parte de Ingram, listos para la plantilla."""
+        try:
+            from app.models.product import Product
+
+            fila = Product.query.with_entities(Product.id).filter_by(ingram_part_number=part_number).first()
+            if not fila:
+                return []
+            vecinos = self.neighbor_ids(fila[0], limit)
+            if not vecinos:
+                return []
+            productos = {
+                p.id: p for p in Product.query.filter(Product.id.in_(vecinos), Product.is_active == True).all()
+            }
+            resultado = []
+            for product_id in vecinos:
+                producto = productos.get(product_id)
+                if producto is None:
+                    continue
+                metadata = json.loads(producto.metadata_json) if producto.metadata_json else {}
+                resultado.append({
+                    'ingramPartNumber': producto.ingram_part_number,
+                    'description': producto.description,
+                    'vendorName': producto.vendor_name,
+                    'category': producto.category,
+                    'productImages': metadata.get('productImages', []),
+                    'image_url': producto.image_url,
+                })
+            return resultado
+        except Exception as e:
+            print(f"Error obteniendo productos similares de {part_number}: {e}")
+            return []
+
+
+# Instancia global
+similar_products = SimilarProducts()
@@ -4,6 +4,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(db.Model):
     __tablename__ = 'users'
+    # Orden de los listados paginados del admin (paginate_keyset)
+    __table_args__ = (db.Index('idx_users_created_id', 'created_at', 'id'),)
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -0,0 +1,131 @@
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event
+
+# Estados que el dashboard cuenta como "pendientes" y como venta
+PENDING_QUOTE_STATUSES = ('draft', 'sent', 'pending', 'under_review', 'waiting_approval')
+SALES_QUOTE_STATUSES = ('approved', 'paid')
+
+
+class UserSummaryCache:
+    """
+    Resumen por usuario para los dashboards: cotizaciones por estado, monto
+    vendido, carrito activo y favoritos. Se calcula con una consulta agrupada
+    por tabla y se guarda en memoria; los eventos de mapper de Quote, Cart,
+    CartItem y Favorite invalidan solo el resumen del usuario afectado.
+    Los cambios hechos en otros workers se ven al expirar el TTL.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._cache: Dict[str, tuple] = {}
+        self._cart_owner: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        self.ttl_seconds = app.config.get('USER_SUMMARY_CACHE_SECONDS', self.ttl_seconds)
+
+    def listen(self, quote_model, cart_model, cart_item_model, favorite_model):
+        """Invalida el resumen del usuario cuando cambian sus cotizaciones, carrito o favoritos."""
+        if self._listening:
+            return
+        self._listening = True
+
+        def _por_usuario(mapper, connection, target):
+            self.invalidate(target.user_id)
+
+        def _por_carrito(mapper, connection, target):
+            # El dueño del carrito se recuerda al calcular el resumen: sin consultas dentro del flush
+            owner = self._cart_owner.get(target.cart_id)
+            if owner is not None:
+                self.invalidate(owner)
+
+        for evento in ('after_insert', 'after_update', 'after_delete'):
+            for model in (quote_model, cart_model, favorite_model):
+                event.listen(model, evento, _por_usuario)
+            event.listen(cart_item_model, evento, _por_carrito)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+                self._cart_owner.clear()
+            else:
+                self._cache.pop(str(user_id), None)
+
+    def get(self, user_id) -> Dict:
+        """Resumen del usuario desde la cache (o calculado y guardado)."""
+        key = str(user_id)
+        entry = self._cache.get(key)
+        if entry is not None and time.time() < entry[1]:
+            return entry[0]
+
+        summary = self._calcular(user_id)
+        with self._lock:
+            if len(self._cache) >= self.max_entries:
+                self._cache.pop(next(iter(self._cache)), None)
+            self._cache[key] = (summary, time.time() + self.ttl_seconds)
+            if summary['cart']['id'] is not None:
+                self._cart_owner[summary['cart']['id']] = key
+        return summary
+
+    @staticmethod
+    def _calcular(user_id) -> Dict:
+        from app import db
+        from app.models import Quote, Cart, CartItem, Favorite, Product
+        from sqlalchemy import func
+
+        quotes_by_status: Dict[str, int] = {}
+        amount_by_status: Dict[str, float] = {}
+        for status, cantidad, monto in db.session.query(
+                Quote.status, func.count(Quote.id), func.coalesce(func.sum(Quote.total_amount), 0)
+        ).filter(Quote.user_id == user_id).group_by(Quote.status).all():
+            quotes_by_status[status] = cantidad
+            amount_by_status[status] = float(monto)
+
+        favorites_count = Favorite.query.filter_by(user_id=user_id).count()
+        recent_favorites = [
+            {'product_id': product_id, 'category': category, 'created_at': created_at}
+            for product_id, category, created_at in db.session.query(
+                Favorite.product_id, Product.category, Favorite.created_at
+            ).outerjoin(Product, Product.id == Favorite.product_id)
+             .filter(Favorite.user_id == user_id)
+             .order_by(Favorite.created_at.desc()).limit(5).all()
+        ]
+
+        cart = {'id': None, 'item_count': 0, 'total_items': 0, 'total_value': 0.0, 'updated_at': None}
+        fila = db.session.query(
+            Cart.id, Cart.updated_at, func.count(CartItem.id),
+            func.coalesce(func.sum(CartItem.quantity), 0),
+            func.coalesce(func.sum(func.coalesce(CartItem.unit_price, 0) * CartItem.quantity), 0)
+        ).outerjoin(CartItem, CartItem.cart_id == Cart.id)\
+         .filter(Cart.user_id == str(user_id), Cart.status == 'active')\
+         .group_by(Cart.id, Cart.updated_at).order_by(Cart.id).first()
+        if fila:
+            cart = {'id': fila[0], 'updated_at': fila[1], 'item_count': fila[2],
+                    'total_items': int(fila[3]), 'total_value': float(fila[4])}
+
+        return {
+            'quotes_by_status': quotes_by_status,
+            'total_quotes': sum(quotes_by_status.values()),
+            'sales_total': sum(amount_by_status.get(s, 0.0) for s in SALES_QUOTE_STATUSES),
+            'amount_by_status': amount_by_status,
+            'favorites_count': favorites_count,
+            'recent_favorites': recent_favorites,
+            'favorite_categories': sorted({f['category'] for f in recent_favorites if f['category']}),
+            'cart': cart
+        }
+
+    @staticmethod
+    def count(summary: Dict, statuses) -> int:
+        """Cotizaciones del resumen en cualquiera de los estados dados."""
+        por_estado = summary['quotes_by_status']
+        return sum(por_estado.get(s, 0) for s in statuses)
+
+
+# Instancia global
+user_summaries = UserSummaryCache()
@@ -1,35 +1,81 @@
 # app/models/user_utils.py (ACTUALIZADO)
-from flask import session
+from flask import session, g, has_request_context
 from app.models.user import User
 
+# Campos del usuario que se guardan en la sesión firmada para no consultarlo en cada página
+PROFILE_SESSION_KEY = 'user_profile'
+
 def get_current_user():
-    """Obtener el usuario actual basado en la sesión"""
+    """
+    Obtener el usuario actual basado en la sesión. Se carga una sola vez por
+    request y se guarda en flask.g; las llamadas siguientes (user_loader,
+    decoradores y vistas) reutilizan el mismo objeto.
+    """
     user_id = session.get('user_id')
     if not user_id or user_id == 'anonymous_user':
         return None
-    
+
+    cached = g.get('_current_user')
+    if cached is not None and cached[0] == user_id:
+        return cached[1]
+
     try:
-        return User.query.get(user_id)
+        from app import db
+        user = db.session.get(User, int(user_id))
     except:
         return None
+    g._current_user = (user_id, user)
+    return user
+
+def _perfil(user):
+    return {
+        'role': 'admin' if user.is_admin else user.account_type,
+        'account_type': user.account_type,
+        'is_verified': bool(user.is_verified),
+        'pricing_tier': 'business' if getattr(user, 'user_type', None) == 'business' else 'public'
+    }
+
+def remember_user(user):
+    """Guardar en la sesión el rol y nivel de precios del usuario (al iniciar sesión)."""
+    profile = _perfil(user)
+    session['user_role'] = profile['role']
+    session[PROFILE_SESSION_KEY] = profile
+    if has_request_context():
+        g._current_user = (user.id, user)
+    return profile
+
+def get_user_profile():
+    """
+    Rol, tipo de cuenta y nivel de precios del usuario actual. Se calculan
+    del usuario que get_current_user() ya cargó en g (una consulta por
+    request), no de la copia en la sesión: decide precios y redirecciones, y
+    un cambio hecho por un administrador (is_admin, account_type,
+    is_verified) debe aplicar en el siguiente request. La copia de la sesión
+    se actualiza si cambió.
+    """
+    if not session.get('user_id') or session.get('user_id') == 'anonymous_user':
+        return None
+    user = get_current_user()
+    if not user:
+        return None
+    profile = _perfil(user)
+    if session.get(PROFILE_SESSION_KEY) != profile:
+        remember_user(user)
+    return profile
 
 def is_public_user():
     """Determinar si el usuario actual es público (sin markup)"""
-    user = get_current_user()
     # Usuario anónimo o sin tipo definido es público (precio base)
-    if not user or not hasattr(user, 'user_type'):
-        return True
-    # Si es cliente empresarial, no es público (aplica markup)
-    return user.user_type != 'business'
+    return get_user_pricing_tier() != 'business'
 
 def is_business_user():
     """Determinar si el usuario actual es cliente empresarial (con markup)"""
-    user = get_current_user()
-    return user and hasattr(user, 'user_type') and user.user_type == 'business'
+    return get_user_pricing_tier() == 'business'
 
 def get_user_pricing_tier():
     """Obtener el nivel de precios del usuario"""
-    if is_business_user():
+    profile = get_user_profile()
+    if profile and profile.get('pricing_tier') == 'business':
         return 'business'  # Precios con markup
     else:
-        return 'public'    # Precios base (sin markup)
\ No newline at end of file
+        return 'public'    # Precios base (sin markup)
@@ -1,14 +1,18 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify, current_app, Response, stream_with_context
 from datetime import datetime
 from sqlalchemy import or_, func
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 from app import db
 from app.models import User, Quote, Product, QuoteHistory, QuoteItem
+from app.models.user_utils import get_current_user
 from app.models.product_utils import ProductUtils
 from app.models.image_handler import ImageHandler
 from app.models.api_client import APIClient
 from app.models.purchase import Purchase, PurchaseHistory, PurchaseItem
 from app.models.cart import Cart, CartItem  
+from app.models.pagination import paginate_keyset
+from app.models.cache_manager import count_cache
+from app.models.prefetch import catalog_prefetcher
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -21,7 +25,7 @@ def admin_required(f):
             flash('Por favor inicia sesión', 'danger')
             return redirect(url_for('auth.login', next=request.url))
         
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         if not user or not user.is_admin:
             flash('Acceso restringido a administradores', 'danger')
             return redirect(url_for('main.index'))
@@ -89,7 +93,7 @@ def dashboard():
 @admin_bp.route('/test')
 @admin_required
 def test():
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     return jsonify({'status': 'success', 'user': user.email, 'is_admin': user.is_admin})
 
 # ==================== RUTAS DE GESTIÓN ====================
@@ -125,14 +129,16 @@ def users():
         elif status == 'inactive':
             query = query.filter_by(is_active=False)
         
-        pagination = query.order_by(User.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        pagination = paginate_keyset(
+            query, (User.created_at, User.id), page=page, per_page=per_page,
+            cursor=request.args.get('cursor'), descending=True,
+            count_namespace='users', count_signature=(search, user_type, status)
         )
         
         return render_template('admin/users.html', 
                              users=pagination.items, 
                              pagination=pagination,
-                             current_user=User.query.get(session['user_id']))
+                             current_user=get_current_user())
         
     except Exception as e:
         return f"""
@@ -172,33 +178,24 @@ def quotes():
         if search:
             query = query.filter(Quote.quote_number.contains(search))
         
-        quotes_pagination = query.order_by(Quote.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        quotes_pagination = paginate_keyset(
+            query, (Quote.created_at, Quote.id), page=page, per_page=per_page,
+            cursor=request.args.get('cursor'), descending=True,
+            count_namespace='quotes', count_signature=(status_filter, search)
         )
         
+        # Subtotales de toda la página en una sola consulta agrupada
+        subtotales = quote_subtotals([quote.id for quote in quotes_pagination.items])
         quotes_with_totals = []
         for quote in quotes_pagination.items:
-            quote_items = QuoteItem.query.filter_by(quote_id=quote.id).all()
-            totals = calculate_quote_totals_with_tax(quote_items)
+            totals = calculate_quote_totals_with_tax(None, subtotal=subtotales.get(quote.id, 0.0))
             
             quotes_with_totals.append({
                 'quote': quote,
                 'total_with_tax': totals['total_amount']
             })
         
-        stats = {
-            'total': Quote.query.count(),
-            'draft': Quote.query.filter_by(status='draft').count(),
-            'sent': Quote.query.filter_by(status='sent').count(),
-            'pending': Quote.query.filter_by(status='pending').count(),
-            'approved': Quote.query.filter_by(status='approved').count(),
-            'rejected': Quote.query.filter_by(status='rejected').count(),
-            'in_progress': Quote.query.filter_by(status='in_progress').count(),
-            'completed': Quote.query.filter_by(status='completed').count(),
-            'invoiced': Quote.query.filter_by(status='invoiced').count(),
-            'paid': Quote.query.filter_by(status='paid').count(),
-            'cancelled': Quote.query.filter_by(status='cancelled').count()
-        }
+        stats = count_cache.get_or_compute('quotes', ('status_stats',), quote_status_stats)
         
         return render_template('admin/quotes.html',
                              quotes_with_totals=quotes_with_totals,  
@@ -217,6 +214,16 @@ def quotes():
                              stats={'total': 0, 'draft': 0, 'sent': 0, 'pending': 0, 'approved': 0, 'rejected': 0, 'in_progress': 0, 'completed': 0, 'invoiced': 0, 'paid': 0, 'cancelled': 0})
     
 # ==================== GESTIÓN DE PRODUCTOS (SOLO CATÁLOGO INGRAM) ====================
+def _sku_producto(producto):
+    """SKU de un producto del catálogo (las respuestas de Ingram y las locales usan llaves distintas)."""
+    for clave in ('ingramPartNumber', 'ingram_part_number', 'sku', 'partNumber', 'vendorPartNumber'):
+        if clave in producto:
+            return producto[clave]
+    for clave, valor in producto.items():
+        if 'sku' in clave.lower() or 'part' in clave.lower():
+            return valor
+    return None
+
 @admin_bp.route('/products')
 @admin_required
 def products():
@@ -235,89 +242,62 @@ def products():
             use_keywords=bool(query)
         )
         
+        # Primero se reúnen los SKUs; los precios salen de una consulta por lotes (con cache)
         productos_admin = []
         for producto in productos:
             if not isinstance(producto, dict):
                 continue
-                
             producto_admin = producto.copy()
-            
-            sku = None
-            posibles_claves = ['ingramPartNumber', 'ingram_part_number', 'sku', 'partNumber', 'vendorPartNumber']
-            
-            for clave in posibles_claves:
-                if clave in producto_admin:
-                    sku = producto_admin[clave]
-                    break
-
-            if not sku:
-                for clave, valor in producto_admin.items():
-                    if 'sku' in clave.lower() or 'part' in clave.lower():
-                        sku = valor
-                        break
-            
+            producto_admin['ingram_part_number'] = _sku_producto(producto_admin)
+            productos_admin.append(producto_admin)
+        
+        precios, sin_respuesta = ProductUtils.obtener_precios_en_lotes(
+            [p['ingram_part_number'] for p in productos_admin if p['ingram_part_number']],
+            timeout=current_app.config.get('ADMIN_PRICE_TIMEOUT', 8)
+        )
+        
+        # Margen y formato en una sola pasada
+        for producto_admin in productos_admin:
+            sku = producto_admin['ingram_part_number']
             if not sku:
                 producto_admin['precio_original'] = "SKU No Encontrado"
                 producto_admin['precio_publico'] = "SKU No Encontrado"
                 producto_admin['ingram_part_number'] = "NO SKU"
-                productos_admin.append(producto_admin)
                 continue
-
-            try:
-                price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability"
-                body = {"products": [{"ingramPartNumber": sku}]}
-                params = {
-                    "includeAvailability": "true",
-                    "includePricing": "true"
-                }
-                
-                precio_res = APIClient.make_request("POST", price_url, params=params, json=body)
-                
-                if precio_res and precio_res.status_code == 200:
-                    precio_data = precio_res.json()
-                    if precio_data and isinstance(precio_data, list) and len(precio_data) > 0:
-                        first_product = precio_data[0]
-                        if first_product.get('productStatusCode') != 'E':
-                            pricing = first_product.get('pricing', {})
-                            if pricing:
-                                customer_price = pricing.get('customerPrice')
-                                if customer_price is not None:
-                                    precio_original = float(customer_price)
-                                    producto_admin['precio_original'] = f"${precio_original:,.2f}"
-                                    
-                                    precio_publico = round(precio_original * 1.15, 2)
-                                    producto_admin['precio_publico'] = f"${precio_publico:,.2f}"
-                                    
-                                    producto_admin['disponibilidad_real'] = first_product.get('totalAvailability', 0)
-                                    producto_admin['disponible'] = first_product.get('available', False)
-                                else:
-                                    producto_admin['precio_original'] = "Consultar"
-                                    producto_admin['precio_publico'] = "Consultar"
-                            else:
-                                producto_admin['precio_original'] = "Consultar"
-                                producto_admin['precio_publico'] = "Consultar"
-                        else:
-                            producto_admin['precio_original'] = "No disponible"
-                            producto_admin['precio_publico'] = "No disponible"
-                    else:
-                        producto_admin['precio_original'] = "Consultar"
-                        producto_admin['precio_publico'] = "Consultar"
-                else:
-                    producto_admin['precio_original'] = "Error API"
-                    producto_admin['precio_publico'] = "Error API"
-                    
-            except Exception as price_error:
-                producto_admin['precio_original'] = "Error"
-                producto_admin['precio_publico'] = "Error"
             
-            producto_admin['ingram_part_number'] = sku
-            productos_admin.append(producto_admin)
+            precio_info = precios.get(sku)
+            if sku in sin_respuesta:
+                etiqueta = "Error API"
+            elif not precio_info:
+                etiqueta = "Consultar"
+            elif precio_info.get('productStatusCode') == 'E':
+                etiqueta = "No disponible"
+            else:
+                customer_price = (precio_info.get('pricing') or {}).get('customerPrice')
+                try:
+                    precio_original = float(customer_price) if customer_price is not None else None
+                except (ValueError, TypeError):
+                    precio_original = None
+                if precio_original is None:
+                    etiqueta = "Consultar"
+                else:
+                    etiqueta = None
+                    producto_admin['precio_original'] = f"${precio_original:,.2f}"
+                    producto_admin['precio_publico'] = f"${round(precio_original * 1.15, 2):,.2f}"
+                    producto_admin['disponibilidad_real'] = precio_info.get('totalAvailability', 0)
+                    producto_admin['disponible'] = precio_info.get('available', False)
+            if etiqueta:
+                producto_admin['precio_original'] = etiqueta
+                producto_admin['precio_publico'] = etiqueta
         
         total_pages = max(1, (total_records + page_size - 1) // page_size) if total_records > 0 else 1
         page_number = max(1, min(page_number, total_pages))
         start_record = (page_number - 1) * page_size + 1 if total_records > 0 else 0
         end_record = min(page_number * page_size, total_records)
         
+        catalog_prefetcher.after_catalog_page(productos, query, vendor, page_number, page_size,
+                                              bool(query), total_pages)
+        
         return render_template('admin/products_management.html',
                              productos_ingram=productos_admin,
                              page_number=page_number,
@@ -348,34 +328,17 @@ def product_catalog_detail(part_number):
             flash('Número de parte inválido', 'danger')
             return redirect(url_for('admin.products', view='catalog'))
 
-        detail_url = f"https://api.ingrammicro.com/resellers/v6/catalog/details/{part_number}"
-        detalle_res = APIClient.make_request("GET", detail_url)
+        detalle = ProductUtils.obtener_detalle_producto(part_number)
         
-        if detalle_res.status_code != 200:
+        if not detalle:
             flash(f'Producto {part_number} no encontrado en Ingram Micro', 'warning')
             return redirect(url_for('admin.products', view='catalog'))
         
-        detalle = detalle_res.json()
-        
-        if not detalle or 'ingramPartNumber' not in detalle:
+        if 'ingramPartNumber' not in detalle:
             flash(f'Datos del producto {part_number} incompletos', 'warning')
             return redirect(url_for('admin.products', view='catalog'))
 
-        price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability"
-        body = {"products": [{"ingramPartNumber": part_number}]}
-        params = {
-            "includeAvailability": "true",
-            "includePricing": "true",
-            "includeProductAttributes": "true"
-        }
-        
-        precio_res = APIClient.make_request("POST", price_url, params=params, json=body)
-        
-        precio_info = {}
-        if precio_res and precio_res.status_code == 200:
-            precio_data = precio_res.json()
-            if precio_data and isinstance(precio_data, list) and len(precio_data) > 0:
-                precio_info = precio_data[0]
+        precio_info = ProductUtils.obtener_precio_disponibilidad(part_number) or {}
 
         pricing = precio_info.get("pricing") or {}
         precio_original = pricing.get("customerPrice")
@@ -433,79 +396,90 @@ def product_catalog_detail(part_number):
 @admin_bp.route('/reports')
 @admin_required
 def reports():
-    """Reportes y analytics - SOLO DATOS REALES DE LA BD."""
+    """Reportes y analytics: se leen de las tablas diarias pre-agregadas (report_daily_*)."""
     try:
-        from sqlalchemy import func, extract
-        from datetime import datetime, timedelta
-        
-        total_users = User.query.count()
-        total_quotes = Quote.query.count()
-        
-        try:
-            from app.models.purchase import Purchase
-            total_purchases = Purchase.query.count()
-            total_revenue = db.session.query(func.sum(Purchase.total_amount)).filter(
-                Purchase.status.in_(['paid', 'shipped', 'delivered'])
-            ).scalar() or 0
-        except Exception:
-            total_purchases = 0
-            total_revenue = 0
-        
+        from datetime import timedelta
+        from app.models.report_rollup import report_rollup
+        from app.models.report_stats import (DailySummary, DailyQuoteStatus,
+                                             DailyUserActivity, DailyProductActivity)
+
+        period_days = 30
+        report_rollup.refresh_if_stale()
+
+        totales = db.session.query(
+            func.coalesce(func.sum(DailySummary.new_users), 0),
+            func.coalesce(func.sum(DailySummary.quotes), 0),
+            func.coalesce(func.sum(DailySummary.purchases), 0),
+            func.coalesce(func.sum(DailySummary.revenue), 0)
+        ).one()
+        total_users, total_quotes, total_purchases, total_revenue = totales
+
+        def _conteos_productos():
+            return (
+                Product.query.count(),
+                db.session.query(func.count(func.distinct(Product.category))).scalar() or 0
+            )
         try:
-            total_products = Product.query.count()
-            unique_categories = db.session.query(func.count(func.distinct(Product.category))).scalar() or 0
+            total_products, unique_categories = count_cache.get_or_compute(
+                'products', ('report_counts',), _conteos_productos)
         except Exception:
             total_products = 0
             unique_categories = 0
 
-        thirty_days_ago = datetime.now() - timedelta(days=30)
+        # Activos: usuarios que cotizaron o compraron en el periodo
+        inicio_periodo = datetime.utcnow().date() - timedelta(days=period_days - 1)
+        active_users_count = db.session.query(func.count(func.distinct(DailyUserActivity.user_id)))\
+            .filter(DailyUserActivity.day >= inicio_periodo).scalar() or 0
+        active_percentage = round((active_users_count / total_users * 100), 1) if total_users > 0 else 0
+
+        status_distribution = {}
         try:
-            active_users = User.query.filter(User.last_login >= thirty_days_ago).count()
-        except AttributeError:
-            active_users = User.query.filter(User.created_at >= thirty_days_ago).count()
-        
-        active_percentage = round((active_users / total_users * 100), 1) if total_users > 0 else 0
-        
-        approved_quotes = Quote.query.filter_by(status='approved').count()
+            for status, count in db.session.query(DailyQuoteStatus.status, func.sum(DailyQuoteStatus.quotes))\
+                    .group_by(DailyQuoteStatus.status).all():
+                if status and count:
+                    status_distribution[status] = count
+        except Exception:
+            status_distribution = {}
+
+        approved_quotes = status_distribution.get('approved', 0)
         conversion_rate = round((approved_quotes / total_quotes * 100), 1) if total_quotes > 0 else 0
         
         top_users_formatted = []
         try:
+            cotizaciones = func.sum(DailyUserActivity.quotes).label('quote_count')
             user_stats = db.session.query(
-                User.id,
                 User.full_name,
                 User.email,
                 User.is_verified,
-                func.count(Quote.id).label('quote_count')
-            ).outerjoin(Quote, User.id == Quote.user_id)\
-             .group_by(User.id)\
-             .order_by(func.count(Quote.id).desc())\
+                cotizaciones
+            ).join(DailyUserActivity, DailyUserActivity.user_id == User.id)\
+             .group_by(User.id, User.full_name, User.email, User.is_verified)\
+             .having(cotizaciones > 0)\
+             .order_by(cotizaciones.desc())\
              .limit(5).all()
             
             for user_stat in user_stats:
-                if user_stat.quote_count and user_stat.quote_count > 0:
-                    top_users_formatted.append({
-                        'name': user_stat.full_name or user_stat.email.split('@')[0],
-                        'email': user_stat.email,
-                        'is_verified': user_stat.is_verified,
-                        'quotes': user_stat.quote_count or 0
-                    })
+                top_users_formatted.append({
+                    'name': user_stat.full_name or user_stat.email.split('@')[0],
+                    'email': user_stat.email,
+                    'is_verified': user_stat.is_verified,
+                    'quotes': user_stat.quote_count or 0
+                })
         except Exception:
             top_users_formatted = []
         
         top_products_formatted = []
         try:
-            from app.models import QuoteItem
-            
+            veces = func.sum(DailyProductActivity.times_quoted).label('times_quoted')
             product_stats = db.session.query(
                 Product.ingram_part_number,
                 Product.description,
                 Product.category,
-                func.count(QuoteItem.id).label('times_quoted'),
-                func.sum(QuoteItem.quantity).label('total_quantity')
-            ).outerjoin(QuoteItem, Product.id == QuoteItem.product_id)\
-             .group_by(Product.id)\
-             .order_by(func.count(QuoteItem.id).desc())\
+                veces,
+                func.sum(DailyProductActivity.quantity).label('total_quantity')
+            ).join(DailyProductActivity, DailyProductActivity.product_id == Product.id)\
+             .group_by(Product.id, Product.ingram_part_number, Product.description, Product.category)\
+             .order_by(veces.desc())\
              .limit(5).all()
             
             for product in product_stats:
@@ -518,11 +492,12 @@ def reports():
                         'total_quantity': product.total_quantity or 0
                     })
         except Exception:
-            top_users_formatted = []
+            top_products_formatted = []
         
         recent_quotes_formatted = []
         try:
-            recent_quotes = Quote.query.order_by(Quote.created_at.desc()).limit(10).all()
+            recent_quotes = Quote.query.options(joinedload(Quote.user), selectinload(Quote.items))\
+                .order_by(Quote.created_at.desc()).limit(10).all()
             
             for quote in recent_quotes:
                 recent_quotes_formatted.append({
@@ -536,22 +511,11 @@ def reports():
                 })
         except Exception:
             recent_quotes_formatted = []
-        
-        status_distribution = {}
-        try:
-            status_counts = db.session.query(
-                Quote.status,
-                func.count(Quote.id)
-            ).group_by(Quote.status).all()
-            
-            for status, count in status_counts:
-                if status:
-                    status_distribution[status] = count
-        except Exception:
-            status_distribution = {}
+
+        serie = report_rollup.series(period_days)
         
         report_data = {
-            'period_days': 30,
+            'period_days': period_days,
             'report_generated': datetime.now(),
             'total_users': total_users,
             'total_quotes': total_quotes,
@@ -565,8 +529,10 @@ def reports():
             'top_products': top_products_formatted,
             'recent_quotes': recent_quotes_formatted,
             'status_distribution': status_distribution,
-            'sales_data': [],
-            'active_users': []
+            'sales_data': [
+                {'date': p['date'], 'purchases': p['paid_purchases'], 'revenue': p['revenue']} for p in serie
+            ],
+            'active_users': [{'date': p['date'], 'users': p['active_users']} for p in serie]
         }
         
         return render_template('admin/reports.html', **report_data)
@@ -763,28 +729,128 @@ def delete_user(user_id):
 @admin_bp.route('/api/stats')
 @admin_required
 def api_stats():
-    """API para obtener estadísticas actualizadas."""
+    """API para obtener estadísticas actualizadas (instantánea recalculada solo cuando hay eventos)."""
+    from app.models.event_bus import admin_events
     try:
-        total_users = User.query.count()
-        pending_quotes = Quote.query.filter_by(status='pending').count()
-        monthly_revenue = 0
-        low_stock = Product.query.filter(Product.stock < 10).count()
-        
+        stats = admin_events.stats()
         return jsonify({
-            'total_users': total_users,
-            'pending_quotes': pending_quotes,
-            'monthly_revenue': monthly_revenue,
-            'low_stock': low_stock
+            'total_users': stats['total_users'],
+            'pending_quotes': stats['pending_quotes'],
+            'monthly_revenue': stats['monthly_revenue'],
+            'low_stock': stats['low_stock']
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/api/search-metrics')
+@admin_required
+def api_search_metrics():
+    """Latencias (p50/p95/p99), resultados, cache y llamadas a Ingram por modo de búsqueda."""
+    from app.models.search_metrics import search_metrics
+    from app.models.prefetch import catalog_prefetcher
+    try:
+        window = request.args.get('window', type=int)
+        metrics = search_metrics.snapshot(window)
+        metrics['prefetch'] = catalog_prefetcher.stats()
+        return jsonify(metrics)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/api/reports/timeseries')
+@admin_required
+def api_reports_timeseries():
+    """Serie diaria para las gráficas de reportes (?days=30, máximo 366), leída de las tablas pre-agregadas."""
+    from app.models.report_rollup import report_rollup
+    try:
+        days = min(max(request.args.get('days', 30, type=int), 1), 366)
+        report_rollup.refresh_if_stale()
+        return jsonify({'days': days, 'series': report_rollup.series(days)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/api/new-quotes')
 @admin_required
 def api_new_quotes():
-    """API para verificar nuevas cotizaciones."""
-    return jsonify({'count': 0})
+    """API para verificar nuevas cotizaciones desde el último id de evento visto (?since=)."""
+    from app.models.event_bus import admin_events
+    try:
+        since = request.args.get('since', type=int)
+        last_id = admin_events.last_id
+        if since is None:
+            return jsonify({'count': 0, 'last_id': last_id})
+        nuevas = [e for e in admin_events.events_since(since) if e['kind'] == 'quote.new']
+        return jsonify({'count': len(nuevas), 'last_id': max(last_id, since), 'quotes': [e['data'] for e in nuevas]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _sse(kind, data, event_id=None):
+    """Mensaje en formato text/event-stream."""
+    import json
+    mensaje = f'event: {kind}\n'
+    if event_id is not None:
+        mensaje += f'id: {event_id}\n'
+    return mensaje + f'data: {json.dumps(data, default=str)}\n\n'
+
+@admin_bp.route('/api/events')
+@admin_required
+def api_events():
+    """Long-poll: espera hasta ?timeout= segundos (máx. 30) eventos con id > ?since= y devuelve las estadísticas."""
+    from app.models.event_bus import admin_events
+    try:
+        since = request.args.get('since', type=int)
+        if since is None:
+            return jsonify({'events': [], 'last_id': admin_events.last_id, 'stats': admin_events.stats()})
+        timeout = min(max(request.args.get('timeout', 25, type=float), 0), 30)
+        eventos = admin_events.events_since(since)
+        last_id = max([since] + [e['id'] for e in eventos])
+        if not eventos:
+            eventos, last_id = admin_events.wait(since, timeout)
+        return jsonify({'events': eventos, 'last_id': last_id, 'stats': admin_events.stats()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/api/events/stream')
+@admin_required
+def api_events_stream():
+    """
+    Server-Sent Events: nuevas cotizaciones, cambios de estado y compras, más
+    un evento `stats` tras cada lote. El stream se cierra tras
+    ADMIN_EVENTS_STREAM_SECONDS; EventSource se reconecta con Last-Event-ID.
+    """
+    import time
+    from app.models.event_bus import admin_events
+
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', type=int)
+    pendientes = admin_events.events_since(since) if since is not None else []
+    if since is None:
+        since = admin_events.last_id
+    stats = admin_events.stats()
+    duracion = current_app.config.get('ADMIN_EVENTS_STREAM_SECONDS', 300)
+    db.session.remove()     # el stream no vuelve a usar la BD
+
+    def generar(since):
+        fin = time.time() + duracion
+        yield 'retry: 3000\n\n'
+        for evento in pendientes:
+            since = max(since, evento['id'])
+            yield _sse(evento['kind'], evento, evento['id'])
+        yield _sse('stats', stats, since)
+        while time.time() < fin:
+            eventos, since = admin_events.wait(since, min(15, max(fin - time.time(), 0)))
+            if not eventos:
+                yield ': ping\n\n'
+                continue
+            for evento in eventos:
+                yield _sse(evento['kind'], evento, evento['id'])
+            yield _sse('stats', admin_events.stats(cached_only=True), since)
+
+    respuesta = Response(stream_with_context(generar(since)), mimetype='text/event-stream')
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    return respuesta
 
 # ==================== RUTA DE DEBUG ====================
 @admin_bp.route('/debug')
@@ -857,7 +923,7 @@ def update_quote_status(quote_id):
         data = request.json
         action = data.get('action')
         admin_notes = data.get('admin_notes', '')
-        admin_user = User.query.get(session['user_id'])
+        admin_user = get_current_user()
         
         new_status = None
         action_description = ""
@@ -933,7 +999,7 @@ def add_quote_note(quote_id):
         quotation = Quote.query.get_or_404(quote_id)
         data = request.json
         note = data.get('note', '').strip()
-        admin_user = User.query.get(session['user_id'])
+        admin_user = get_current_user()
         
         if note:
             history = QuoteHistory(
@@ -1135,13 +1201,13 @@ def settings():
         
         return render_template('admin/settings.html', 
                              settings=system_settings,
-                             current_user=User.query.get(session['user_id']))
+                             current_user=get_current_user())
         
     except Exception as e:
         flash(f'Error al cargar configuración: {str(e)}', 'danger')
         return render_template('admin/settings.html', 
                              settings={},
-                             current_user=User.query.get(session['user_id']))
+                             current_user=get_current_user())
 
 @admin_bp.route('/settings/update', methods=['POST'])
 @admin_required
@@ -1184,7 +1250,7 @@ def cancel_quote(quote_id):
     """Cancelar una cotización (cambio de estado a cancelled)."""
     try:
         quote = Quote.query.get_or_404(quote_id)
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         
         if quote.status == 'cancelled':
             flash(f'La cotización #{quote.quote_number} ya está cancelada', 'warning')
@@ -1217,7 +1283,7 @@ def cancel_quote(quote_id):
 def quotes_bulk_action():
     """Acciones masivas sobre cotizaciones."""
     try:
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         action = request.form.get('bulk_action')
         quote_ids = request.form.getlist('quote_ids')
         
@@ -1300,50 +1366,56 @@ def purchases():
                 (Purchase.items.any(PurchaseItem.product_sku.contains(search)))
             )
         
-        purchases_pagination = query.order_by(Purchase.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        purchases_pagination = paginate_keyset(
+            query, (Purchase.created_at, Purchase.id), page=page, per_page=per_page,
+            cursor=request.args.get('cursor'), descending=True,
+            count_namespace='purchases', count_signature=(status_filter, search)
         )
         
-        active_carts = Cart.query.options(
-            joinedload(Cart.items).joinedload(CartItem.product)
-        ).filter(Cart.status == 'active').order_by(Cart.updated_at.desc()).all()
-        
+        # Carritos activos: solo se cargan (paginados) en su pestaña
+        carts_pagination = None
         carts_with_tax = []
-        for cart in active_carts:
-            subtotal = sum(item.total_price for item in cart.items if item.total_price)
-            tax_amount = round(subtotal * 0.16, 2)
-            total_with_tax = round(subtotal + tax_amount, 2)
+        if tab == 'carts':
+            carts_pagination = paginate_keyset(
+                Cart.query.options(selectinload(Cart.items).joinedload(CartItem.product))
+                    .filter(Cart.status == 'active'),
+                (Cart.updated_at, Cart.id), page=page, per_page=per_page,
+                cursor=request.args.get('cursor'), descending=True,
+                count_namespace='carts', count_signature=('active',)
+            )
+            subtotales = dict(db.session.query(CartItem.cart_id, func.sum(CartItem.total_price)).filter(
+                CartItem.cart_id.in_([cart.id for cart in carts_pagination.items])
+            ).group_by(CartItem.cart_id).all()) if carts_pagination.items else {}
             
-            carts_with_tax.append({
-                'cart': cart,
-                'subtotal': subtotal,
-                'tax_amount': tax_amount,
-                'total_with_tax': total_with_tax,
-                'formatted_subtotal': f"${subtotal:,.2f}",
-                'formatted_tax': f"${tax_amount:,.2f}",
-                'formatted_total_with_tax': f"${total_with_tax:,.2f}"
-            })
+            for cart in carts_pagination.items:
+                subtotal = float(subtotales.get(cart.id) or 0)
+                tax_amount = round(subtotal * 0.16, 2)
+                total_with_tax = round(subtotal + tax_amount, 2)
+                
+                carts_with_tax.append({
+                    'cart': cart,
+                    'subtotal': subtotal,
+                    'tax_amount': tax_amount,
+                    'total_with_tax': total_with_tax,
+                    'formatted_subtotal': f"${subtotal:,.2f}",
+                    'formatted_tax': f"${tax_amount:,.2f}",
+                    'formatted_total_with_tax': f"${total_with_tax:,.2f}"
+                })
+        
+        # Número de carritos activos y su valor total, en una sola consulta
+        active_carts_count, carts_subtotal = db.session.query(
+            func.count(func.distinct(Cart.id)), func.sum(CartItem.total_price)
+        ).select_from(Cart).outerjoin(CartItem, CartItem.cart_id == Cart.id).filter(Cart.status == 'active').one()
+        carts_subtotal = float(carts_subtotal or 0)
+        total_cart_value_with_tax = round(carts_subtotal + round(carts_subtotal * 0.16, 2), 2)
         
-        total_revenue_query = db.session.query(db.func.sum(Purchase.total_amount)).filter(
-            Purchase.status.in_(['paid', 'shipped', 'delivered'])
-        ).scalar() or 0
-        
-        total_cart_value_with_tax = sum(cart['total_with_tax'] for cart in carts_with_tax)
-        
-        stats = {
-            'total': Purchase.query.count(),
-            'pending': Purchase.query.filter_by(status='pending').count(),
-            'paid': Purchase.query.filter_by(status='paid').count(),
-            'shipped': Purchase.query.filter_by(status='shipped').count(),
-            'delivered': Purchase.query.filter_by(status='delivered').count(),
-            'cancelled': Purchase.query.filter_by(status='cancelled').count(),
-            'refunded': Purchase.query.filter_by(status='refunded').count(),
-            'total_revenue': float(total_revenue_query),
-            'active_carts': len(active_carts),
+        stats = dict(count_cache.get_or_compute('purchases', ('status_stats',), purchase_status_stats))
+        stats.update({
+            'active_carts': active_carts_count,
             'total_cart_value': total_cart_value_with_tax,
-            'formatted_total_revenue': f"${float(total_revenue_query):,.2f}",
+            'formatted_total_revenue': f"${stats['total_revenue']:,.2f}",
             'formatted_total_cart_value': f"${total_cart_value_with_tax:,.2f}"
-        }
+        })
         
         return render_template('admin/purchases.html',
                              purchases=purchases_pagination.items,
@@ -1353,7 +1425,8 @@ def purchases():
                              search=search,
                              tab=tab,
                              stats=stats,
-                             active_carts=carts_with_tax)
+                             active_carts=carts_with_tax,
+                             carts_pagination=carts_pagination)
         
     except Exception as e:
         flash(f'Error al cargar compras: {str(e)}', 'danger')
@@ -1392,7 +1465,7 @@ def update_purchase_status(purchase_id):
         data = request.json
         new_status = data.get('status')
         admin_notes = data.get('admin_notes', '')
-        admin_user = User.query.get(session['user_id'])
+        admin_user = get_current_user()
         
         valid_statuses = ['pending', 'paid', 'shipped', 'delivered', 'cancelled', 'refunded']
         
@@ -1439,7 +1512,7 @@ def add_purchase_note(purchase_id):
         
         data = request.json
         note = data.get('note', '').strip()
-        admin_user = User.query.get(session['user_id'])
+        admin_user = get_current_user()
         
         if note:
             history = PurchaseHistory(
@@ -1463,37 +1536,18 @@ def add_purchase_note(purchase_id):
 @admin_bp.route('/api/purchases/stats')
 @admin_required
 def api_purchases_stats():
-    """API para estadísticas de compras."""
+    """API para estadísticas de compras (instantánea recalculada solo cuando hay eventos)."""
+    from app.models.event_bus import admin_events
     try:
-        from app.models import Purchase
-        from sqlalchemy import func, extract
-        from datetime import datetime, timedelta
-        
-        total_purchases = Purchase.query.count()
-        pending_purchases = Purchase.query.filter_by(status='pending').count()
-        paid_purchases = Purchase.query.filter_by(status='paid').count()
-        
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        monthly_revenue = db.session.query(func.sum(Purchase.total_amount)).filter(
-            Purchase.status.in_(['paid', 'shipped', 'delivered']),
-            extract('month', Purchase.created_at) == current_month,
-            extract('year', Purchase.created_at) == current_year
-        ).scalar() or 0
-        
-        today = datetime.now().date()
-        today_purchases = Purchase.query.filter(
-            func.date(Purchase.created_at) == today
-        ).count()
-        
+        stats = admin_events.stats()
         return jsonify({
             'success': True,
             'stats': {
-                'total_purchases': total_purchases,
-                'pending_purchases': pending_purchases,
-                'paid_purchases': paid_purchases,
-                'monthly_revenue': float(monthly_revenue),
-                'today_purchases': today_purchases
+                'total_purchases': stats['total_purchases'],
+                'pending_purchases': stats['pending_purchases'],
+                'paid_purchases': stats['paid_purchases'],
+                'monthly_revenue': stats['monthly_revenue'],
+                'today_purchases': stats['today_purchases']
             }
         })
         
@@ -1718,7 +1772,7 @@ def duplicate_quote(quote_id):
     """Duplicar una cotización"""
     try:
         original_quote = Quote.query.get_or_404(quote_id)
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         
         quote_number = f"QT{datetime.now().strftime('%Y%m%d%H%M%S')}"
         new_quote = Quote(
@@ -1763,9 +1817,52 @@ def duplicate_quote(quote_id):
         flash(f'Error al duplicar cotización: {str(e)}', 'danger')
         return redirect(url_for('admin.quote_detail', quote_id=quote_id))
 
-def calculate_quote_totals_with_tax(quote_items):
-    """Calcular totales de cotización con IVA incluido - CORREGIDO"""
-    subtotal = 0.0
+QUOTE_STATUSES = ('draft', 'sent', 'pending', 'approved', 'rejected', 'in_progress',
+                  'completed', 'invoiced', 'paid', 'cancelled')
+
+def quote_status_stats():
+    """Total de cotizaciones y conteo por estado con un solo GROUP BY."""
+    stats = dict.fromkeys(('total',) + QUOTE_STATUSES, 0)
+    for status, count in db.session.query(Quote.status, func.count(Quote.id)).group_by(Quote.status):
+        stats['total'] += count
+        if status in stats and status != 'total':
+            stats[status] = count
+    return stats
+
+PURCHASE_STATUSES = ('pending', 'paid', 'shipped', 'delivered', 'cancelled', 'refunded')
+REVENUE_STATUSES = ('paid', 'shipped', 'delivered')
+
+def purchase_status_stats():
+    """Compras por estado e ingresos (pagadas, enviadas y entregadas) con un solo GROUP BY."""
+    stats = dict.fromkeys(('total',) + PURCHASE_STATUSES, 0)
+    stats['total_revenue'] = 0.0
+    filas = db.session.query(
+        Purchase.status, func.count(Purchase.id), func.sum(Purchase.total_amount)
+    ).group_by(Purchase.status)
+    for status, count, amount in filas:
+        stats['total'] += count
+        if status in PURCHASE_STATUSES:
+            stats[status] = count
+        if status in REVENUE_STATUSES:
+            stats['total_revenue'] += float(amount or 0)
+    return stats
+
+def quote_subtotals(quote_ids):
+    """Subtotal (precio unitario x cantidad) de varias cotizaciones en una sola consulta: {quote_id: subtotal}."""
+    if not quote_ids:
+        return {}
+    filas = db.session.query(
+        QuoteItem.quote_id,
+        func.sum(func.coalesce(QuoteItem.unit_price, 0.0) * func.coalesce(QuoteItem.quantity, 0))
+    ).filter(QuoteItem.quote_id.in_(quote_ids)).group_by(QuoteItem.quote_id)
+    return {quote_id: float(subtotal or 0) for quote_id, subtotal in filas}
+
+def calculate_quote_totals_with_tax(quote_items, subtotal=None):
+    """Calcular totales de cotización con IVA incluido (o a partir de un subtotal ya calculado) - CORREGIDO"""
+    if subtotal is not None:
+        quote_items = ()
+    else:
+        subtotal = 0.0
     
     for item in quote_items:
         try:
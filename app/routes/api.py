@@ -17,25 +17,184 @@ def health_check():
         'timestamp': '2025-09-12T18:30:00Z'
     })
 
+# ==================== CATÁLOGO (JSON / NDJSON) ====================
+
+API_PAGE_SIZE = 25
+API_MAX_PAGE_SIZE = 100
+API_NDJSON_MAX_ROWS = 10000
+PRICE_SORTS = ('price_asc', 'price_desc')
+API_FIELDS = ('ingramPartNumber', 'description', 'vendorName', 'vendorPartNumber', 'category',
+              'pricing', 'productImages', 'availability', 'es_local')
+
+
+def _lista_param(nombre):
+    """Parámetro separado por comas (?vendor=HP,Dell) como lista sin vacíos."""
+    return [v.strip() for v in request.args.get(nombre, '').split(',') if v.strip()]
+
+
+def _markup_api():
+    """
+    Markup del que llama, igual que en las vistas HTML: clientes verificados
+    ven el precio del catálogo de clientes y el resto el del catálogo público.
+    La API nunca expone base_price (costo de Ingram) sin markup.
+    """
+    from app.models.line_items import CART_MARKUP, QUOTE_MARKUP
+    from app.models.user_utils import get_user_profile
+
+    perfil = get_user_profile()
+    if perfil and perfil['account_type'] == 'client' and perfil['is_verified']:
+        return QUOTE_MARKUP
+    return CART_MARKUP
+
+
+def _con_markup(producto, markup):
+    """Fila de la API con customerPrice ya con markup (como precio_final en las tarjetas del catálogo)."""
+    pricing = producto.get('pricing')
+    if pricing and pricing.get('customerPrice') is not None:
+        producto['pricing'] = dict(pricing, customerPrice=round(pricing['customerPrice'] * markup, 2))
+    return producto
+
+
+def _catalog_response(query, envelope):
+    """
+    Página del catálogo local sobre la instantánea columnar (sin objetos del
+    ORM): filtros de precio/existencia/marca/categoría/subcategoría, orden, cursor,
+    proyección de campos (fields=), ETag/If-None-Match y, con format=ndjson
+    o Accept: application/x-ndjson, un producto por línea para cargas masivas.
+    """
+    import hashlib
+    import json
+    from flask import Response
+    from app.models.catalog_table import catalog_table
+    from app.models.pagination import encode_cursor, decode_cursor
+    from app.models.product_utils import ProductUtils
+
+    markup = _markup_api()
+    filtros, orden, _, _ = ProductUtils.filtros_catalogo(request.args, markup)
+    vendors = _lista_param('vendor')
+    categories = _lista_param('category')
+    if vendors:
+        filtros['vendors'] = vendors
+    if categories:
+        filtros['categories'] = categories
+
+    fields = _lista_param('fields')
+    desconocidos = [f for f in fields if f not in API_FIELDS]
+    if desconocidos:
+        return jsonify({'error': f"Campos no válidos: {', '.join(desconocidos)}",
+                        'fields': list(API_FIELDS)}), 400
+
+    orden = orden or 'relevance'
+    after = None
+    cursor_param = request.args.get('cursor', '').strip()
+    if cursor_param:
+        valores, _ = decode_cursor(cursor_param)
+        # El cursor es [orden, valor de la llave, id]; en orden por precio el valor
+        # no viaja (sería el costo) y se toma de la instantánea por id
+        if not valores or len(valores) != 3 or valores[0] != orden:
+            return jsonify({'error': 'Cursor inválido para esta consulta'}), 400
+        after = valores[1:]
+
+    ndjson = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+    maximo = API_NDJSON_MAX_ROWS if ndjson else API_MAX_PAGE_SIZE
+    limit = min(max(request.args.get('limit', API_NDJSON_MAX_ROWS if ndjson else API_PAGE_SIZE, type=int), 1), maximo)
+
+    try:
+        table = catalog_table.get_table()
+        # La respuesta depende del contenido del catálogo, de los parámetros y del markup del que llama
+        firma = hashlib.sha1(
+            json.dumps([request.path, sorted(request.args.items(multi=True)), ndjson, markup]).encode()
+        ).hexdigest()[:16]
+        etag = f'{table.fingerprint}-{firma}'
+        if request.if_none_match.contains_weak(etag):
+            respuesta = Response(status=304)
+            respuesta.set_etag(etag, weak=True)
+            return respuesta
+
+        if after and orden in PRICE_SORTS:
+            after = table.cursor_for_id(after[1], orden)
+            if after is None:
+                return jsonify({'error': 'Cursor inválido para esta consulta'}), 400
+
+        product_ids = ProductUtils.ids_catalogo_local(query, filtros)
+
+        posiciones, total, siguiente = table.page(filtros, orden, after, limit, product_ids)
+        if siguiente and orden in PRICE_SORTS:
+            siguiente = [None, siguiente[1]]
+        next_cursor = encode_cursor([orden] + siguiente) if siguiente else None
+    except Exception as e:
+        return jsonify({'error': f'Error consultando el catálogo: {str(e)}'}), 500
+
+    if ndjson:
+        def generar():
+            for i in posiciones:
+                yield json.dumps(_con_markup(table.row(i, fields), markup), ensure_ascii=False) + '\n'
+
+        respuesta = Response(generar(), mimetype='application/x-ndjson')
+        respuesta.headers['X-Total-Count'] = str(total)
+        if next_cursor:
+            respuesta.headers['X-Next-Cursor'] = next_cursor
+    else:
+        productos = [_con_markup(table.row(i, fields), markup) for i in posiciones]
+        respuesta = jsonify(dict(envelope(productos), count=len(productos), total=total,
+                                 sort=orden, next_cursor=next_cursor))
+    respuesta.set_etag(etag, weak=True)
+    respuesta.vary.add('Cookie')
+    return respuesta
+
+
 @api_bp.route('/products')
 def api_products():
-    """Endpoint de productos (placeholder)."""
-    return jsonify({
-        'products': [],
-        'count': 0,
-        'message': 'Endpoint de productos - En desarrollo'
-    })
+    """Productos del catálogo local con filtros, orden y paginación por cursor."""
+    return _catalog_response('', lambda productos: {'products': productos})
+
 
 @api_bp.route('/search')
 def api_search():
-    """Endpoint de búsqueda (placeholder)."""
+    """Búsqueda de texto en el catálogo local (todas las palabras), con los mismos filtros que /products."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'query': query, 'results': [], 'count': 0, 'total': 0, 'next_cursor': None,
+                        'error': 'Parámetro q requerido'}), 400
+    return _catalog_response(query, lambda productos: {'query': query, 'results': productos})
+
+@api_bp.route('/facets')
+def api_facets():
+    """
+    Conteos de facetas (marca, categoría, subcategoría, precio, existencia) del
+    catálogo local. Los rangos de precio son los del precio que ve quien llama.
+    """
+    from app.models.facets import facet_engine, FACETAS
+    
+    query = request.args.get('q', '').strip()
+    filters = {faceta: request.args.get(faceta, '').strip() for faceta in FACETAS}
+    
+    try:
+        facets = facet_engine.facet_counts(query, filters, _markup_api())
+        return jsonify({
+            'query': query,
+            'filters': {k: v for k, v in filters.items() if v},
+            'facets': facets
+        })
+    except Exception as e:
+        return jsonify({'error': f'Error calculando facetas: {str(e)}'}), 500
+
+@api_bp.route('/autocomplete')
+def api_autocomplete():
+    """Sugerencias de autocompletado por prefijo, ordenadas por popularidad."""
+    from app.models.autocomplete import autocomplete_service
+    
     query = request.args.get('q', '')
-    return jsonify({
-        'query': query,
-        'results': [],
-        'count': 0,
-        'message': 'Endpoint de búsqueda - En desarrollo'
-    })
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+    
+    try:
+        return jsonify({
+            'query': query,
+            'suggestions': autocomplete_service.suggest(query, limit=limit)
+        })
+    except Exception as e:
+        return jsonify({'query': query, 'suggestions': [], 'error': str(e)}), 500
 
 @api_bp.route('/user-info')
 @login_required
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from werkzeug.security import check_password_hash
 from app import db
 from app.models.user import User
+from app.models.user_utils import remember_user
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -23,7 +24,7 @@ def login():
             
             session['user_id'] = user.id
             session['user_email'] = user.email
-            session['user_role'] = 'admin' if user.is_admin else user.account_type
+            remember_user(user)
             
             flash(f'¡Bienvenido de vuelta, {user.full_name or user.email}!', 'success')
             return redirect(url_for('main.post_login'))
@@ -71,7 +72,7 @@ def register():
         if is_admin:
             session['user_id'] = new_user.id
             session['user_email'] = new_user.email
-            session['user_role'] = 'admin'
+            remember_user(new_user)
             flash('¡Cuenta de administrador creada exitosamente!', 'success')
             return redirect(url_for('main.post_login'))
         else:
@@ -3,12 +3,17 @@ from datetime import datetime
 import json
 from app import db
 from app.models.user import User
+from app.models.user_utils import get_current_user
 from app.models.quote import Quote, QuoteItem
+from app.models.line_items import LineItems, QUOTE_MARKUP
 from app.models.favorite import Favorite
 from app.models.product import Product
 from app.models.product_utils import ProductUtils
-from app.models.api_client import APIClient
 from app.models.image_handler import ImageHandler
+from app.models.prefetch import catalog_prefetcher
+from app.models.similar_products import similar_products
+from app.models.query_budget import query_budget
+from sqlalchemy.orm import joinedload, selectinload
 from functools import wraps
 
 # Crear Blueprint para rutas de clientes SIN prefijo
@@ -32,7 +37,9 @@ def get_current_user_id():
 def get_user_quotes(user_id):
     """Obtener cotización del usuario usando los nuevos modelos"""
     try:
-        quote = Quote.query.filter_by(user_id=user_id, status='draft').first()
+        quote = Quote.query.options(
+            selectinload(Quote.items).joinedload(QuoteItem.product)
+        ).filter_by(user_id=user_id, status='draft').first()
         if not quote:
             return []
         
@@ -47,7 +54,8 @@ def get_user_quotes(user_id):
                     'upc': product.upc,
                     'category': product.category,
                     'pricing': {'customerPrice': product.base_price},
-                    'productImages': json.loads(product.metadata_json).get('productImages', []) if product.metadata_json else []
+                    'productImages': product.product_images,
+                    'availability': product.availability
                 },
                 'quantity': item.quantity,
                 'added_date': item.created_at.isoformat()
@@ -68,13 +76,13 @@ def add_to_quote(user_id, product_data, quantity=1):
             db.session.add(quote)
             db.session.flush()
         
-        # Buscar o crear producto
-        product = Product.query.filter_by(ingram_part_number=product_data['ingramPartNumber']).first()
-        if not product:
+        # Una sola sentencia: INSERT ... ON CONFLICT (quote_id, product_id) DO UPDATE
+        part_number = product_data['ingramPartNumber']
+        if not LineItems.add_quote_item(quote.id, user_id, part_number, quantity):
             base_price = product_data.get('pricing', {}).get('customerPrice', 0)
             
             product = Product(
-                ingram_part_number=product_data['ingramPartNumber'],
+                ingram_part_number=part_number,
                 description=product_data.get('description', ''),
                 vendor_name=product_data.get('vendorName', 'N/A'),
                 upc=product_data.get('upc', ''),
@@ -87,26 +95,8 @@ def add_to_quote(user_id, product_data, quantity=1):
             )
             db.session.add(product)
             db.session.flush()
+            LineItems.add_quote_item(quote.id, user_id, part_number, quantity)
         
-        # Buscar item existente
-        existing_item = QuoteItem.query.filter_by(quote_id=quote.id, product_id=product.id).first()
-        
-        if existing_item:
-            existing_item.quantity += quantity
-            existing_item.calculate_total()
-        else:
-            base_price = product.base_price or 0
-            unit_price = base_price * 1.10
-            new_item = QuoteItem(
-                quote_id=quote.id,
-                product_id=product.id,
-                quantity=quantity,
-                unit_price=unit_price
-            )
-            new_item.calculate_total()
-            db.session.add(new_item)
-        
-        quote.calculate_total()
         db.session.commit()
         return True
         
@@ -205,7 +195,7 @@ def clear_user_quote(user_id):
 
 def get_user_favorites(user_id):
     """Obtener favoritos del usuario usando los nuevos modelos"""
-    favorites = Favorite.query.filter_by(user_id=user_id).all()
+    favorites = Favorite.query.options(joinedload(Favorite.product)).filter_by(user_id=user_id).all()
     
     favorite_list = []
     for fav in favorites:
@@ -237,21 +227,19 @@ def client_dashboard():
     """Dashboard para clientes empresariales"""
     try:
         user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if user.account_type != 'client':
             flash('Acceso no autorizado', 'error')
             return redirect('/dashboard')
         
-        total_quotes = Quote.query.filter_by(user_id=user_id).count()
+        from app.models.user_summary import user_summaries, PENDING_QUOTE_STATUSES
         
-        pending_quotes = Quote.query.filter_by(user_id=user_id).filter(
-            Quote.status.in_(['draft', 'sent', 'pending', 'under_review', 'waiting_approval'])
-        ).count()
-        
-        approved_quotes = Quote.query.filter_by(user_id=user_id, status='approved').count()
-        
-        favorites_count = Favorite.query.filter_by(user_id=user_id).count()
+        summary = user_summaries.get(user_id)
+        total_quotes = summary['total_quotes']
+        pending_quotes = user_summaries.count(summary, PENDING_QUOTE_STATUSES)
+        approved_quotes = user_summaries.count(summary, ['approved'])
+        favorites_count = summary['favorites_count']
         
         dashboard_data = {
             'user_name': user.full_name or user.email.split('@')[0],
@@ -283,16 +271,25 @@ def catalogo_completo_cards():
     query = request.args.get("q", "").strip()
     vendor = request.args.get("vendor", "").strip()
     
+    filtros, orden, filtros_qs, facetas_qs = ProductUtils.filtros_catalogo(request.args, QUOTE_MARKUP)
+    
     try:
-        productos, total_records, pagina_vacia = ProductUtils.buscar_productos_hibrido(
-            query=query, 
-            vendor=vendor, 
-            page_number=page_number, 
-            page_size=page_size, 
-            use_keywords=bool(query)
-        )
+        if filtros or orden:
+            # Precio, existencia y orden se resuelven sobre el catálogo local (columnar)
+            productos, total_records, pagina_vacia = ProductUtils.filtrar_catalogo_local(
+                query=query, vendor=vendor, filters=filtros, sort=orden,
+                page=page_number, page_size=page_size
+            )
+        else:
+            productos, total_records, pagina_vacia = ProductUtils.buscar_productos_hibrido(
+                query=query, 
+                vendor=vendor, 
+                page_number=page_number, 
+                page_size=page_size, 
+                use_keywords=bool(query)
+            )
         
-        if pagina_vacia and page_number > 1 and total_records > 0:
+        if pagina_vacia and page_number > 1 and total_records > 0 and not (filtros or orden):
             page_number = max(1, page_number - 1)
             productos, total_records, pagina_vacia = ProductUtils.buscar_productos_hibrido(
                 query=query, vendor=vendor, page_number=page_number, page_size=page_size, use_keywords=bool(query)
@@ -304,6 +301,10 @@ def catalogo_completo_cards():
         start_record = (page_number - 1) * page_size + 1 if total_records > 0 else 0
         end_record = min(page_number * page_size, total_records)
         
+        if not (filtros or orden):
+            catalog_prefetcher.after_catalog_page(productos, query, vendor, page_number, page_size,
+                                                  bool(query), total_pages)
+        
         return render_template(
             "client/catalog/catalog.html",
             productos=productos,
@@ -318,6 +319,12 @@ def catalogo_completo_cards():
             pagina_vacia=pagina_vacia,
             welcome_message=(page_number == 1 and not query and not vendor and not productos),
             local_vendors=ProductUtils.get_local_vendors(),
+            facets=ProductUtils.get_catalog_facets(query, vendor, filtros, QUOTE_MARKUP),
+            filtros=filtros,
+            orden=orden,
+            filtros_qs=filtros_qs,
+            facetas_qs=facetas_qs,
+            catalogo_local=bool(filtros or orden),
             get_image_url_enhanced=ImageHandler.get_image_url_enhanced,
             get_availability_text=ProductUtils.get_availability_text,
             format_currency=ProductUtils.format_currency,
@@ -349,40 +356,14 @@ def producto_detalle(part_number=None, sku=None):
         return render_template("errors/404.html", message="Producto no encontrado"), 404
     
     try:
-        detail_url = f"https://api.ingrammicro.com/resellers/v6/catalog/details/{product_id}"
-        detalle_res = APIClient.make_request("GET", detail_url)
+        detalle = ProductUtils.obtener_detalle_producto(product_id)
         
-        if detalle_res.status_code != 200:
+        if not detalle:
             return render_template("errors/404.html", message=f"Producto {product_id} no encontrado"), 404
-        
-        detalle = detalle_res.json()
-
-        catalog_url = "https://api.ingrammicro.com/resellers/v6/catalog"
-        params = {
-            "pageSize": 1,
-            "pageNumber": 1,
-            "partNumber": product_id
-        }
-        catalog_res = APIClient.make_request("GET", catalog_url, params=params)
-        catalog_data = catalog_res.json() if catalog_res.status_code == 200 else {}
 
-        extra_description = None
-        if isinstance(catalog_data, dict) and catalog_data.get("catalog"):
-            productos = catalog_data["catalog"]
-            if isinstance(productos, list) and len(productos) > 0:
-                producto = productos[0]
-                extra_description = producto.get("extraDescription")
+        extra_description = ProductUtils.obtener_entrada_catalogo(product_id).get("extraDescription")
 
-        price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability"
-        body = {"products": [{"ingramPartNumber": product_id}]}
-        params = {
-            "includeAvailability": "true",
-            "includePricing": "true",
-            "includeProductAttributes": "true"
-        }
-        precio_res = APIClient.make_request("POST", price_url, params=params, json=body)
-        precio = precio_res.json() if precio_res.status_code == 200 else []
-        precio_info = precio[0] if isinstance(precio, list) and precio else (precio if isinstance(precio, dict) else {})
+        precio_info = ProductUtils.obtener_precio_disponibilidad(product_id) or {}
 
         pricing = precio_info.get("pricing") or {}
         base_price = pricing.get("customerPrice")
@@ -421,7 +402,8 @@ def producto_detalle(part_number=None, sku=None):
             imagen_url=imagen_url,
             part_number=product_id,
             extra_description=extra_description,
-            descripcion_completa=descripcion_completa
+            descripcion_completa=descripcion_completa,
+            similares=similar_products.for_part_number(product_id)
         )
     
     except Exception as e:
@@ -437,51 +419,9 @@ def agregar_cotizacion():
             if not part_number:
                 return render_template("error.html", error="Número de parte requerido")
             
-            detail_url = f"https://api.ingrammicro.com/resellers/v6/catalog/details/{part_number}"
-            detalle_res = APIClient.make_request("GET", detail_url)
-            
-            if detalle_res.status_code != 200:
+            product_data = ProductUtils.producto_para_alta(part_number)
+            if product_data is None:
                 return render_template("error.html", error="Producto no encontrado")
-            
-            detalle = detalle_res.json()
-            
-            price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability"
-            body = {"products": [{"ingramPartNumber": part_number}]}
-            params = {
-                "includeAvailability": "true",
-                "includePricing": "true",
-                "includeProductAttributes": "true"
-            }
-            precio_res = APIClient.make_request("POST", price_url, params=params, json=body)
-            
-            real_price = 0
-            availability_data = {}
-            
-            if precio_res.status_code == 200:
-                precio_data = precio_res.json()
-                if precio_data and isinstance(precio_data, list) and len(precio_data) > 0:
-                    first_product = precio_data[0]
-                    pricing = first_product.get('pricing', {})
-                    customer_price = pricing.get('customerPrice')
-                    
-                    if customer_price is not None:
-                        try:
-                            real_price = float(customer_price)
-                        except (ValueError, TypeError):
-                            real_price = 0
-                    
-                    availability_data = first_product.get('availability', {})
-            
-            product_data = {
-                'ingramPartNumber': part_number,
-                'description': detalle.get('description', f"Producto {part_number}"),
-                'pricing': {'customerPrice': real_price},
-                'vendorName': detalle.get('vendorName', 'N/A'),
-                'upc': detalle.get('upc', ''),
-                'category': detalle.get('category', ''),
-                'availability': availability_data,
-                'productImages': detalle.get('productImages', [])
-            }
             quantity = 1
             
         else:
@@ -506,6 +446,7 @@ def agregar_cotizacion():
         return render_template("error.html", error=f"Error al agregar producto: {str(e)}")
 
 @client_routes_bp.route('/mi-cotizacion', methods=["GET"])
+@query_budget.limit(4)
 def mi_cotizacion():
     """Página de cotización con formato mexicano - CON BASE DE DATOS"""
     try:
@@ -579,12 +520,10 @@ def agregar_favorito():
         vendor = request.form.get('vendor')
         
         if not description:
-            detail_url = f"https://api.ingrammicro.com/resellers/v6/catalog/details/{part_number}"
-            detalle_res = APIClient.make_request("GET", detail_url)
-            if detalle_res.status_code == 200:
-                detalle = detalle_res.json()
-                description = detalle.get('description', f"Producto {part_number}")
-                vendor = vendor or detalle.get('vendorName', 'N/A')
+            producto = ProductUtils.producto_para_alta(part_number, con_precio=False)
+            if producto:
+                description = producto.get('description')
+                vendor = vendor or producto.get('vendorName', 'N/A')
         
         product_data = {
             'ingramPartNumber': part_number,
@@ -607,6 +546,7 @@ def agregar_favorito():
         return render_template("error.html", error=f"Error con favoritos: {str(e)}")
 
 @client_routes_bp.route('/favoritos', methods=["GET"])
+@query_budget.limit(3)
 def mis_favoritos():
     """Página de favoritos del usuario - CON BASE DE DATOS"""
     try:
@@ -645,11 +585,12 @@ def eliminar_favorito():
 # ==================== RUTAS DE HISTORIAL DE COTIZACIONES ====================
 @client_routes_bp.route('/quote/history')
 @login_required_sessions
+@query_budget.limit(10)
 def quote_history():
     """Historial de cotizaciones del cliente"""
     try:
         user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if user.account_type != 'client':
             flash('Acceso no autorizado', 'error')
@@ -659,7 +600,7 @@ def quote_history():
         page = request.args.get('page', 1, type=int)
         per_page = 10
         
-        query = Quote.query.filter_by(user_id=user_id)
+        query = Quote.query.options(selectinload(Quote.items)).filter_by(user_id=user_id)
         
         if status == 'pending':
             query = query.filter(Quote.status.in_(['draft', 'sent', 'pending']))
@@ -674,21 +615,21 @@ def quote_history():
         
         quotes_with_totals = []
         for quote in quotes.items:
-            quote_items = QuoteItem.query.filter_by(quote_id=quote.id).all()
-            totals = calculate_quote_totals(quote_items)
+            totals = calculate_quote_totals(quote.items)
             
             quotes_with_totals.append({
                 'quote': quote,
                 'total_with_tax': totals['total_amount']
             })
         
+        # Conteos por estado desde el resumen cacheado del usuario (una consulta agrupada)
+        from app.models.user_summary import user_summaries
+        resumen = user_summaries.get(user_id)
         stats = {
-            'total': Quote.query.filter_by(user_id=user_id).count(),
-            'pending': Quote.query.filter_by(user_id=user_id).filter(
-                Quote.status.in_(['draft', 'sent', 'pending'])
-            ).count(),
-            'approved': Quote.query.filter_by(user_id=user_id, status='approved').count(),
-            'rejected': Quote.query.filter_by(user_id=user_id, status='rejected').count()
+            'total': resumen['total_quotes'],
+            'pending': user_summaries.count(resumen, ('draft', 'sent', 'pending')),
+            'approved': user_summaries.count(resumen, ('approved',)),
+            'rejected': user_summaries.count(resumen, ('rejected',))
         }
         
         return render_template('client/catalog/quote_history.html',
@@ -758,7 +699,7 @@ def create_quote_from_cart():
     """Crear una cotización formal desde el carrito/cotización actual"""
     try:
         user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         draft_quote = Quote.query.filter_by(user_id=user_id, status='draft').first()
         
@@ -854,6 +795,7 @@ def duplicate_quote(quote_id):
 # ==================== APIs JSON ====================
 
 @client_routes_bp.route("/api/get-quote", methods=["GET"])
+@query_budget.limit(4)
 def api_get_quote():
     """API para obtener cotización actual - CON BASE DE DATOS"""
     try:
@@ -924,6 +866,7 @@ def api_get_quote():
         }), 500
 
 @client_routes_bp.route("/api/get-favorites", methods=["GET"])
+@query_budget.limit(3)
 def api_get_favorites():
     """API para obtener favoritos - CON BASE DE DATOS"""
     try:
@@ -1047,53 +990,10 @@ def api_add_to_quote():
             except (ValueError, TypeError):
                 quantity = 1
         
-        detail_url = f"https://api.ingrammicro.com/resellers/v6/catalog/details/{part_number}"
-        detalle_res = APIClient.make_request("GET", detail_url)
-        
-        if detalle_res.status_code != 200:
+        product_data = ProductUtils.producto_para_alta(part_number)
+        if product_data is None:
             return jsonify({'success': False, 'error': 'Producto no encontrado'}), 404
         
-        detalle = detalle_res.json()
-        
-        price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability"
-        body = {"products": [{"ingramPartNumber": part_number}]}
-        params = {
-            "includeAvailability": "true",
-            "includePricing": "true",
-            "includeProductAttributes": "true"
-        }
-        precio_res = APIClient.make_request("POST", price_url, params=params, json=body)
-        
-        real_price = 0
-        availability_data = {}
-        
-        if precio_res.status_code == 200:
-            precio_data = precio_res.json()
-            
-            if isinstance(precio_data, list) and len(precio_data) > 0:
-                first_product = precio_data[0]
-                pricing = first_product.get('pricing', {})
-                customer_price = pricing.get('customerPrice')
-                
-                if customer_price is not None:
-                    try:
-                        real_price = float(customer_price)
-                    except (ValueError, TypeError):
-                        real_price = 0
-                
-                availability_data = first_product.get('availability', {})
-        
-        product_data = {
-            'ingramPartNumber': part_number,
-            'description': detalle.get('description', f"Producto {part_number}"),
-            'pricing': {'customerPrice': real_price},
-            'vendorName': detalle.get('vendorName', 'N/A'),
-            'upc': detalle.get('upc', ''),
-            'category': detalle.get('category', ''),
-            'availability': availability_data,
-            'productImages': detalle.get('productImages', [])
-        }
-        
         user_id = get_current_user_id()
         add_to_quote(user_id, product_data, quantity)
         
@@ -1113,16 +1013,13 @@ def api_toggle_favorite():
         data = request.get_json()
         part_number = data.get('part_number')
         
-        detail_url = f"https://api.ingrammicro.com/resellers/v6/catalog/details/{part_number}"
-        detalle_res = APIClient.make_request("GET", detail_url)
-        
         description = f"Producto {part_number}"
         vendor = "N/A"
         
-        if detalle_res.status_code == 200:
-            detalle = detalle_res.json()
-            description = detalle.get('description', description)
-            vendor = detalle.get('vendorName', vendor)
+        producto = ProductUtils.producto_para_alta(part_number, con_precio=False)
+        if producto:
+            description = producto.get('description') or description
+            vendor = producto.get('vendorName') or vendor
         
         product_data = {
             'ingramPartNumber': part_number,
@@ -1220,7 +1117,7 @@ def enviar_cotizacion():
     """Enviar cotización actual al administrador (desde la página de cotización)"""
     try:
         user_id = session.get('user_id')
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         draft_quote = Quote.query.filter_by(user_id=user_id, status='draft').first()
         
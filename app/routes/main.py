@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, redirect, url_for, jsonify, request, flash, session
 from app import db
 from app.models import User
+from app.models.user_utils import get_current_user, get_user_profile, remember_user
 
 # Definir el Blueprint
 main_bp = Blueprint('main', __name__)
@@ -41,7 +42,7 @@ def dashboard():
         flash('Sesión no válida', 'danger')
         return redirect(url_for('auth.login'))
     
-    user = User.query.get(user_id)
+    user = get_current_user()
     if not user:
         flash('Usuario no encontrado', 'danger')
         session.clear()
@@ -51,6 +52,9 @@ def dashboard():
         flash('Cuenta pendiente de activación. Contacta al administrador.', 'danger')
         return redirect(url_for('auth.logout'))
     
+    # Resincronizar rol/verificación en la sesión (pudieron cambiar desde el login)
+    remember_user(user)
+    
     if user.is_admin:
         return redirect(url_for('admin.dashboard'))
     elif user.account_type == 'client':
@@ -67,7 +71,7 @@ def dashboard():
 def client_dashboard():
     """Dashboard para clientes empresariales."""
     user_id = session.get('user_id')
-    user = User.query.get(user_id)
+    user = get_current_user()
     
     if user.is_admin:
         flash('Acceso redirigido al panel de administración', 'info')
@@ -76,21 +80,13 @@ def client_dashboard():
         flash('Acceso restringido a clientes', 'danger')
         return redirect(url_for('main.client_dashboard'))
     
-    from app.models import Quote
-    from sqlalchemy import func
-    
-    total_quotes = Quote.query.filter_by(user_id=user_id).count()
-    
-    pending_quotes = Quote.query.filter_by(user_id=user_id).filter(
-        Quote.status.in_(['pending', 'sent', 'under_review', 'waiting_approval', 'draft'])
-    ).count()
+    from app.models.user_summary import user_summaries, PENDING_QUOTE_STATUSES
     
-    approved_quotes = Quote.query.filter_by(user_id=user_id, status='approved').count()
-    
-    total_sales = db.session.query(func.sum(Quote.total_amount)).filter(
-        Quote.user_id == user_id, 
-        Quote.status.in_(['approved', 'paid'])
-    ).scalar() or 0
+    summary = user_summaries.get(user_id)
+    total_quotes = summary['total_quotes']
+    pending_quotes = user_summaries.count(summary, PENDING_QUOTE_STATUSES)
+    approved_quotes = user_summaries.count(summary, ['approved'])
+    total_sales = summary['sales_total']
     
     client_data = {
         'user_name': user.full_name or user.email,
@@ -192,7 +188,7 @@ def client_dashboard():
 def public_dashboard():
     """Dashboard para usuarios públicos/individuales."""
     user_id = session.get('user_id')
-    user = User.query.get(user_id)
+    user = get_current_user()
     
     if user.is_admin:
         flash('Acceso redirigido al panel de administración', 'info')
@@ -201,46 +197,25 @@ def public_dashboard():
         flash('Acceso redirigido al dashboard de cliente', 'info')
         return redirect(url_for('main.client_dashboard'))
     
-    from app.models import Favorite, Quote, Cart, CartItem
-    from sqlalchemy import func
-    
-    favorites_count = Favorite.query.filter_by(user_id=user_id).count()
-    
-    cart = Cart.query.filter_by(user_id=user_id, status='active').first()
+    from app.models.user_summary import user_summaries
     
-    total_items = 0
-    item_count = 0
-    total_value = 0.0
+    summary = user_summaries.get(user_id)
+    favorites_count = summary['favorites_count']
     
-    if cart and cart.items:
-        for item in cart.items:
-            total_items += item.quantity
-            item_count += 1
-            if item.unit_price:
-                total_value += float(item.unit_price) * item.quantity
+    cart = summary['cart']
+    total_items = cart['total_items']
     
     cart_stats = {
         'total_items': total_items,
-        'item_count': item_count,
-        'total_value': total_value,
-        'last_update': cart.updated_at.strftime('%d/%m/%Y %H:%M') if cart and cart.updated_at else 'Hoy'
+        'item_count': cart['item_count'],
+        'total_value': cart['total_value'],
+        'last_update': cart['updated_at'].strftime('%d/%m/%Y %H:%M') if cart['updated_at'] else 'Hoy'
     }
     
-    active_quotes = Quote.query.filter_by(user_id=user_id).filter(
-        Quote.status.in_(['draft', 'sent', 'pending'])
-    ).count()
+    active_quotes = user_summaries.count(summary, ['draft', 'sent', 'pending'])
     
-    recent_favorites = Favorite.query.filter_by(user_id=user_id).order_by(
-        Favorite.created_at.desc()
-    ).limit(5).all()
-    
-    favorite_categories = []
-    if recent_favorites:
-        categories_set = set()
-        for fav in recent_favorites:
-            if hasattr(fav, 'product') and fav.product and fav.product.category:
-                categories_set.add(fav.product.category)
-        favorite_categories = list(categories_set)
+    recent_favorites = summary['recent_favorites']
+    favorite_categories = summary['favorite_categories']
     
     recent_activity = [
         {
@@ -456,10 +431,25 @@ def sitemap():
 # ==================== RUTAS DE BÚSQUEDA ====================
 @main_bp.route('/buscar')
 def buscar_global():
-    """Búsqueda global que redirige al catálogo con parámetros"""
-    query = request.args.get('q', '')
+    """
+    Búsqueda global. Si lo escrito es exactamente un número de parte de
+    Ingram, del fabricante o un UPC conocido se va directo al detalle del
+    producto; si no, al catálogo con los parámetros. Los prefijos solo se
+    usan para autocompletar y sugerencias, nunca para redirigir.
+    """
+    from app.models.part_number_index import part_number_index
+    query = request.args.get('q', '').strip()
     vendor = request.args.get('vendor', '')
-    catalog_url = url_for('products.catalog', q=query, vendor=vendor)
+    
+    if query and len(query.split()) <= 2:
+        part_number = part_number_index.lookup(query)
+        if part_number:
+            perfil = get_user_profile()
+            if perfil and perfil['account_type'] == 'client':
+                return redirect(url_for('client_routes.producto_detalle', part_number=part_number))
+            return redirect(url_for('public.public_product_detail', part_number=part_number))
+    
+    catalog_url = url_for('public.public_catalog', q=query, vendor=vendor)
     return redirect(catalog_url)
 
 @main_bp.route('/search')
@@ -476,7 +466,7 @@ def check_session():
     """Verificar estado de la sesión"""
     user_info = {}
     if 'user_id' in session:
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         if user:
             user_info = {
                 'user_id': user.id,
@@ -1,16 +1,21 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, flash
 from datetime import datetime
 import json
+from sqlalchemy.orm import joinedload, selectinload
 from app import db 
+from app.models.query_budget import query_budget
 from app.Services.stripe_service import StripePaymentService
 from app.Services.mercadopago_service import MercadoPagoService
 from app.models.product import Product
 from app.models.favorite import Favorite
 from app.models.cart import Cart, CartItem
+from app.models.line_items import LineItems, CART_MARKUP
 from app.models.user import User
+from app.models.user_utils import get_current_user, get_user_profile
 from app.models.product_utils import ProductUtils
-from app.models.api_client import APIClient
 from app.models.image_handler import ImageHandler
+from app.models.prefetch import catalog_prefetcher
+from app.models.similar_products import similar_products
 
 # Crear Blueprint para rutas de público general
 public_bp = Blueprint('public', __name__, url_prefix='')
@@ -31,7 +36,9 @@ def get_product_image(product_data):
 def get_user_cart(user_id):
     """Obtener carrito del usuario - VERSIÓN MEJORADA Y CORREGIDA"""
     try:
-        cart = Cart.query.filter_by(user_id=user_id, status='active').first()
+        cart = Cart.query.options(
+            selectinload(Cart.items).joinedload(CartItem.product)
+        ).filter_by(user_id=str(user_id), status='active').order_by(Cart.id).first()
         if not cart:
             return []
         
@@ -39,14 +46,6 @@ def get_user_cart(user_id):
         for item in cart.items:
             product = item.product
             
-            product_images = []
-            if product.metadata_json:
-                try:
-                    metadata = json.loads(product.metadata_json)
-                    product_images = metadata.get('productImages', [])
-                except:
-                    product_images = []
-            
             product_data = {
                 'ingramPartNumber': product.ingram_part_number,
                 'description': product.description,
@@ -56,7 +55,8 @@ def get_user_cart(user_id):
                 'pricing': {
                     'customerPrice': product.base_price if product.base_price else 0
                 },
-                'productImages': product_images
+                'productImages': product.product_images,
+                'availability': product.availability
             }
             
             base_price = product.base_price or 0
@@ -86,18 +86,15 @@ def add_to_cart(user_id, product_data, quantity=1):
         if quantity > 999:
             quantity = 999
             
-        cart = Cart.query.filter_by(user_id=user_id, status='active').first()
-        if not cart:
-            cart = Cart(user_id=user_id, status='active')
-            db.session.add(cart)
-            db.session.flush()
+        part_number = product_data['ingramPartNumber']
+        cart_id = LineItems.active_cart_id(user_id, create=True)
         
-        product = Product.query.filter_by(ingram_part_number=product_data['ingramPartNumber']).first()
-        if not product:
+        # Una sola sentencia: INSERT ... ON CONFLICT (cart_id, product_id) DO UPDATE
+        if not LineItems.add_cart_item(cart_id, user_id, part_number, quantity):
             base_price = product_data.get('pricing', {}).get('customerPrice', 0)
             
             product = Product(
-                ingram_part_number=product_data['ingramPartNumber'],
+                ingram_part_number=part_number,
                 description=product_data.get('description', ''),
                 vendor_name=product_data.get('vendorName', 'N/A'),
                 upc=product_data.get('upc', ''),
@@ -110,24 +107,8 @@ def add_to_cart(user_id, product_data, quantity=1):
             )
             db.session.add(product)
             db.session.flush()
+            LineItems.add_cart_item(cart_id, user_id, part_number, quantity)
         
-        existing_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product.id).first()
-        
-        if existing_item:
-            existing_item.quantity += quantity
-            existing_item.calculate_total()
-        else:
-            unit_price = round(product.base_price * 1.15, 2) if product.base_price else 0
-            new_item = CartItem(
-                cart_id=cart.id,
-                product_id=product.id,
-                quantity=quantity,
-                unit_price=unit_price
-            )
-            new_item.calculate_total()
-            db.session.add(new_item)
-        
-        cart.calculate_total()
         db.session.commit()
         return True
         
@@ -151,55 +132,17 @@ def add_to_cart_route():
         if not part_number or part_number == 'None':
             return jsonify({'success': False, 'error': 'Número de parte inválido'}), 400
         
-        detail_url = f"https://api.ingrammicro.com/resellers/v6/catalog/details/{part_number}"
-        detalle_res = APIClient.make_request("GET", detail_url)
-        
-        if detalle_res.status_code != 200:
+        # Detalle y precio del cache o en paralelo; si el producto ya es local no se consulta a Ingram
+        product_data = ProductUtils.producto_para_alta(part_number)
+        if product_data is None:
             return jsonify({'success': False, 'error': 'Producto no encontrado'}), 404
         
-        detalle = detalle_res.json()
-        
-        real_price = 0
-        try:
-            price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability"
-            body = {"products": [{"ingramPartNumber": part_number}]}
-            params = {
-                "includeAvailability": "true",
-                "includePricing": "true",
-                "includeProductAttributes": "true"
-            }
-            
-            precio_res = APIClient.make_request("POST", price_url, params=params, json=body)
-            
-            if precio_res and precio_res.status_code == 200:
-                precio_data = precio_res.json()
-                if precio_data and isinstance(precio_data, list) and len(precio_data) > 0:
-                    first_product = precio_data[0]
-                    if first_product.get('productStatusCode') != 'E':
-                        pricing = first_product.get('pricing', {})
-                        if pricing:
-                            customer_price = pricing.get('customerPrice')
-                            if customer_price is not None:
-                                real_price = float(customer_price)
-        except Exception:
-            pass
-        
-        product_data = {
-            'ingramPartNumber': part_number,
-            'description': detalle.get('description', f"Producto {part_number}"),
-            'pricing': {'customerPrice': real_price},
-            'vendorName': detalle.get('vendorName', 'N/A'),
-            'upc': detalle.get('upc', ''),
-            'category': detalle.get('category', ''),
-            'productImages': detalle.get('productImages', [])
-        }
-        
         user_id = get_current_user_id()
         
         try:
             add_to_cart(user_id, product_data, quantity)
             
-            cart_count = len(get_user_cart(user_id))
+            cart_count = LineItems.cart_counters(user_id)['item_count']
             
             if request.is_json:
                 return jsonify({
@@ -226,6 +169,7 @@ def add_to_cart_route():
             return redirect(request.referrer or '/catalog')
 
 @public_bp.route('/cart', methods=["GET"])
+@query_budget.limit(4)
 def view_cart():
     """Ver carrito de compras"""
     try:
@@ -281,29 +225,22 @@ def update_cart_item():
         
         user_id = get_current_user_id()
         
-        cart = Cart.query.filter_by(user_id=user_id, status='active').first()
-        if not cart:
+        cart_id = LineItems.active_cart_id(user_id)
+        if cart_id is None:
             return jsonify({'success': False, 'error': 'Carrito no encontrado'}), 404
         
-        product = Product.query.filter_by(ingram_part_number=part_number).first()
-        if not product:
-            return jsonify({'success': False, 'error': 'Producto no encontrado'}), 404
-        
-        cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product.id).first()
-        if not cart_item:
-            return jsonify({'success': False, 'error': 'Producto no encontrado en el carrito'}), 404
+        item_total = LineItems.set_cart_item_quantity(cart_id, user_id, part_number, quantity)
+        if item_total is None:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': _motivo_no_encontrado(part_number)}), 404
         
-        cart_item.quantity = quantity
-        cart_item.calculate_total()
-        
-        cart.calculate_total()
         db.session.commit()
         
         return jsonify({
             'success': True,
             'message': 'Cantidad actualizada correctamente',
             'new_quantity': quantity,
-            'item_total': float(cart_item.total_price)
+            'item_total': item_total
         })
         
     except Exception as e:
@@ -322,19 +259,11 @@ def remove_cart_item():
         
         user_id = get_current_user_id()
         
-        cart = Cart.query.filter_by(user_id=user_id, status='active').first()
-        if not cart:
+        cart_id = LineItems.active_cart_id(user_id)
+        if cart_id is None:
             return jsonify({'success': False, 'error': 'Carrito no encontrado'}), 404
         
-        product = Product.query.filter_by(ingram_part_number=part_number).first()
-        if not product:
-            return jsonify({'success': False, 'error': 'Producto no encontrado'}), 404
-        
-        cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product.id).first()
-        if cart_item:
-            db.session.delete(cart_item)
-            
-            cart.calculate_total()
+        if LineItems.remove_cart_item(cart_id, user_id, part_number):
             db.session.commit()
             
             return jsonify({
@@ -342,23 +271,32 @@ def remove_cart_item():
                 'message': 'Producto eliminado del carrito'
             })
         else:
-            return jsonify({'success': False, 'error': 'Producto no encontrado en el carrito'}), 404
+            return jsonify({'success': False, 'error': _motivo_no_encontrado(part_number)}), 404
             
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _motivo_no_encontrado(part_number):
+    """Mensaje de error cuando la partida no existe: el producto no está en el catálogo o no está en el carrito."""
+    if not db.session.query(Product.id).filter_by(ingram_part_number=part_number).first():
+        return 'Producto no encontrado'
+    return 'Producto no encontrado en el carrito'
+
 # ==================== RUTAS ADICIONALES DEL CARRITO ====================
 @public_bp.route("/cart/count", methods=["GET"])
+@query_budget.limit(1)
 def api_get_cart_count():
-    """API para obtener cantidad de items en carrito"""
+    """API para obtener cantidad de items en carrito (contadores de la sesión o del carrito, sin partidas)"""
     try:
         user_id = get_current_user_id()
-        cart_items = get_user_cart(user_id)
+        contadores = LineItems.cart_counters(user_id)
         
         return jsonify({
             'success': True,
-            'count': len(cart_items)
+            'count': contadores['item_count'],
+            'total_quantity': contadores['total_quantity'],
+            'subtotal': contadores['subtotal']
         })
         
     except Exception as e:
@@ -379,7 +317,7 @@ def public_profile():
             flash('Por favor inicia sesión para editar tu perfil', 'warning')
             return redirect('/login')
         
-        user = User.query.get(user_id)
+        user = get_current_user()
         if not user:
             flash('Usuario no encontrado', 'error')
             return redirect('/')
@@ -433,7 +371,7 @@ def update_profile():
             flash('El formato del correo electrónico no es válido', 'error')
             return redirect('/profile')
         
-        user = User.query.get(user_id)
+        user = get_current_user()
         if not user:
             flash('Usuario no encontrado', 'error')
             return redirect('/profile')
@@ -481,7 +419,7 @@ def update_password():
         if len(new_password) < 6:
             return jsonify({'success': False, 'error': 'La contraseña debe tener al menos 6 caracteres'}), 400
         
-        user = User.query.get(user_id)
+        user = get_current_user()
         if not user:
             return jsonify({'success': False, 'error': 'Usuario no encontrado'}), 404
         
@@ -533,14 +471,23 @@ def public_catalog():
     query = request.args.get("q", "").strip()
     vendor = request.args.get("vendor", "").strip()
     
+    filtros, orden, filtros_qs, facetas_qs = ProductUtils.filtros_catalogo(request.args, CART_MARKUP)
+    
     try:
-        productos, total_records, pagina_vacia = ProductUtils.buscar_productos_hibrido(
-            query=query, 
-            vendor=vendor, 
-            page_number=page_number, 
-            page_size=page_size, 
-            use_keywords=bool(query)
-        )
+        if filtros or orden:
+            # Precio, existencia y orden se resuelven sobre el catálogo local (columnar)
+            productos, total_records, pagina_vacia = ProductUtils.filtrar_catalogo_local(
+                query=query, vendor=vendor, filters=filtros, sort=orden,
+                page=page_number, page_size=page_size
+            )
+        else:
+            productos, total_records, pagina_vacia = ProductUtils.buscar_productos_hibrido(
+                query=query, 
+                vendor=vendor, 
+                page_number=page_number, 
+                page_size=page_size, 
+                use_keywords=bool(query)
+            )
         
         total_pages = max(1, (total_records + page_size - 1) // page_size) if total_records > 0 else 1
         page_number = max(1, min(page_number, total_pages))
@@ -549,14 +496,18 @@ def public_catalog():
         
         user_id = get_current_user_id()
         if user_id != 'anonymous_user':
-            user = User.query.get(user_id)
-            if user and user.account_type == 'client' and user.is_verified:
+            perfil = get_user_profile()
+            if perfil and perfil['account_type'] == 'client' and perfil['is_verified']:
                 redirect_url = f'/client/catalog?page={page_number}'
                 if query:
                     redirect_url += f'&q={query}'
                 if vendor:
                     redirect_url += f'&vendor={vendor}'
-                return redirect(redirect_url)
+                return redirect(redirect_url + filtros_qs)
+        
+        if not (filtros or orden):
+            catalog_prefetcher.after_catalog_page(productos, query, vendor, page_number, page_size,
+                                                  bool(query), total_pages)
         
         return render_template(
             "public/catalog/catalog.html",
@@ -572,6 +523,12 @@ def public_catalog():
             pagina_vacia=pagina_vacia,
             welcome_message=(page_number == 1 and not query and not vendor and not productos),
             local_vendors=ProductUtils.get_local_vendors(),
+            facets=ProductUtils.get_catalog_facets(query, vendor, filtros, CART_MARKUP),
+            filtros=filtros,
+            orden=orden,
+            filtros_qs=filtros_qs,
+            facetas_qs=facetas_qs,
+            catalogo_local=bool(filtros or orden),
             get_image_url_enhanced=ImageHandler.get_image_url_enhanced,
             get_availability_text=ProductUtils.get_availability_text,
             user_type='public'
@@ -597,23 +554,12 @@ def public_catalog():
 def public_product_detail(part_number):
     """Detalle de producto para público general"""
     try:
-        detail_url = f"https://api.ingrammicro.com/resellers/v6/catalog/details/{part_number}"
-        detalle_res = APIClient.make_request("GET", detail_url)
+        detalle = ProductUtils.obtener_detalle_producto(part_number)
         
-        if detalle_res.status_code != 200:
+        if not detalle:
             return render_template("errors/404.html", message=f"Producto {part_number} no encontrado"), 404
-        
-        detalle = detalle_res.json()
 
-        price_url = "https://api.ingrammicro.com/resellers/v6/catalog/priceandavailability"
-        body = {"products": [{"ingramPartNumber": part_number}]}
-        params = {
-            "includeAvailability": "true",
-            "includePricing": "true",
-            "includeProductAttributes": "true"
-        }
-        precio_res = APIClient.make_request("POST", price_url, params=params, json=body)
-        precio_info = precio_res.json()[0] if precio_res.status_code == 200 else {}
+        precio_info = ProductUtils.obtener_precio_disponibilidad(part_number) or {}
 
         pricing = precio_info.get("pricing") or {}
         base_price = pricing.get("customerPrice")
@@ -646,6 +592,7 @@ def public_product_detail(part_number):
             atributos=atributos,
             imagen_url=imagen_url,
             part_number=part_number,
+            similares=similar_products.for_part_number(part_number),
             user_type='public'
         )
     
@@ -654,6 +601,7 @@ def public_product_detail(part_number):
 
 # ==================== RUTAS DE FAVORITOS ====================
 @public_bp.route('/favorites', methods=["GET"])
+@query_budget.limit(3)
 def public_favorites():
     """Favoritos para público general"""
     try:
@@ -747,7 +695,7 @@ def get_user_favorites(user_id):
     from app.models.favorite import Favorite
     from app.models.product import Product
     
-    favorites = Favorite.query.filter_by(user_id=user_id).all()
+    favorites = Favorite.query.options(joinedload(Favorite.product)).filter_by(user_id=user_id).all()
     
     favorite_list = []
     for fav in favorites:
@@ -790,11 +738,11 @@ def toggle_favorite(user_id, product_data):
     return action
 
 def get_cart_stats(user_id):
-    """Obtener estadísticas REALES del carrito desde la BD"""
+    """Obtener estadísticas REALES del carrito (contadores mantenidos al escribir)"""
     try:
-        cart_items = get_user_cart(user_id)
+        contadores = LineItems.cart_counters(user_id)
         
-        if not cart_items:
+        if not contadores['item_count']:
             return {
                 'total_items': 0,
                 'total_value': 0.0,
@@ -802,22 +750,15 @@ def get_cart_stats(user_id):
                 'item_count': 0
             }
         
-        total_items = sum(item['quantity'] for item in cart_items)
-        total_value = 0.0
-        
-        for item in cart_items:
-            total_value += item['total_price']
-        
         last_update = "Reciente"
-        cart = Cart.query.filter_by(user_id=user_id, status='active').first()
-        if cart and cart.updated_at:
-            last_update = cart.updated_at.strftime("%d/%m/%Y %H:%M")
+        if contadores['updated_at']:
+            last_update = datetime.fromisoformat(contadores['updated_at']).strftime("%d/%m/%Y %H:%M")
         
         return {
-            'total_items': total_items,
-            'total_value': round(total_value, 2),
+            'total_items': contadores['total_quantity'],
+            'total_value': contadores['subtotal'],
             'last_update': last_update,
-            'item_count': len(cart_items)
+            'item_count': contadores['item_count']
         }
         
     except Exception as e:
@@ -866,7 +807,7 @@ def api_remove_from_cart():
             return jsonify({
                 'success': True, 
                 'message': 'Producto eliminado del carrito',
-                'cart_count': len(get_user_cart(user_id))
+                'cart_count': LineItems.cart_counters(user_id)['item_count']
             })
         else:
             return jsonify({'success': False, 'error': 'Producto no encontrado en carrito'})
@@ -877,20 +818,13 @@ def api_remove_from_cart():
 def remove_from_cart_legacy(user_id, part_number):
     """Eliminar producto del carrito (función legacy)"""
     try:
-        cart = Cart.query.filter_by(user_id=user_id, status='active').first()
-        if not cart:
-            return False
-        
-        product = Product.query.filter_by(ingram_part_number=part_number).first()
-        if not product:
+        cart_id = LineItems.active_cart_id(user_id)
+        if cart_id is None:
             return False
         
-        item = CartItem.query.filter_by(cart_id=cart.id, product_id=product.id).first()
-        if not item:
+        if not LineItems.remove_cart_item(cart_id, user_id, part_number):
             return False
         
-        db.session.delete(item)
-        cart.calculate_total()
         db.session.commit()
         return True
         
@@ -1051,10 +985,7 @@ def process_successful_purchase(user_id, cart_data, payment_info):
 def clear_user_cart(user_id):
     """Limpiar carrito del usuario - VERSIÓN SIMPLIFICADA"""
     try:
-        cart = Cart.query.filter_by(user_id=user_id, status='active').first()
-        if cart:
-            CartItem.query.filter_by(cart_id=cart.id).delete()
-            cart.total_amount = 0.0
+        if LineItems.clear_cart(user_id):
             db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -1173,6 +1104,7 @@ def mercadopago_notifications():
 
 # ==================== RUTA DE ACTIVIDAD ====================
 @public_bp.route('/activity', methods=['GET'])
+@query_budget.limit(8)
 def activity():
     """Página de actividad del usuario"""
     try:
@@ -1183,10 +1115,12 @@ def activity():
             return redirect('/login')
         
         from app.models.quote import Quote
+        from app.models.user_summary import user_summaries
         
-        total_quotes = Quote.query.filter_by(user_id=user_id).count()
-        pending_quotes = Quote.query.filter_by(user_id=user_id, status='pending').count()
-        approved_quotes = Quote.query.filter_by(user_id=user_id, status='approved').count()
+        resumen = user_summaries.get(user_id)
+        total_quotes = resumen['total_quotes']
+        pending_quotes = user_summaries.count(resumen, ('pending',))
+        approved_quotes = user_summaries.count(resumen, ('approved',))
         
         from datetime import datetime
         current_month = datetime.now().month
@@ -1243,14 +1177,14 @@ def get_recent_cart_activity(user_id):
         from app.models.product import Product
         from datetime import datetime, timedelta
         
-        recent_carts = Cart.query.filter(
-            Cart.user_id == user_id,
+        recent_carts = Cart.query.options(selectinload(Cart.items)).filter(
+            Cart.user_id == str(user_id),
             Cart.created_at >= datetime.now() - timedelta(days=30)
         ).order_by(Cart.created_at.desc()).limit(5).all()
         
         cart_activities = []
         for cart in recent_carts:
-            items = CartItem.query.filter_by(cart_id=cart.id).all()
+            items = cart.items
             if items:
                 product_count = len(items)
                 total_value = sum(item.total_price for item in items if item.total_price)
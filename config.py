@@ -51,4 +51,46 @@ class Config:
     PROXY_CONFIG = os.getenv('PROXY_CONFIG')
     
     # Configuración de cache para imágenes
-    IMAGE_CACHE_TIMEOUT = int(os.getenv('IMAGE_CACHE_TIMEOUT', 3600))  # 1 hora por defecto
\ No newline at end of file
+    IMAGE_CACHE_TIMEOUT = int(os.getenv('IMAGE_CACHE_TIMEOUT', 3600))  # 1 hora por defecto
+    
+    # Reglas de búsqueda (JSON opcional con keyword_mapping / exclusion_estricta / exclusion_categorias)
+    SEARCH_RULES_FILE = os.getenv('SEARCH_RULES_FILE')
+    
+    # Analytics de búsqueda: cada cuántos segundos se escriben los contadores en la BD
+    SEARCH_ANALYTICS_FLUSH_SECONDS = int(os.getenv('SEARCH_ANALYTICS_FLUSH_SECONDS', 10))
+    
+    # Cache de respuestas de Ingram por producto (segundos)
+    PRODUCT_DETAIL_CACHE_SECONDS = int(os.getenv('PRODUCT_DETAIL_CACHE_SECONDS', 3600))
+    PRODUCT_PRICE_CACHE_SECONDS = int(os.getenv('PRODUCT_PRICE_CACHE_SECONDS', 120))
+    CATALOG_PAGE_CACHE_SECONDS = int(os.getenv('CATALOG_PAGE_CACHE_SECONDS', 120))
+    
+    # Tiempo máximo (segundos) para los precios por lotes del panel de productos del admin
+    ADMIN_PRICE_TIMEOUT = float(os.getenv('ADMIN_PRICE_TIMEOUT', 8))
+    
+    # Precarga en segundo plano de la siguiente página y de los primeros SKUs (opcional)
+    CATALOG_PREFETCH_ENABLED = os.getenv('CATALOG_PREFETCH_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    CATALOG_PREFETCH_TOP_SKUS = int(os.getenv('CATALOG_PREFETCH_TOP_SKUS', 4))
+    CATALOG_PREFETCH_WORKERS = int(os.getenv('CATALOG_PREFETCH_WORKERS', 1))
+    
+    # Índice de productos similares (se construye con `flask build-similar-products`)
+    SIMILAR_PRODUCTS_DIR = os.getenv('SIMILAR_PRODUCTS_DIR')
+    
+    # Reportes del admin: cada cuántos segundos se revisan cambios de otros workers en las tablas diarias
+    REPORTS_ROLLUP_REFRESH_SECONDS = int(os.getenv('REPORTS_ROLLUP_REFRESH_SECONDS', 60))
+    
+    # Eventos del admin: intervalo de lectura de la tabla por worker y duración máxima de cada stream SSE
+    ADMIN_EVENTS_POLL_SECONDS = float(os.getenv('ADMIN_EVENTS_POLL_SECONDS', 2))
+    ADMIN_EVENTS_STREAM_SECONDS = int(os.getenv('ADMIN_EVENTS_STREAM_SECONDS', 300))
+    
+    # Resumen por usuario de los dashboards: se invalida al escribir; el TTL cubre cambios de otros workers
+    USER_SUMMARY_CACHE_SECONDS = int(os.getenv('USER_SUMMARY_CACHE_SECONDS', 60))
+    
+    # Contadores del carrito copiados en la sesión: segundos que el badge los usa sin consultar la BD
+    CART_COUNTERS_SESSION_SECONDS = int(os.getenv('CART_COUNTERS_SESSION_SECONDS', 30))
+    
+    # Cache LRU del HTML de las tarjetas del catálogo: máximo de tarjetas y segundos de vida de cada una
+    PRODUCT_CARD_CACHE_SIZE = int(os.getenv('PRODUCT_CARD_CACHE_SIZE', 2000))
+    PRODUCT_CARD_CACHE_SECONDS = int(os.getenv('PRODUCT_CARD_CACHE_SECONDS', 600))
+    
+    # Límite de consultas por vista: 'true' lanza error al excederlo, 'false' solo lo registra (por defecto: según DEBUG/TESTING)
+    QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', '').lower() in ('1', 'true', 'yes') if os.getenv('QUERY_BUDGET_STRICT') else None
@@ -1,6 +1,7 @@
 from app import create_app, db  # ← IMPORTAR db DESDE app
 from flask_migrate import Migrate
 import secrets
+import click
 
 # Crear la aplicación primero
 app = create_app()
@@ -17,6 +18,63 @@ def init_db():
         db.create_all()
         print("✅ Database initialized successfully!")
 
+# Micro-benchmark del motor de relevancia
+@app.cli.command("bench-search-scoring")
+def bench_search_scoring():
+    """Compare per-candidate cost of per-product vs batch relevance scoring"""
+    from app.models.search_scoring import benchmark_scoring
+    with app.app_context():
+        result = benchmark_scoring()
+        print(f"📊 Candidatos: {result['candidates']}")
+        print(f"   Producto por producto: {result['legacy_us_per_candidate']} µs/candidato")
+        print(f"   Por lotes:             {result['batch_us_per_candidate']} µs/candidato")
+        print(f"   Speedup: {result['speedup']}x | Mismo ranking: {result['same_ranking']}")
+
+# Latencia del autocompletado
+@app.cli.command("bench-autocomplete")
+def bench_autocomplete():
+    """Measure p50/p95/p99 latency of the autocomplete index"""
+    from app.models.autocomplete import benchmark_autocomplete
+    with app.app_context():
+        result = benchmark_autocomplete()
+        print(f"📊 Entradas en el índice: {result['entries']} | Consultas: {result['queries']}")
+        print(f"   p50: {result['p50_ms']} ms | p95: {result['p95_ms']} ms | p99: {result['p99_ms']} ms")
+
+# Filtros y orden del catálogo columnar (requiere el backend NumPy)
+@app.cli.command("bench-catalog-table")
+@click.option('--products', default=100000, help='Synthetic products in the table')
+def bench_catalog_table(products):
+    """Measure ColumnTable filter+sort against the list-of-dicts loop; fails without NumPy"""
+    from app.models.catalog_table import benchmark_column_table
+    result = benchmark_column_table(n_products=products)
+    print(f"📊 Backend: {result['backend']} | Productos: {result['products']} | Coincidencias: {result['matches']}")
+    print(f"   Columnar: {result['column_ms']} ms | Listas: {result['list_ms']} ms | Speedup: {result['speedup']}x")
+    print(f"   Construcción: {result['build_ms']} ms | Mismo resultado: {result['same_result']}")
+    if result['backend'] != 'numpy':
+        raise click.ClickException("NumPy no está instalado: ColumnTable usa listas de Python. Instala requirements.txt.")
+    if not result['same_result']:
+        raise click.ClickException("El resultado columnar no coincide con el recorrido de listas.")
+
+# Índice de productos similares (TF-IDF + coseno)
+@app.cli.command("build-similar-products")
+def build_similar_products():
+    """Build the similar-products index from the local catalog"""
+    from app.models.similar_products import SimilarityBuilder, similar_products
+    with app.app_context():
+        meta = SimilarityBuilder().build(similar_products._directory)
+        print(f"✅ Índice de similares: {meta['products']} productos, {meta['terms']} términos "
+              f"({meta['format']}, {meta['build_seconds']} s)")
+
+# Tablas diarias de reportes del admin
+@app.cli.command("rollup-reports")
+@click.option('--full', is_flag=True, help='Rebuild every day instead of only the changed ones')
+def rollup_reports(full):
+    """Refresh the daily rollup tables used by the admin reports"""
+    from app.models.report_rollup import report_rollup
+    with app.app_context():
+        days = report_rollup.refresh(full=full)
+        print(f"✅ Reportes actualizados: {days} días recalculados")
+
 if __name__ == "__main__":
     print("🚀 Iniciando servidor de E-commerce Ingram...")
     print(f"📊 Modo debug: {app.config.get('DEBUG', False)}")
@@ -0,0 +1,51 @@
+"""Unique (cart_id, product_id) and (quote_id, product_id) on line items
+
+Revision ID: d4a8e61f2c95
+Revises: b71f0a9c3e28
+Create Date: 2026-10-19 19:32:08.441027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8e61f2c95'
+down_revision = 'b71f0a9c3e28'
+branch_labels = None
+depends_on = None
+
+
+def _merge_duplicates(table, owner):
+    """Suma las cantidades de partidas repetidas en la de menor id y borra el resto."""
+    op.execute(f"""
+        UPDATE {table} SET
+            quantity = (SELECT SUM(d.quantity) FROM {table} d
+                        WHERE d.{owner} = {table}.{owner} AND d.product_id = {table}.product_id),
+            total_price = unit_price * (SELECT SUM(d.quantity) FROM {table} d
+                                        WHERE d.{owner} = {table}.{owner} AND d.product_id = {table}.product_id)
+        WHERE id IN (SELECT MIN(id) FROM {table} GROUP BY {owner}, product_id HAVING COUNT(*) > 1)
+    """)
+    op.execute(f"""
+        DELETE FROM {table}
+        WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {owner}, product_id)
+    """)
+
+
+def upgrade():
+    _merge_duplicates('cart_items', 'cart_id')
+    _merge_duplicates('quote_items', 'quote_id')
+
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_cart_items_cart_product', ['cart_id', 'product_id'])
+
+    with op.batch_alter_table('quote_items', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_quote_items_quote_product', ['quote_id', 'product_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('quote_items', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_quote_items_quote_product', type_='unique')
+
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_cart_items_cart_product', type_='unique')
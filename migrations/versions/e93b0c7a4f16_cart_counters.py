@@ -0,0 +1,35 @@
+"""Item count and quantity counters on carts
+
+Revision ID: e93b0c7a4f16
+Revises: d4a8e61f2c95
+Create Date: 2026-10-19 21:04:37.218563
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e93b0c7a4f16'
+down_revision = 'd4a8e61f2c95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('total_quantity', sa.Integer(), server_default='0', nullable=False))
+
+    # Contadores de los carritos existentes
+    op.execute("""
+        UPDATE carts SET
+            item_count = (SELECT COUNT(*) FROM cart_items WHERE cart_items.cart_id = carts.id),
+            total_quantity = (SELECT COALESCE(SUM(quantity), 0) FROM cart_items WHERE cart_items.cart_id = carts.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        batch_op.drop_column('total_quantity')
+        batch_op.drop_column('item_count')
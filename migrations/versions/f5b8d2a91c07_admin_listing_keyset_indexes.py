@@ -0,0 +1,44 @@
+"""Composite indexes for the keyset-paginated admin listings
+
+Revision ID: f5b8d2a91c07
+Revises: e93b0c7a4f16
+Create Date: 2026-10-19 23:12:08.441907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b8d2a91c07'
+down_revision = 'e93b0c7a4f16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('idx_users_created_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('quotes', schema=None) as batch_op:
+        batch_op.create_index('idx_quotes_created_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.create_index('idx_purchases_created_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        batch_op.create_index('idx_carts_updated_id', ['updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        batch_op.drop_index('idx_carts_updated_id')
+
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.drop_index('idx_purchases_created_id')
+
+    with op.batch_alter_table('quotes', schema=None) as batch_op:
+        batch_op.drop_index('idx_quotes_created_id')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('idx_users_created_id')
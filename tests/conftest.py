@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+import pytest
+
+# Config lee DATABASE_URL al importarse: fijarlo antes de que cualquier módulo
+# de pruebas importe la app, para no tocar la base del proyecto
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ingram-tests-'), 'test.db')}"
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app, db
+    from app.models import Product
+
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Product(ingram_part_number='TST-001', description='Laptop de prueba', vendor_name='HP', vendor_part_number='HPLAPTOP840',
+                    category='Computadoras', subcategory='Laptops', base_price=1234.56, currency='MXN'),
+            Product(ingram_part_number='TST-002', description='Monitor de prueba', vendor_name='Dell',
+                    category='Monitores', subcategory='Gaming', base_price=99.99, currency='MXN'),
+        ])
+        db.session.commit()
+    # Instantáneas globales: que se construyan con la base de esta prueba
+    from app.models.catalog_table import catalog_table
+    from app.models.facets import facet_engine
+    catalog_table._table = None
+    facet_engine._index = None
+    yield app
@@ -0,0 +1,37 @@
+import re
+
+
+def _precios_catalogo(html):
+    """SKU -> precio mostrado en las tarjetas del catálogo público."""
+    precios = {}
+    for tarjeta in html.split('class="product-card"')[1:]:
+        sku = re.search(r'SKU:\s*(\S+)', tarjeta).group(1)
+        precios[sku] = float(re.search(r'\$([0-9.]+)', tarjeta.split('product-price', 1)[1]).group(1))
+    return precios
+
+
+def test_api_price_matches_public_catalog(app):
+    client = app.test_client()
+
+    html = client.get('/tienda?sort=price_asc').get_data(as_text=True)
+    mostrados = _precios_catalogo(html)
+    assert set(mostrados) == {'TST-001', 'TST-002'}
+
+    for url in ('/api/products?sort=price_asc', '/api/search?q=prueba&sort=price_asc'):
+        respuesta = client.get(url).get_json()
+        productos = respuesta.get('products') or respuesta.get('results')
+        api = {p['ingramPartNumber']: p['pricing']['customerPrice'] for p in productos}
+        assert api == mostrados
+
+
+def test_api_never_exposes_base_price(app):
+    client = app.test_client()
+
+    lineas = client.get('/api/products?format=ndjson').get_data(as_text=True).splitlines()
+    precios = [float(re.search(r'"customerPrice": ([0-9.]+)', linea).group(1)) for linea in lineas]
+    assert 1234.56 not in precios and 99.99 not in precios
+
+    primera = client.get('/api/products?sort=price_asc&limit=1').get_json()
+    assert '99.99' not in primera['next_cursor']
+    segunda = client.get(f"/api/products?sort=price_asc&limit=1&cursor={primera['next_cursor']}").get_json()
+    assert [p['ingramPartNumber'] for p in segunda['products']] == ['TST-001']
@@ -0,0 +1,24 @@
+def test_exact_part_number_goes_to_product(app):
+    client = app.test_client()
+
+    for q in ('TST-001', 'tst001', 'HPLAPTOP840'):
+        respuesta = client.get('/buscar', query_string={'q': q})
+        assert respuesta.status_code == 302
+        assert 'TST-001' in respuesta.headers['Location']
+
+
+def test_prefix_goes_to_catalog(app):
+    client = app.test_client()
+
+    # Prefijo de un solo producto: se busca en el catálogo, no se adivina el producto
+    respuesta = client.get('/buscar', query_string={'q': 'HPLAP'})
+    assert respuesta.status_code == 302
+    assert '/tienda' in respuesta.headers['Location'] and 'q=HPLAP' in respuesta.headers['Location']
+
+
+def test_prefix_is_offered_as_suggestion(app):
+    client = app.test_client()
+
+    sugerencias = client.get('/api/autocomplete', query_string={'q': 'tst00'}).get_json()['suggestions']
+    numeros = {s['text']: s['part_number'] for s in sugerencias if s['type'] == 'part_number'}
+    assert numeros == {'TST001': 'TST-001', 'TST002': 'TST-002'}
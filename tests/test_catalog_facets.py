@@ -0,0 +1,32 @@
+import re
+
+
+def _skus(html):
+    return set(re.findall(r'SKU:\s*(\S+)', html))
+
+
+def test_category_facet_filters_and_keeps_query(app):
+    client = app.test_client()
+
+    html = client.get('/tienda?q=prueba&sort=price_asc').get_data(as_text=True)
+    assert _skus(html) == {'TST-001', 'TST-002'}
+    enlace = re.search(r'href="([^"]*category=Computadoras[^"]*)"', html).group(1).replace('&amp;', '&')
+    assert 'q=prueba' in enlace and 'sort=price_asc' in enlace
+
+    html = client.get('/tienda' + enlace).get_data(as_text=True)
+    assert _skus(html) == {'TST-001'}
+    # La subcategoría se ofrece dentro de la categoría y conserva consulta y filtros
+    enlace = re.search(r'href="([^"]*subcategory=Laptops[^"]*)"', html).group(1).replace('&amp;', '&')
+    assert 'q=prueba' in enlace and 'category=Computadoras' in enlace and 'sort=price_asc' in enlace
+    assert _skus(client.get('/tienda' + enlace).get_data(as_text=True)) == {'TST-001'}
+
+
+def test_subcategory_outside_category_matches_nothing(app):
+    client = app.test_client()
+
+    html = client.get('/tienda?category=Computadoras&subcategory=Gaming').get_data(as_text=True)
+    assert _skus(html) == set()
+    html = client.get('/tienda?category=Monitores&subcategory=Gaming').get_data(as_text=True)
+    assert _skus(html) == {'TST-002'}
+    respuesta = client.get('/api/products?category=Monitores&subcategory=Gaming').get_json()
+    assert [p['ingramPartNumber'] for p in respuesta['products']] == ['TST-002']
@@ -0,0 +1,32 @@
+import re
+
+
+def _skus(html):
+    return set(re.findall(r'SKU:\s*(\S+)', html))
+
+
+def test_public_price_filters_use_displayed_price(app):
+    client = app.test_client()
+
+    # TST-002 cuesta 99.99 y se muestra en 114.99; TST-001 cuesta 1234.56 y se muestra en 1419.74
+    assert _skus(client.get('/tienda?max_price=100').get_data(as_text=True)) == set()
+    assert _skus(client.get('/tienda?max_price=114.99').get_data(as_text=True)) == {'TST-002'}
+    assert _skus(client.get('/tienda?min_price=1300').get_data(as_text=True)) == {'TST-001'}
+    assert _skus(client.get('/tienda?min_price=1419.75').get_data(as_text=True)) == set()
+
+
+def test_client_price_filters_use_client_markup(app):
+    client = app.test_client()
+
+    # En el catálogo de clientes TST-002 se muestra en 109.99 y TST-001 en 1358.02
+    assert _skus(client.get('/catalogo-completo-cards?max_price=109.99').get_data(as_text=True)) == {'TST-002'}
+    assert _skus(client.get('/catalogo-completo-cards?max_price=109.98').get_data(as_text=True)) == set()
+    assert _skus(client.get('/catalogo-completo-cards?min_price=1358.02').get_data(as_text=True)) == {'TST-001'}
+
+
+def test_local_catalog_notice(app):
+    client = app.test_client()
+
+    aviso = 'solo los productos ya sincronizados en el catálogo local'
+    assert aviso not in client.get('/tienda').get_data(as_text=True)
+    assert aviso in client.get('/tienda?sort=price_asc').get_data(as_text=True)
@@ -0,0 +1,10 @@
+from app.models.catalog_table import benchmark_column_table
+
+
+def test_column_table_uses_numpy_and_matches_list_loop():
+    # NumPy está en requirements.txt: sin él ColumnTable cae a listas y esto debe fallar
+    result = benchmark_column_table(n_products=20000, repeats=2)
+    assert result['backend'] == 'numpy'
+    assert result['matches'] > 0
+    assert result['same_result']
+    assert result['column_ms'] < result['list_ms']
@@ -0,0 +1,28 @@
+from app.models.facets import FacetIndex, price_band_for
+
+
+def _fila(product_id, price):
+    return (product_id, f'Producto {product_id}', 'HP', 'Computadoras', 'Laptops',
+            f'PB-{product_id}', None, price, None)
+
+
+def test_price_bands_use_displayed_price_per_tier():
+    # Costo 900: público 1035.00 (1.15), clientes 990.00 (1.10)
+    index = FacetIndex([_fila(1, 900.0), _fila(2, 50.0)], markups=(1.15, 1.10))
+    assert index.counts('', {}, markup=1.15)['price_band'] == {'0-1000': 1, '1000-5000': 1}
+    assert index.counts('', {}, markup=1.10)['price_band'] == {'0-1000': 2}
+    assert index.counts('', {'price_band': '1000-5000'}, markup=1.15)['total'] == 1
+    assert index.counts('', {'price_band': '1000-5000'}, markup=1.10)['total'] == 0
+    # El borde se evalúa sobre el precio redondeado, como en las tarjetas
+    assert price_band_for(869.5653, 1.15) == '1000-5000'
+
+
+def test_api_facets_match_api_prices(app):
+    client = app.test_client()
+
+    precios = [p['pricing']['customerPrice'] for p in client.get('/api/products').get_json()['products']]
+    esperado = {}
+    for precio in precios:
+        banda = price_band_for(precio)
+        esperado[banda] = esperado.get(banda, 0) + 1
+    assert client.get('/api/facets').get_json()['facets']['price_band'] == esperado
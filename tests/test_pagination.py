@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def test_page_jump_matches_offset_and_reads_by_key(app):
+    from app import db
+    from app.models.pagination import paginate_keyset
+    from app.models.quote import Quote
+
+    with app.app_context():
+        user_id = db.session.execute(db.text("SELECT id FROM users ORDER BY id LIMIT 1")).scalar()
+        if user_id is None:
+            from app.models.user import User
+            user = User(email='paginas@prueba.mx', password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            user_id = user.id
+        inicio = datetime(2026, 1, 1)
+        # Fechas repetidas: el id desempata
+        db.session.add_all([Quote(user_id=user_id, quote_number=f'PG-{i:03d}', status='archived',
+                                  created_at=inicio + timedelta(days=i // 3)) for i in range(47)])
+        db.session.commit()
+
+        query = Quote.query.filter(Quote.status == 'archived')
+        columnas = (Quote.created_at, Quote.id)
+        esperado = [q.id for q in query.order_by(Quote.created_at.desc(), Quote.id.desc()).all()]
+
+        sentencias = []
+
+        def registrar(conn, cursor, statement, parameters, *args):
+            sentencias.append((statement, parameters))
+
+        for page in (1, 2, 4, 5):
+            sentencias.clear()
+            event.listen(Engine, 'before_cursor_execute', registrar)
+            try:
+                pagina = paginate_keyset(query, columnas, page=page, per_page=10, descending=True)
+            finally:
+                event.remove(Engine, 'before_cursor_execute', registrar)
+            assert [q.id for q in pagina.items] == esperado[(page - 1) * 10:page * 10]
+            if page > 1:
+                # La consulta que carga las filas no salta filas (SQLite siempre emite "OFFSET ?")
+                sentencia, parametros = sentencias[-1]
+                assert 'quote_number' in sentencia and parametros[-1] == 0
+
+        assert paginate_keyset(query, columnas, page=6, per_page=10, descending=True).items == []
+
+        # El cursor de "siguiente" lleva a la misma página que el salto directo
+        segunda = paginate_keyset(query, columnas, page=2, per_page=10, descending=True)
+        tercera = paginate_keyset(query, columnas, page=3, per_page=10, descending=True,
+                                  cursor=segunda.next_cursor)
+        assert [q.id for q in tercera.items] == esperado[20:30]
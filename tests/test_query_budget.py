@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Vistas con @query_budget.limit: el número de consultas no debe crecer con las filas
+VISTAS = ('/cart', '/mi-cotizacion', '/api/get-quote', '/favoritos', '/api/get-favorites', '/quote/history')
+
+
+@pytest.fixture(scope='module')
+def usuarios(app):
+    """Dos clientes con 1 y con 6 filas en carrito, cotización, historial y favoritos."""
+    from app import db
+    from app.models import Product
+    from app.models.cart import Cart, CartItem
+    from app.models.favorite import Favorite
+    from app.models.quote import Quote, QuoteItem
+    from app.models.user import User
+
+    ids = {}
+    with app.app_context():
+        for filas in (1, 6):
+            user = User(email=f'presupuesto{filas}@prueba.mx', account_type='client',
+                        is_verified=True, is_active=True)
+            user.set_password('secreto')
+            db.session.add(user)
+            db.session.flush()
+
+            # Inactivos: no aparecen en el catálogo que usan las otras pruebas
+            productos = [Product(ingram_part_number=f'QB{filas}-{i:03d}', description=f'Producto {i}',
+                                 vendor_name='HP', base_price=10.0 + i, currency='MXN', is_active=False)
+                         for i in range(filas)]
+            db.session.add_all(productos)
+            db.session.flush()
+
+            cart = Cart(user_id=str(user.id), status='active')
+            cart.items = [CartItem(product_id=p.id, quantity=2, unit_price=p.base_price) for p in productos]
+            borrador = Quote(user_id=user.id, quote_number=f'QB{filas}-DRAFT', status='draft')
+            borrador.items = [QuoteItem(product_id=p.id, quantity=1, unit_price=p.base_price) for p in productos]
+            enviadas = [Quote(user_id=user.id, quote_number=f'QB{filas}-{i:03d}', status='sent',
+                              items=[QuoteItem(product_id=p.id, quantity=1, unit_price=p.base_price)])
+                        for i, p in enumerate(productos[1:])]
+            favoritos = [Favorite(user_id=user.id, product_id=p.id) for p in productos]
+            db.session.add_all([cart, borrador] + enviadas + favoritos)
+            db.session.commit()
+            ids[filas] = user.id
+    return ids
+
+
+def _consultas(client, url):
+    contador = [0]
+
+    def contar(*args):
+        contador[0] += 1
+
+    event.listen(Engine, 'before_cursor_execute', contar)
+    try:
+        respuesta = client.get(url)
+    finally:
+        event.remove(Engine, 'before_cursor_execute', contar)
+    return respuesta, contador[0]
+
+
+def test_budget_is_strict_under_testing(app):
+    from app.models.query_budget import query_budget
+    with app.test_request_context():
+        assert query_budget.strict()
+
+
+@pytest.mark.parametrize('url', VISTAS)
+def test_query_count_does_not_grow_with_rows(app, usuarios, url):
+    conteos = {}
+    for filas, user_id in usuarios.items():
+        client = app.test_client()
+        with client.session_transaction() as sesion:
+            sesion['user_id'] = user_id
+        respuesta, conteos[filas] = _consultas(client, url)
+        assert respuesta.status_code == 200
+        cuerpo = respuesta.get_data(as_text=True)
+        if url != '/quote/history':
+            # La vista no cayó en su página de error: muestra todas las filas
+            assert all(f'QB{filas}-{i:03d}' in cuerpo for i in range(filas))
+        else:
+            assert f'QB{filas}-DRAFT' in cuerpo
+    assert conteos[1] == conteos[6]
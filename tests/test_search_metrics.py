@@ -0,0 +1,42 @@
+import requests
+
+
+class _Respuesta:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+
+    def json(self):
+        return self._data
+
+
+def test_ingram_failures_are_errors_not_zero_results(app, monkeypatch):
+    from app.models import api_client
+    from app.models.product_utils import ProductUtils
+    from app.models.search_metrics import search_metrics
+
+    respuestas = iter([
+        _Respuesta(503),
+        requests.exceptions.ConnectionError('sin red'),
+        _Respuesta(200, {'catalog': [], 'recordsFound': 0}),
+    ])
+
+    def request(method, url, **kwargs):
+        respuesta = next(respuestas)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    monkeypatch.setattr(api_client.APIClient, 'get_headers', staticmethod(lambda: {}))
+    monkeypatch.setattr(api_client.requests, 'request', request)
+    monkeypatch.setattr(search_metrics, '_buckets', {})
+
+    with app.app_context():
+        # Las tres búsquedas devuelven una página vacía; solo la última es un "sin resultados" real
+        for query in ('metricas caida', 'metricas sin red', 'metricas vacia'):
+            assert ProductUtils.buscar_productos_hibrido(query=query, use_keywords=True)[1] == 0
+
+    hibrida = search_metrics.snapshot()['modes']['hybrid']
+    assert hibrida['searches'] == 3
+    assert hibrida['error_rate'] == round(2 / 3, 4)
+    assert hibrida['zero_result_rate'] == round(1 / 3, 4)
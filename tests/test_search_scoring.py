@@ -0,0 +1,18 @@
+from app.models.product_utils import ProductUtils
+from app.models.search_scoring import _legacy_score, benchmark_scoring, scorer_para
+
+
+def test_batch_ranking_matches_original_implementation():
+    # Compara contra la copia de la implementación producto por producto anterior
+    result = benchmark_scoring(n_candidates=300, n_terms=3)
+    assert result['same_ranking']
+
+
+def test_product_shims_reuse_one_scorer_per_query():
+    producto = {'ingramPartNumber': 'X1', 'description': 'Laptop HP EliteBook 840',
+                'vendorName': 'HP', 'category': 'Laptops'}
+    assert scorer_para('laptop hp') is scorer_para('laptop hp')
+    for term in ('laptop', 'hp', 'elitebook'):
+        assert ProductUtils.score_product_relevance_specific(producto, term, 'laptop hp') == \
+            _legacy_score(producto, term, 'laptop hp')
+    assert not scorer_para('laptop hp')._bonus_cache
@@ -0,0 +1,29 @@
+def _precio_api(client):
+    productos = client.get('/api/products?sort=price_asc').get_json()['products']
+    return {p['ingramPartNumber']: p['pricing']['customerPrice'] for p in productos}['TST-002']
+
+
+def test_admin_changes_apply_without_new_login(app):
+    from app import db
+    from app.models.user import User
+
+    with app.app_context():
+        user = User(email='cliente@prueba.mx', account_type='client', is_verified=True, is_active=True)
+        user.set_password('secreto')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = user_id
+    assert _precio_api(client) == 109.99  # precio de clientes (QUOTE_MARKUP)
+
+    # Un administrador le quita la verificación: el perfil en la sesión ya no manda
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        user.is_verified = False
+        db.session.commit()
+    assert _precio_api(client) == 114.99  # precio público (CART_MARKUP)
+    with client.session_transaction() as sesion:
+        assert sesion['user_profile']['is_verified'] is False